@@ -49,10 +49,14 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'base.authentication.CachedJWTAuthentication',  # simplejwt with a per-process user cache
     )
 }
 
+# Per-process cache of authenticated users (base/authentication.py)
+AUTH_USER_CACHE_SIZE = 1024  # Users kept per process
+AUTH_USER_CACHE_TTL = 60  # Seconds before a cached user is read again (bounds staleness across processes)
+
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
@@ -119,6 +123,13 @@ TEMPLATES = [
 # WSGI application for deployment
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# ASGI application for deployment (gunicorn with uvicorn workers, see gunicorn.conf.py)
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Serve the catalog and order read endpoints with `async def` views (base/asyncapi.py).
+# They also work under WSGI; set ASYNC_READ_VIEWS=0 to route to the DRF views instead.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '1') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0.6/ref/settings/#databases
@@ -144,6 +155,70 @@ DATABASES = {
 # }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The cache must be shared by every process: the web workers and the background worker patch
+# the leaderboard and invalidate cached catalog responses for each other. Set REDIS_URL to use
+# Redis; otherwise the cache lives in a database table (created by migration 0016, or
+# `manage.py createcachetable`). The job worker refuses to start on a per-process cache, and
+# outside DEBUG so do `migrate` and `check` (system check base.E001).
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'automart_cache',  # Table name
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Top-products leaderboard (base/leaderboard.py)
+TOP_PRODUCTS_COUNT = 5  # Number of products on the home page carousel
+TOP_PRODUCTS_MIN_RATING = 4  # Minimum rating to appear on the carousel
+TOP_PRODUCTS_TIMEOUT = 60 * 5  # Seconds before the cached leaderboard is rebuilt from the database
+
+# Catalog response cache (base/catalog_cache.py)
+CATALOG_CACHE_TIMEOUT = 60 * 10  # Seconds a cached product or listing response is kept
+
+
+# Idempotency keys for checkout and payment (base/idempotency.py)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)  # How long a stored response is replayed for retries
+IDEMPOTENCY_WAIT_SECONDS = 10  # How long a duplicate waits for the original request to finish
+
+
+# Stock holds placed at checkout (base/inventory.py)
+STOCK_HOLD_TTL = timedelta(minutes=30)  # Unpaid orders give their stock back after this long
+STOCK_HOLD_SWEEP_INTERVAL = timedelta(minutes=1)  # Checkouts in the same interval share one queued release sweep
+STOCK_SHARD_RECONCILE_INTERVAL = timedelta(seconds=5)  # Sharded stock reaches countInStock within about this long (base/shards.py)
+
+
+# Background task queue (base/tasks.py), run by `python manage.py run_worker`
+# (the `worker` process of the Procfile). Without a running worker, search indexing, the top
+# products board, image variants, sales rollups and the release of unpaid stock holds silently
+# fall behind: their jobs just pile up in the Job table.
+# Set TASK_QUEUE_EAGER=1 to run tasks inline after each request instead (development without a worker).
+TASK_QUEUE_EAGER = os.environ.get('TASK_QUEUE_EAGER') == '1'
+TASK_QUEUE_THREADS = 4  # Worker threads per process
+TASK_QUEUE_PROCESSES = 1  # Worker processes
+TASK_QUEUE_MAX_ATTEMPTS = 5  # Failures before a job is moved to the dead-letter table
+TASK_QUEUE_RETRY_DELAY = 10  # Seconds before the first retry, doubled for every further attempt
+TASK_QUEUE_LEASE = timedelta(minutes=10)  # A job running longer than this is assumed lost and queued again
+
+
+# Password checks run in a bounded process pool per web worker (base/hashing.py, base/backends.py)
+AUTHENTICATION_BACKENDS = ['base.backends.PooledModelBackend']
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # Hashing processes, 0 = hash inline
+PASSWORD_HASH_QUEUE = 16  # Hashing calls running or waiting at once; more are answered with 503
+PASSWORD_HASH_WAIT = 2  # Seconds a request waits for a free slot before that
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0.6/ref/settings/#auth-password-validators
 
@@ -194,6 +269,14 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'  # Directory for collected static files
 MEDIA_ROOT = BASE_DIR / 'static/images'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Resized product images (base/images.py). Their names carry a content hash, so clients may cache
+# them forever.
+PRODUCT_IMAGE_WIDTHS = (160, 320, 640, 1280)  # Variant widths in pixels
+WHITENOISE_IMMUTABLE_FILE_TEST = r'/variants/[0-9a-f]{16}-\d+w\.(jpg|png|webp)$'
+
+# Product reviews are paginated (base/reviews.py); the product detail embeds the first page.
+REVIEW_PAGE_SIZE = 10
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 
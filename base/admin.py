@@ -18,6 +18,21 @@ admin.site.register(OrderItem)
 # Register the ShippingAddress model to manage shipping details related to orders
 admin.site.register(ShippingAddress)
 
+# Register the IdempotencyKey model to inspect stored checkout/payment responses
+admin.site.register(IdempotencyKey)
+
+# Register the sales rollups so daily figures can be inspected
+admin.site.register(DailySales)
+admin.site.register(DailyProductSales)
+admin.site.register(DailyCategorySales)
+
+# Register the background queue models to inspect pending and failed jobs
+admin.site.register(Job)
+admin.site.register(DeadJob)
+
+# Register the facet counts so the catalog filter counts can be inspected
+admin.site.register(FacetCount)
+
 # OOP Concept:
 # - **Encapsulation**: The models (`Product`, `Review`, `Order`, etc.) encapsulate the data 
 #   and business logic associated with each entity (product, review, order, etc.).
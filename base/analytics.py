@@ -0,0 +1,175 @@
+# Sales rollups behind the admin analytics endpoint.
+#
+# DailySales, DailyProductSales and DailyCategorySales hold revenue, units and order counts per
+# day (and product / category), so range queries read a few hundred small rows instead of the
+# order history.
+#
+# - A new order is counted as "placed" on the day it was created, by a background job queued at
+#   checkout (`recordOrder`); it is counted as "paid" on the day it was paid by a job queued when
+#   it is marked paid (`recordPayments`).
+# - Counters are changed with F() updates. `Order.isRolledUp` / `isPaidRolledUp` are switched in
+#   the same transaction with a conditional UPDATE, so a retried job never counts an order twice.
+# - `rebuildRollups` (run by `manage.py backfill_sales_rollups`) recounts everything from the
+#   orders in chunks.
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from base.models import DailyCategorySales, DailyProductSales, DailySales, Order, OrderItem
+from base.tasks import task
+
+PLACED = ('orders', 'units', 'revenue')  # Counters of placed orders
+PAID = ('paidOrders', 'paidUnits', 'paidRevenue')  # Counters of paid orders
+METRICS = PLACED + PAID
+
+
+def saleDay(moment):
+    """
+    Returns the calendar day (in TIME_ZONE) a timestamp is counted on.
+    """
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def tally(orderDays, counters):
+    """
+    Adds up the items of orders into counter increments per rollup row.
+
+    Args:
+        orderDays (dict): Day each order is counted on, per order id.
+        counters (tuple): PLACED or PAID.
+
+    Returns:
+        tuple: Increments per day, per (day, product id) and per (day, category); each maps a
+            key to a dict of counter increments.
+    """
+    ordersName, unitsName, revenueName = counters
+    byDay, byProduct, byCategory = (defaultdict(lambda: defaultdict(int)) for _ in range(3))
+    seen = set()  # (rollup, key, order) triples already counted as one order
+
+    items = OrderItem.objects.filter(order_id__in=list(orderDays)).values_list(
+        'order_id', 'product_id', 'product__category', 'qty', 'price')
+    for orderId, productId, category, qty, price in items.iterator():
+        day = orderDays[orderId]
+        qty = qty or 0
+        value = (price or Decimal('0')) * qty
+        for name, rollup, key in (('day', byDay, day), ('product', byProduct, (day, productId)),
+                                  ('category', byCategory, (day, category or ''))):
+            rollup[key][unitsName] += qty
+            rollup[key][revenueName] += value
+            if (name, key, orderId) not in seen:
+                seen.add((name, key, orderId))
+                rollup[key][ordersName] += 1
+    return byDay, byProduct, byCategory
+
+
+def increment(model, lookup, changes):
+    """
+    Adds `changes` to the rollup row matching `lookup`, creating the row if needed.
+    """
+    updates = {name: F(name) + value for name, value in changes.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **changes)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**updates)  # Created concurrently in the meantime
+
+
+def apply(byDay, byProduct, byCategory):
+    """
+    Applies the increments returned by `tally`. Rows are updated in key order, so concurrent
+    jobs lock them in the same order.
+    """
+    for day in sorted(byDay):
+        increment(DailySales, {'day': day}, byDay[day])
+    for day, productId in sorted(byProduct, key=lambda key: (key[0], key[1] or 0)):
+        increment(DailyProductSales, {'day': day, 'product_id': productId}, byProduct[day, productId])
+    for day, category in sorted(byCategory):
+        increment(DailyCategorySales, {'day': day, 'category': category}, byCategory[day, category])
+
+
+@task(priority=1)  # Queued at checkout
+def recordOrder(orderId):
+    """
+    Counts a new order in the "placed" figures of the day it was created.
+
+    Args:
+        orderId (int): Primary key (`_id`) of the order.
+    """
+    with transaction.atomic():
+        if not Order.objects.filter(_id=orderId, isRolledUp=False).update(isRolledUp=True):
+            return  # Already counted (retried job or backfill)
+        createdAt = Order.objects.values_list('createdAt', flat=True).get(_id=orderId)
+        apply(*tally({orderId: saleDay(createdAt)}, PLACED))
+
+
+@task(priority=1)  # Queued when orders are marked paid
+def recordPayments(orderIds):
+    """
+    Counts paid orders in the "paid" figures of the day they were paid.
+
+    Args:
+        orderIds (list): Primary keys (`_id`) of the orders.
+    """
+    with transaction.atomic():
+        # One conditional UPDATE per order tells exactly which ones this job counts
+        claimed = [pk for pk in orderIds
+                   if Order.objects.filter(_id=pk, isPaid=True, isPaidRolledUp=False).update(isPaidRolledUp=True)]
+        if not claimed:
+            return  # Already counted (retried job or backfill)
+        orders = Order.objects.filter(_id__in=claimed).values_list('_id', 'paidAt', 'createdAt')
+        apply(*tally({pk: saleDay(paidAt or createdAt) for pk, paidAt, createdAt in orders}, PAID))
+
+
+def rebuildRollups(chunkSize=1000):
+    """
+    Recounts the rollups from all orders, `chunkSize` orders per transaction.
+
+    The rollups are emptied first, then each chunk is recounted in its own transaction, which also
+    sets the `isRolledUp` / `isPaidRolledUp` flags of the chunk; no statement rewrites the whole
+    order table. An order flagged before the rebuild started was in the deleted rollups and is
+    counted again. One flagged since then was counted into the new rollups by a background job and
+    is skipped, so the two never count the same order.
+
+    Args:
+        chunkSize (int): Orders per transaction.
+
+    Returns:
+        int: Number of orders scanned.
+    """
+    with transaction.atomic():
+        for model in (DailySales, DailyProductSales, DailyCategorySales):
+            model.objects.all().delete()
+        # Orders not counted yet when the rebuild starts (usually the few whose job is still queued)
+        newest = Order.objects.aggregate(newest=Max('_id'))['newest'] or 0
+        notPlaced = set(Order.objects.filter(isRolledUp=False).values_list('_id', flat=True).iterator())
+        notPaid = set(Order.objects.filter(isPaidRolledUp=False).values_list('_id', flat=True).iterator())
+
+    def countedBefore(pk, flag, pending):
+        # True when the flag was already set as the rebuild started
+        return flag and pk <= newest and pk not in pending
+
+    scanned, last = 0, 0
+    while True:
+        with transaction.atomic():
+            orders = list(Order.objects.select_for_update().filter(_id__gt=last).order_by('_id')
+                          .values_list('_id', 'createdAt', 'isPaid', 'paidAt', 'isRolledUp', 'isPaidRolledUp')[:chunkSize])
+            if not orders:
+                return scanned
+            placed = {pk: saleDay(createdAt) for pk, createdAt, _, _, rolledUp, _ in orders
+                      if not rolledUp or countedBefore(pk, rolledUp, notPlaced)}
+            paid = {pk: saleDay(paidAt or createdAt) for pk, createdAt, isPaid, paidAt, _, paidRolledUp in orders
+                    if isPaid and (not paidRolledUp or countedBefore(pk, paidRolledUp, notPaid))}
+
+            # Every order of the chunk is now counted in the new rollups
+            Order.objects.filter(_id__in=list(placed)).update(isRolledUp=True)
+            Order.objects.filter(_id__in=list(paid)).update(isPaidRolledUp=True)
+            apply(*tally(placed, PLACED))
+            apply(*tally(paid, PAID))
+        scanned += len(orders)
+        last = orders[-1][0]
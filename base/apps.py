@@ -13,6 +13,7 @@ class BaseConfig(AppConfig):
         In this case, it imports the signals module from the base app to set up any signal handlers.
         """
         import base.signals  # Importing the signals module from the 'base' app.
+        import base.checks  # Registers the system checks (shared cache)
 
 # Md Golam Sharoar Saymum _
 # 0242220005101780
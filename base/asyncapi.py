@@ -0,0 +1,65 @@
+# Async (ASGI) read endpoints.
+#
+# DRF's @api_view only produces sync views, which an ASGI server has to run in a thread pool, so
+# slow clients would again be capped by the number of threads. The read-heavy endpoints therefore
+# also have `async def` variants (the `...Async` views in base/views), wrapped with `asyncApiView`:
+# - JWT authentication with the cached user lookup (CachedJWTAuthentication.aauthenticate),
+# - the `IsAuthenticated` check when asked for,
+# - `request.query_params` like DRF, so the shared helpers (pagination, filters, cache keys) work,
+# - DRF exceptions (ValidationError, NotFound, AuthenticationFailed, ...) answered in DRF's format,
+# - dict/list results rendered as JSON with DRF's encoder.
+# Views must load everything they serialize with the async ORM (`aget`, `aiterator`, `async for`,
+# with select_related/prefetch_related), since serializers must not query the database.
+# `ASYNC_READ_VIEWS` (settings) selects the async variants in the URL configuration.
+
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponseBase, JsonResponse
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+
+from base.authentication import CachedJWTAuthentication
+
+authenticator = CachedJWTAuthentication()
+
+
+def errorResponse(exc, request):
+    # Renders an APIException the way DRF's default exception handler does
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = JsonResponse(data, encoder=JSONEncoder, safe=False, status=exc.status_code)
+    if isinstance(exc, NotAuthenticated) or exc.status_code == 401:
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+    return response
+
+
+def asyncApiView(authenticated=False):
+    """
+    Decorator turning an `async def` view into a GET API endpoint.
+
+    Args:
+        authenticated (bool): Reject anonymous requests with 401, like `IsAuthenticated`.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request.query_params = request.GET
+            try:
+                if request.method not in ('GET', 'HEAD'):
+                    raise MethodNotAllowed(request.method)
+                result = await authenticator.aauthenticate(request)
+                request.user = result[0] if result else AnonymousUser()
+                if authenticated and not request.user.is_authenticated:
+                    raise NotAuthenticated()
+                data = await view(request, *args, **kwargs)
+            except APIException as exc:
+                return errorResponse(exc, request)
+
+            if isinstance(data, HttpResponseBase):
+                return data
+            return JsonResponse(data, encoder=JSONEncoder, safe=False)
+
+        wrapper.csrf_exempt = True  # Token authenticated like the DRF views
+        return wrapper
+
+    return decorator
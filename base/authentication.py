@@ -0,0 +1,139 @@
+# JWT authentication with a per-process user cache.
+#
+# simplejwt's JWTAuthentication loads the User row for the token on every authenticated request.
+# CachedJWTAuthentication keeps recently seen users in a bounded in-process LRU (AUTH_USER_CACHE_SIZE
+# entries, AUTH_USER_CACHE_TTL seconds), which takes that query off most requests.
+#
+# - Saving or deleting a User (profile and admin updates, `is_staff` changes, the username
+#   `pre_save` hook in base/signals.py, ...) drops its entry through the post_save/post_delete
+#   signals. Other processes notice the change within the TTL at the latest.
+# - Every request gets its own copy of the cached user, so a view changing `request.user` never
+#   changes the cached record.
+# - The is_active and password-change checks of simplejwt run on cached users too.
+# - `aauthenticate` is the same for the async views (base/asyncapi.py), using the async ORM on a miss.
+
+import threading
+import time
+from collections import OrderedDict
+from copy import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+CACHE_SIZE = getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024)  # Users kept per process
+CACHE_TTL = getattr(settings, 'AUTH_USER_CACHE_TTL', 60)  # Seconds a cached user is trusted
+
+
+class UserCache:
+    """
+    Thread-safe LRU cache of user records with a time-to-live.
+
+    Each invalidation bumps a version counter; `set` ignores values loaded before the last
+    invalidation, so a user read just before a concurrent save is not cached stale.
+    """
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # user id -> (expiry, user), least recently used first
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        # Returns the cached user (None on a miss or when it expired)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, user, version):
+        # Stores a user loaded while `version` was current, evicting the least recently used one
+        with self.lock:
+            if version != self.version:
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, user)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        # Drops a user, e.g. after it was saved or deleted
+        with self.lock:
+            self.version += 1
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+
+
+userCache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that reads the token's user from `userCache` before querying the database.
+    """
+
+    def get_user(self, validated_token):
+        key = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = userCache.get(key) if key is not None else None
+        if user is None:
+            version = userCache.version
+            user = super().get_user(validated_token)  # Database lookup and checks
+            userCache.set(key, user, version)
+            return copy(user)
+
+        self.checkUser(user, validated_token)
+        return copy(user)
+
+    def checkUser(self, user, validated_token):
+        # Same checks simplejwt applies after its lookup
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and \
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+    async def aauthenticate(self, request):
+        """
+        Async version of `authenticate` for plain Django requests.
+
+        Returns:
+            tuple | None: (user, validated token), or None when the request carries no token.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        rawToken = self.get_raw_token(header)
+        if rawToken is None:
+            return None
+        validatedToken = self.get_validated_token(rawToken)  # Signature and expiry checks, no I/O
+        return await self.aget_user(validatedToken), validatedToken
+
+    async def aget_user(self, validated_token):
+        key = validated_token.get(api_settings.USER_ID_CLAIM)
+        if key is None:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = userCache.get(key)
+        if user is None:
+            version = userCache.version
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: key})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            userCache.set(key, user, version)
+
+        self.checkUser(user, validated_token)
+        return copy(user)
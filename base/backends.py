@@ -0,0 +1,38 @@
+# Authentication backend verifying passwords in the hashing pool (base/hashing.py).
+#
+# Same behaviour as Django's ModelBackend: unknown users still cost one hash (no user enumeration
+# through response times), inactive users are rejected, and a stored hash with outdated
+# parameters is replaced by a fresh one on a successful login.
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from base import hashing
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend whose password checks run in the hashing process pool.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            hashing.hashPassword(password)  # Same cost as checking a real password
+            return None
+
+        isCorrect, newPassword = hashing.checkPassword(password, user.password)
+        if not isCorrect or not self.user_can_authenticate(user):
+            return None
+        if newPassword:
+            # Rehash on login: the hasher or its parameters changed since the password was set
+            user.password = newPassword
+            user.save(update_fields=['password'])
+        return user
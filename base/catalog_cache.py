@@ -0,0 +1,197 @@
+# Response cache for the catalog read endpoints (getProducts, getProduct, getTopProducts).
+#
+# - Product detail responses are cached per product and deleted when that product changes.
+# - Listing responses are cached per query string (keyword, page, cursor, ...). Their keys
+#   embed the listing generation number; any product change bumps it, which makes every
+#   cached listing unreachable at once without wildcard deletes. Old entries simply expire.
+# - Product detail keys embed a second generation that is only bumped by `invalidateAll`,
+#   for bulk jobs that change too many products to delete them one by one.
+#
+# Generations and deletes only reach other processes through a shared cache (database or Redis,
+# see CACHES); outside DEBUG, system check base.E001 makes `migrate` and `check` fail on a
+# per-process cache.
+#
+# Hit/miss counters are kept in the cache as well and exposed to admins by `getCatalogCacheStats`.
+# The `a...` functions are the same operations for the async views, using the async cache API.
+
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 10)  # Lifetime of cached responses in seconds
+
+GENERATION_KEYS = {'listing': 'catalog:generation:listing', 'product': 'catalog:generation:product'}
+STATS_KEYS = {'hits': 'catalog:stats:hits', 'misses': 'catalog:stats:misses'}
+
+
+def newGeneration():
+    # Generations restart from the clock, so a counter lost to cache eviction never
+    # comes back with a number whose listings are still cached
+    return int(time.time() * 1000)
+
+
+def generation(kind='listing'):
+    """
+    Returns the current 'listing' or 'product' generation, starting a new one if none is cached.
+    """
+    key = GENERATION_KEYS[kind]
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, newGeneration(), None)
+        value = cache.get(key)
+    return value
+
+
+async def ageneration(kind='listing'):
+    key = GENERATION_KEYS[kind]
+    value = await cache.aget(key)
+    if value is None:
+        await cache.aadd(key, newGeneration(), None)
+        value = await cache.aget(key)
+    return value
+
+
+def buildListingKey(request, name, listingGeneration):
+    # Listing key for the given generation: all query parameters are hashed into it
+    params = urlencode(sorted(request.query_params.items()))
+    digest = hashlib.md5(params.encode()).hexdigest()
+    return 'catalog:list:%s:%s:%s' % (listingGeneration, name, digest)
+
+
+def listingKey(request, name):
+    """
+    Builds the cache key of a listing response.
+
+    Args:
+        request: HTTP request object; all query parameters are part of the key.
+        name (str): Name of the listing (e.g. 'products').
+
+    Returns:
+        str: Cache key bound to the current catalog generation.
+    """
+    return buildListingKey(request, name, generation('listing'))
+
+
+async def alistingKey(request, name):
+    return buildListingKey(request, name, await ageneration('listing'))
+
+
+def productKey(pk):
+    """
+    Builds the cache key of a product detail response.
+    """
+    return 'catalog:product:%s:%s' % (generation('product'), pk)
+
+
+async def aproductKey(pk):
+    return 'catalog:product:%s:%s' % (await ageneration('product'), pk)
+
+
+def countHit(hit):
+    # Increments the hit or miss counter
+    key = STATS_KEYS['hits' if hit else 'misses']
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # Counter evicted between add and incr; statistics are best effort
+
+
+async def acountHit(hit):
+    key = STATS_KEYS['hits' if hit else 'misses']
+    await cache.aadd(key, 0, None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        pass
+
+
+def getOrSet(key, compute):
+    """
+    Returns the cached value for `key`, computing and caching it on a miss.
+
+    Args:
+        key (str): Cache key.
+        compute (callable): Builds the response data when it is not cached.
+
+    Returns:
+        The cached or freshly computed response data.
+    """
+    data = cache.get(key)
+    countHit(data is not None)
+    if data is None:
+        data = compute()
+        cache.set(key, data, TIMEOUT)
+    return data
+
+
+async def agetOrSet(key, compute):
+    """
+    Async `getOrSet`: `compute` is a coroutine function building the response data.
+    """
+    data = await cache.aget(key)
+    await acountHit(data is not None)
+    if data is None:
+        data = await compute()
+        await cache.aset(key, data, TIMEOUT)
+    return data
+
+
+def invalidateProducts(pks):
+    """
+    Drops the cached detail responses of `pks` and all cached listings.
+
+    Runs after the current transaction commits so readers never re-cache the old rows.
+
+    Args:
+        pks (iterable): Primary keys (`_id`) of the changed products.
+    """
+    keys = [productKey(pk) for pk in pks]  # Keys of the current product generation
+
+    def invalidate():
+        cache.delete_many(keys)
+        bumpGeneration('listing')
+
+    transaction.on_commit(invalidate)
+
+
+def invalidateAll():
+    """
+    Orphans every cached product and listing response once the current transaction commits.
+    """
+    def invalidate():
+        bumpGeneration('product')
+        bumpGeneration('listing')
+
+    transaction.on_commit(invalidate)
+
+
+def bumpGeneration(kind):
+    """
+    Starts a new 'listing' or 'product' generation, orphaning the entries of the old one.
+    """
+    key = GENERATION_KEYS[kind]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, newGeneration(), None)
+
+
+def stats():
+    """
+    Returns the hit/miss counters and the hit ratio.
+    """
+    values = cache.get_many(STATS_KEYS.values())
+    hits = values.get(STATS_KEYS['hits'], 0)
+    misses = values.get(STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hitRatio': round(hits / total, 4) if total else None,
+        'generation': generation('listing'),
+    }
@@ -0,0 +1,303 @@
+# Bulk catalog import and export (`manage.py catalog_import` / `catalog_export`).
+#
+# Feeds are CSV files with a header row or JSON Lines files (one object per line), keyed on
+# `Product.sku`. They are read as a stream and upserted in batches: each batch is one
+# `bulk_create(update_conflicts=True)` statement in its own transaction, so memory stays flat
+# and an interrupted import keeps the batches committed so far.
+#
+# - Only the columns present in the feed are updated on existing products (a price/stock feed
+#   leaves names and descriptions alone); new products get the model defaults for the rest.
+# - `image` holds a file path (relative to the `--images` directory) that is copied into the
+#   media storage under a content-hashed name, or without `--images` a storage name as written
+#   by the export. Empty cells keep the current image.
+# - Bulk writes skip the per-product signals, so the search index, facet counts, catalog cache and
+#   leaderboard are not maintained row by row: `finishImport` rebuilds each of them once at the end.
+#   Sharded stock is re-spread per batch. New images need `manage.py generate_image_variants`.
+
+import csv
+import hashlib
+import json
+import os
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from base import catalog_cache, facets, leaderboard, search, shards
+from base.models import Product
+from base.streaming import CHUNK_SIZE, ExportEncoder, csvValue
+
+COLUMNS = ['sku', 'name', 'brand', 'category', 'description', 'price', 'countInStock', 'image']  # Feed columns
+BATCH_SIZE = 1000  # Products per upsert statement and transaction
+FORMATS = ('csv', 'jsonl')
+
+
+class FeedError(ValueError):
+    """
+    Raised for a feed row that cannot be imported; the row is skipped and reported.
+    """
+
+
+def feedFormat(path, format=None):
+    """
+    Returns the feed format: `format` if given, otherwise guessed from the file extension.
+    """
+    if format:
+        return format
+    return 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+
+def readFeed(file, format):
+    """
+    Yields `(line number, row dict)` for every row of a feed.
+
+    Args:
+        file: Text file object.
+        format (str): 'csv' or 'jsonl'.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield number, FeedError('invalid JSON (%s)' % error)
+            continue
+        yield number, row if isinstance(row, dict) else FeedError('a line must hold a JSON object')
+
+
+def parseRow(row):
+    """
+    Converts one feed row into model field values.
+
+    Returns:
+        dict: Values of the feed columns present in the row.
+
+    Raises:
+        FeedError: If the row is invalid.
+    """
+    if isinstance(row, FeedError):
+        raise row
+    unknown = set(row) - set(COLUMNS)
+    if unknown:
+        raise FeedError('unknown columns %s' % ', '.join(sorted(str(name) for name in unknown)))
+
+    values = {name: ('' if value is None else str(value).strip()) for name, value in row.items()}
+    if not values.get('sku'):
+        raise FeedError('sku is required')
+    for name in ('sku', 'name', 'brand', 'category'):
+        if name in values and len(values[name]) > Product._meta.get_field(name).max_length:
+            raise FeedError('%s is longer than %d characters' % (name, Product._meta.get_field(name).max_length))
+
+    if 'price' in values:
+        try:
+            values['price'] = Decimal(values['price']) if values['price'] else None
+            if values['price'] is not None and not values['price'].is_finite():
+                raise FeedError('price must be a number')  # NaN / Infinity parse but cannot be compared or stored
+        except InvalidOperation:
+            raise FeedError('price must be a number')
+        if values['price'] is not None and (values['price'] < 0 or values['price'] >= Decimal('100000')):
+            raise FeedError('price is out of range')
+    if 'countInStock' in values:
+        try:
+            values['countInStock'] = int(values['countInStock'] or 0)
+        except ValueError:
+            raise FeedError('countInStock must be a whole number')
+        if values['countInStock'] < 0:
+            raise FeedError('countInStock must not be negative')
+    return values
+
+
+class ImageStore:
+    """
+    Copies feed images into the media storage under content-hashed names (`products/<hash><ext>`).
+    Each source file is read once per import, however many products use it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.names = {}  # Storage name per source path
+
+    def store(self, path):
+        if self.directory is None:
+            return path  # Already a storage name (e.g. from catalog_export)
+        source = os.path.join(self.directory, path)
+        if source not in self.names:
+            try:
+                with open(source, 'rb') as file:
+                    digest = hashlib.sha256()
+                    for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                    name = 'products/%s%s' % (digest.hexdigest()[:16], os.path.splitext(path)[1].lower())
+                    if not default_storage.exists(name):
+                        file.seek(0)
+                        default_storage.save(name, File(file))
+            except OSError as error:
+                raise FeedError('image %s: %s' % (path, error.strerror or error))
+            self.names[source] = name
+        return self.names[source]
+
+
+def upsertBatch(rows, images):
+    """
+    Inserts or updates one batch of parsed rows in a single transaction.
+
+    Rows are written with one upsert per set of columns (JSON Lines rows may differ), so a
+    column missing from a row never overwrites the stored value.
+
+    Args:
+        rows (list): Parsed rows (`parseRow`), at most one per sku.
+        images (ImageStore): Resolves the `image` column.
+
+    Returns:
+        tuple: (products created, products updated).
+    """
+    groups = defaultdict(list)  # Rows per set of updated columns
+    for row in rows:
+        groups[tuple(sorted(set(row) - {'sku'}))].append(row)
+
+    with transaction.atomic():
+        existing = {
+            sku: (image, variants, stockShards, pk)
+            for sku, image, variants, stockShards, pk in Product.objects.filter(sku__in=[row['sku'] for row in rows])
+            .values_list('sku', 'image', 'imageVariants', 'stockShards', '_id')
+        }
+
+        for fields, group in groups.items():
+            products = []
+            for row in group:
+                current = existing.get(row['sku'])
+                values = dict(row)
+                if 'image' in fields:
+                    image = images.store(values['image']) if values['image'] else None
+                    oldImage = current[0] if current else None
+                    values['image'] = image or oldImage or Product._meta.get_field('image').default
+                    # Variants of the previous image no longer apply
+                    values['imageVariants'] = current[1] if current and values['image'] == oldImage else []
+                products.append(Product(**values))
+
+            updateFields = list(fields) + (['imageVariants'] if 'image' in fields else [])
+            if updateFields:
+                Product.objects.bulk_create(
+                    products, update_conflicts=True, unique_fields=['sku'], update_fields=updateFields)
+            else:
+                Product.objects.bulk_create(products, ignore_conflicts=True)  # Feed of skus only
+
+            # New stock of sharded products goes into their shards
+            if 'countInStock' in fields:
+                for product in products:
+                    current = existing.get(product.sku)
+                    if current and current[2]:
+                        shards.resetShards(Product(_id=current[3], countInStock=product.countInStock))
+
+    created = sum(1 for row in rows if row['sku'] not in existing)
+    return created, len(rows) - created
+
+
+def importFeed(file, format, imageDirectory=None, batchSize=BATCH_SIZE, onBatch=None, onError=None):
+    """
+    Imports a feed in batches of `batchSize` products.
+
+    Args:
+        file: Text file object to read from.
+        format (str): 'csv' or 'jsonl'.
+        imageDirectory (str): Directory `image` paths are relative to; None if the column holds
+            storage names.
+        batchSize (int): Products per transaction.
+        onBatch: Called with (rows read, created, updated, skipped) after each batch.
+        onError: Called with (line number, message) for every skipped row.
+
+    Returns:
+        dict: Totals: 'read', 'created', 'updated' and 'skipped'.
+    """
+    images = ImageStore(imageDirectory)
+    totals = {'read': 0, 'created': 0, 'updated': 0, 'skipped': 0}
+    batch = {}  # Parsed rows per sku; a sku repeated in a batch keeps its last row
+
+    def flush():
+        rows = list(batch.values())
+        batch.clear()
+        try:
+            created, updated = upsertBatch(rows, images)
+        except FeedError as error:
+            # An image failed: import the batch row by row to skip only the faulty rows
+            created = updated = 0
+            for row in rows:
+                try:
+                    rowCreated, rowUpdated = upsertBatch([row], images)
+                except FeedError as rowError:
+                    totals['skipped'] += 1
+                    if onError:
+                        onError('sku %s' % row['sku'], str(rowError))
+                    continue
+                created, updated = created + rowCreated, updated + rowUpdated
+        totals['created'] += created
+        totals['updated'] += updated
+        if onBatch:
+            onBatch(totals['read'], totals['created'], totals['updated'], totals['skipped'])
+
+    for number, row in readFeed(file, format):
+        totals['read'] += 1
+        try:
+            values = parseRow(row)
+        except FeedError as error:
+            totals['skipped'] += 1
+            if onError:
+                onError('line %d' % number, str(error))
+            continue
+        batch[values['sku']] = values
+        if len(batch) >= batchSize:
+            flush()
+    if batch:
+        flush()
+    return totals
+
+
+def finishImport():
+    """
+    Brings the derived data up to date after an import: one search index and facet count rebuild,
+    one catalog cache invalidation and one leaderboard rebuild.
+    """
+    search.rebuildIndex()
+    facets.rebuild()
+    catalog_cache.invalidateAll()
+    leaderboard.rebuild()
+
+
+def exportRows(products=None, chunkSize=CHUNK_SIZE):
+    """
+    Yields the feed columns of every product with a sku, in primary key order.
+    """
+    if products is None:
+        products = Product.objects.all()
+    rows = products.exclude(sku__isnull=True).order_by('_id').values(*COLUMNS)
+    return rows.iterator(chunk_size=chunkSize)
+
+
+def writeFeed(file, rows, format):
+    """
+    Writes rows from `exportRows` to a text file as CSV or JSON Lines.
+
+    Returns:
+        int: Number of rows written.
+    """
+    count = 0
+    if format == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow([csvValue(row[column]) for column in COLUMNS])
+            count += 1
+    else:
+        for row in rows:
+            file.write(json.dumps(row, cls=ExportEncoder) + '\n')
+            count += 1
+    return count
@@ -0,0 +1,28 @@
+# System checks run by `manage.py check` and at startup of runserver and the other commands.
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+
+LOCAL_CACHES = ('LocMemCache', 'DummyCache')  # Cache backends that other processes cannot see
+
+
+def sharedCache():
+    """
+    Tells whether the default cache is shared between processes (database, Redis, memcached).
+    """
+    return caches['default'].__class__.__name__ not in LOCAL_CACHES
+
+
+@checks.register(checks.Tags.caches)
+def checkSharedCache(app_configs, **kwargs):
+    # Catalog invalidation (base/catalog_cache.py) and leaderboard patches only reach the process
+    # that made the write when every process has its own cache
+    if sharedCache() or settings.DEBUG:
+        return []
+    return [checks.Error(
+        'The default cache is local to each process.',
+        hint='Other web workers and the job worker would keep serving stale products, prices and stock. '
+             'Use the database cache or set REDIS_URL (see CACHES in backend/settings.py).',
+        id='base.E001',
+    )]
@@ -0,0 +1,116 @@
+# Facet counts shown next to the catalog filters.
+#
+# Listings report how many products each category and brand has. The counts live in FacetCount
+# rows (one per value) that are moved by +1/-1 F() updates whenever a product is created, edited
+# or deleted (signals in base/signals.py), so a listing never runs a GROUP BY over the products.
+# The rows themselves are read once and cached until one of them changes.
+#
+# - Counts are catalog-wide: they do not depend on the filters of the request.
+# - Writes that bypass the signals call `applyChanges` (bulk product updates) or `rebuild`
+#   (catalog import). `manage.py rebuild_facets` recounts everything after manual data fixes.
+
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from base import catalog_cache
+from base.analytics import increment
+from base.models import FacetCount, Product
+
+FACETS = ('category', 'brand')  # Product fields with facet counts
+CACHE_KEY = 'catalog:facets'
+
+
+def facetValues(product):
+    """
+    Returns the facet values of a product instance, e.g. `{'category': 'Cars', 'brand': 'Audi'}`.
+    """
+    return {facet: getattr(product, facet) for facet in FACETS}
+
+
+def productChanges(old, new):
+    """
+    Lists the count changes of a product moving from `old` to `new` facet values.
+
+    Args:
+        old (dict): Values before the change (`facetValues`), None for a new product.
+        new (dict): Values after the change, None for a deleted product.
+
+    Returns:
+        list: (facet, value, delta) triples.
+    """
+    changes = []
+    for facet in FACETS:
+        before = old[facet] if old else None
+        after = new[facet] if new else None
+        if before != after:
+            changes += [(facet, before, -1), (facet, after, 1)]
+    return changes
+
+
+def applyChanges(changes):
+    """
+    Applies (facet, value, delta) count changes in the current transaction and drops the cached
+    counts once it commits. Empty values are not counted.
+    """
+    deltas = defaultdict(int)
+    for facet, value, delta in changes:
+        if value:
+            deltas[facet, value] += delta
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    # Rows are updated in key order, so concurrent writers lock them in the same order
+    for facet, value in sorted(deltas):
+        increment(FacetCount, {'facet': facet, 'value': value}, {'count': deltas[facet, value]})
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+def loadCounts():
+    # {facet: {value: count}}, most products first
+    counts = {facet: {} for facet in FACETS}
+    for facet, value, count in FacetCount.objects.filter(count__gt=0).order_by('facet', '-count', 'value') \
+            .values_list('facet', 'value', 'count'):
+        counts[facet][value] = count
+    cache.set(CACHE_KEY, counts, catalog_cache.TIMEOUT)
+    return counts
+
+
+def counts():
+    """
+    Returns the number of products per category and per brand, e.g.
+    `{'category': {'Cars': 12, ...}, 'brand': {'Audi': 3, ...}}`, most products first.
+    """
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        data = loadCounts()
+    return data
+
+
+async def acounts():
+    """
+    Async `counts`: the steady state is a single cache read.
+    """
+    data = await cache.aget(CACHE_KEY)
+    if data is None:
+        data = await sync_to_async(loadCounts)()
+    return data
+
+
+def rebuild():
+    """
+    Recounts every facet value from the products, replacing the stored counts.
+    """
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        rows = []
+        for facet in FACETS:
+            grouped = Product.objects.exclude(**{facet + '__isnull': True}).exclude(**{facet: ''}) \
+                .order_by().values(facet).annotate(count=Count('pk'))
+            rows += [FacetCount(facet=facet, value=row[facet], count=row['count']) for row in grouped]
+        FacetCount.objects.bulk_create(rows, batch_size=1000)
+        transaction.on_commit(lambda: cache.delete(CACHE_KEY))
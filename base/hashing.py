@@ -0,0 +1,138 @@
+# Password hashing in a dedicated process pool.
+#
+# Hashing or verifying a password (PBKDF2, hundreds of thousands of iterations) costs a few hundred
+# milliseconds of CPU. Run on the request threads, a burst of logins or registrations takes every
+# core of the web worker and catalog requests queue up behind it. Here the work goes to a small
+# pool of PASSWORD_HASH_WORKERS processes per web worker instead, so at most that many cores hash
+# passwords at any time.
+#
+# - At most PASSWORD_HASH_QUEUE calls may be running or waiting in the pool. A request that cannot
+#   get a slot within PASSWORD_HASH_WAIT seconds is answered with 503 and a Retry-After header
+#   (HashingBusy) instead of piling up more work.
+# - `checkPassword` also reports when the stored hash uses outdated parameters (another hasher, a
+#   lower iteration count, ...): the new hash is computed in the pool and saved on login.
+# - PASSWORD_HASH_WORKERS = 0 hashes inline (development, the test client).
+#
+# Used by `registerUser`, the profile updates and PooledModelBackend (login).
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+WORKERS = getattr(settings, 'PASSWORD_HASH_WORKERS', 2)  # Hashing processes per web worker, 0 = inline
+QUEUE_SIZE = getattr(settings, 'PASSWORD_HASH_QUEUE', max(WORKERS, 1) * 8)  # Calls running or waiting at once
+WAIT = getattr(settings, 'PASSWORD_HASH_WAIT', 2)  # Seconds a request waits for a slot before giving up
+
+slots = threading.BoundedSemaphore(QUEUE_SIZE)
+poolLock = threading.Lock()
+pool = None
+poolPid = None  # Process that created `pool` (a forked web worker must start its own)
+
+
+class HashingBusy(APIException):
+    """
+    Raised when the hashing pool is saturated; answered with 503 and Retry-After.
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-in requests right now, please try again in a moment.'
+    default_code = 'hashing_busy'
+    wait = 1  # Seconds sent in the Retry-After header
+
+
+def initWorker():
+    # Pool processes are started fresh (forkserver), so they load the settings themselves
+    if not apps.ready:
+        django.setup()
+
+
+def hashInWorker(password):
+    return make_password(password)
+
+
+def verifyInWorker(password, encoded):
+    # Returns (is the password correct, new hash when the stored one must be upgraded)
+    isCorrect, mustUpdate = verify_password(password, encoded)
+    return isCorrect, make_password(password) if isCorrect and mustUpdate else None
+
+
+def getPool():
+    """
+    Returns the process pool of this process, starting it on first use.
+    """
+    global pool, poolPid
+    with poolLock:
+        if pool is None or poolPid != os.getpid():
+            # forkserver: the pool processes do not inherit the threads and connections of the web worker
+            pool = ProcessPoolExecutor(
+                max_workers=WORKERS, mp_context=multiprocessing.get_context('forkserver'), initializer=initWorker)
+            poolPid = os.getpid()
+        return pool
+
+
+def resetPool(broken):
+    # Drops a pool whose processes died, the next call starts a new one
+    global pool
+    with poolLock:
+        if pool is broken:
+            pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def run(func, *args):
+    """
+    Runs `func(*args)` in the hashing pool and waits for the result.
+
+    Raises:
+        HashingBusy: When no slot frees up within PASSWORD_HASH_WAIT seconds.
+    """
+    if WORKERS <= 0:
+        return func(*args)
+
+    if not slots.acquire(timeout=WAIT):
+        raise HashingBusy()
+    try:
+        executor = getPool()
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            resetPool(executor)
+            raise HashingBusy()
+    finally:
+        slots.release()
+
+
+def hashPassword(password):
+    """
+    Hashes a password with the preferred hasher (same result as `make_password`).
+
+    Args:
+        password (str): Raw password.
+
+    Returns:
+        str: Encoded password to store in `User.password`.
+    """
+    return run(hashInWorker, password)
+
+
+def checkPassword(password, encoded):
+    """
+    Verifies a password against its stored hash.
+
+    Args:
+        password (str): Raw password.
+        encoded (str): Stored hash (`User.password`).
+
+    Returns:
+        tuple: (True if the password matches, new hash to store or None). A new hash is
+            returned when the password matches and the stored hash uses outdated parameters.
+    """
+    return run(verifyInWorker, password, encoded)
@@ -0,0 +1,138 @@
+# Idempotency keys for write endpoints (checkout and payment).
+#
+# A client may send an `Idempotency-Key` header with a POST/PUT. The first request with a key
+# stores an IdempotencyKey row (unique per user and key) and, once the view has answered, the
+# response. Retries with the same key:
+# - get the stored response replayed without running the view again,
+# - wait for the original request while it is still in flight (up to IDEMPOTENCY_WAIT_SECONDS),
+# - are rejected when the key is reused for a different request.
+# Server errors (5xx) are not stored, so the client can retry them. Expired keys are purged in
+# batches by `manage.py purge_idempotency_keys`.
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from base.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))  # Lifetime of a stored response
+WAIT_SECONDS = getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 10)  # Max wait for an in-flight original
+POLL_INTERVAL = 0.1  # Seconds between checks while waiting for the original request
+
+
+def fingerprint(request):
+    """
+    Returns a SHA-256 digest of the request method, path and parsed body.
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(('%s %s %s' % (request.method, request.path, body)).encode()).hexdigest()
+
+
+def claim(request, key, digest):
+    """
+    Inserts the IdempotencyKey row for `key`, replacing an expired one.
+
+    Returns:
+        IdempotencyKey | None: The new row, or None if another live request owns the key.
+    """
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=request.user, key=key, fingerprint=digest, expiresAt=timezone.now() + TTL)
+        except IntegrityError:
+            # An expired row does not count; drop it and try once more
+            expired = IdempotencyKey.objects.filter(user=request.user, key=key, expiresAt__lte=timezone.now()).delete()[0]
+            if not expired:
+                return None
+    return None
+
+
+def replay(request, key, digest):
+    """
+    Answers a duplicate request from the stored response, waiting for it while the original is in flight.
+    """
+    deadline = time.monotonic() + WAIT_SECONDS
+    while True:
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is None:
+            # The original failed with a server error and released the key
+            return Response({'detail': 'The original request failed, retry with the same key'},
+                            status=status.HTTP_409_CONFLICT)
+        if record.fingerprint != digest:
+            return Response({'detail': '%s was already used for a different request' % HEADER},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        if record.responseStatus is not None:
+            response = Response(record.responseBody, status=record.responseStatus)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        if time.monotonic() >= deadline:
+            response = Response({'detail': 'A request with this %s is still in progress' % HEADER},
+                                status=status.HTTP_409_CONFLICT)
+            response['Retry-After'] = '1'
+            return response
+        time.sleep(POLL_INTERVAL)
+
+
+def idempotent(view):
+    """
+    Decorator making a DRF function view honour the `Idempotency-Key` header.
+
+    Place it below `@api_view`/`@permission_classes` so it runs for authenticated requests only.
+    Requests without the header are passed through unchanged.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'detail': '%s must be at most 255 characters' % HEADER},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        digest = fingerprint(request)
+        record = claim(request, key, digest)
+        if record is None:
+            return replay(request, key, digest)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()  # Let the client retry after an unexpected error
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        record.responseStatus = response.status_code
+        record.responseBody = response.data
+        record.save(update_fields=['responseStatus', 'responseBody'])
+        return response
+
+    return wrapper
+
+
+def purgeExpired(batchSize=1000):
+    """
+    Deletes expired keys in batches of `batchSize` rows.
+
+    Returns:
+        int: Number of deleted keys.
+    """
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(expiresAt__lte=timezone.now())
+                   .values_list('_id', flat=True)[:batchSize])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(_id__in=ids).delete()[0]
@@ -0,0 +1,143 @@
+# Resized variants of product images.
+#
+# Listings used to download the uploaded original (often several MB) for every product card. After
+# an upload, a background job (`processProductImage`) renders the image at each width in
+# PRODUCT_IMAGE_WIDTHS, as JPEG (PNG when the image has transparency) and as WebP, and stores the
+# names in `Product.imageVariants`. The serializers expose them as URLs and `srcset` strings.
+#
+# - Variant names contain a hash of the original's bytes (`variants/<hash>-<width>w.<ext>`), so a
+#   URL never changes content and can be cached forever (see WHITENOISE_IMMUTABLE_FILE_TEST).
+#   Re-uploading the same picture reuses the existing files.
+# - Widths larger than the original are skipped; an image narrower than the smallest width gets
+#   one variant at its own size.
+# - A job for an image that has been replaced in the meantime does nothing.
+# - `manage.py generate_image_variants` queues jobs for products without variants.
+
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from base.models import Product
+from base.tasks import task
+
+WIDTHS = getattr(settings, 'PRODUCT_IMAGE_WIDTHS', (160, 320, 640, 1280))  # Variant widths in pixels
+JPEG_QUALITY = getattr(settings, 'PRODUCT_IMAGE_JPEG_QUALITY', 82)
+WEBP_QUALITY = getattr(settings, 'PRODUCT_IMAGE_WEBP_QUALITY', 80)
+DIRECTORY = 'variants'  # Storage directory of the variants
+
+
+def contentHash(file):
+    """
+    Returns the first 16 hex digits of the SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def variantWidths(width):
+    """
+    Returns the widths to render for an original `width` pixels wide.
+    """
+    return [size for size in WIDTHS if size <= width] or [width]
+
+
+def encode(image, format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def saveVariant(name, content):
+    # Content-addressed: an existing file with this name already holds the same image
+    if not default_storage.exists(name):
+        default_storage.save(name, content)
+    return name
+
+
+def renderVariants(file):
+    """
+    Renders and stores the variants of an image file.
+
+    Args:
+        file (File): The original image.
+
+    Returns:
+        list: One dict per width, `{'width', 'src', 'webp'}` with storage names, smallest first.
+    """
+    digest = contentHash(file)
+    file.seek(0)
+    with Image.open(file) as original:
+        original.draft('RGB', (max(WIDTHS), max(WIDTHS)))  # JPEG: decode at a reduced scale when possible
+        image = ImageOps.exif_transpose(original)  # Apply the camera rotation before resizing
+        transparent = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+        widths = variantWidths(image.size[0])
+
+        variants = []
+        for width in widths:
+            height = max(round(image.size[1] * width / image.size[0]), 1)
+            resized = image if width == image.size[0] else image.resize((width, height), Image.LANCZOS)
+            prefix = '%s/%s-%dw' % (DIRECTORY, digest, width)
+            if transparent:
+                src = saveVariant(prefix + '.png', encode(resized, 'PNG', optimize=True))
+            else:
+                src = saveVariant(prefix + '.jpg', encode(
+                    resized, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True))
+            webp = saveVariant(prefix + '.webp', encode(resized, 'WEBP', quality=WEBP_QUALITY, method=4))
+            variants.append({'width': width, 'src': src, 'webp': webp})
+    return variants
+
+
+@task(priority=3)  # Queued by uploadImage
+def processProductImage(productId, name):
+    """
+    Generates the variants of a product's image and records them on the product.
+
+    Args:
+        productId (int): Primary key (`_id`) of the product.
+        name (str): Storage name of the uploaded image; the job is skipped when the product's
+            image has changed since.
+    """
+    product = Product.objects.filter(_id=productId).first()
+    if product is None or product.image.name != name:
+        return
+
+    with product.image.open('rb') as file:
+        variants = renderVariants(file)
+
+    with transaction.atomic():
+        product = Product.objects.select_for_update().filter(_id=productId).first()
+        if product is None or product.image.name != name:
+            return  # Replaced while the variants were rendered
+        product.imageVariants = variants
+        product.save(update_fields=['imageVariants'])  # Signals refresh the cached catalog responses
+
+
+def variantUrls(product):
+    """
+    Returns the variants of a product's image as URLs, smallest first (empty until generated).
+    """
+    return [
+        {'width': variant['width'], 'url': default_storage.url(variant['src']), 'webp': default_storage.url(variant['webp'])}
+        for variant in product.imageVariants or []
+    ]
+
+
+def srcset(product):
+    """
+    Returns the `srcset` attribute values of a product's image per format, or None without variants.
+    """
+    variants = variantUrls(product)
+    if not variants:
+        return None
+    return {
+        'src': ', '.join('%s %dw' % (variant['url'], variant['width']) for variant in variants),
+        'webp': ', '.join('%s %dw' % (variant['webp'], variant['width']) for variant in variants),
+    }
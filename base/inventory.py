@@ -0,0 +1,213 @@
+# Stock holds.
+#
+# `Product.countInStock` is the stock available for sale and `Product.countReserved` the stock
+# held by orders that are not paid yet. Checkout moves units from the first counter to the
+# second and records a StockHold per product. Both counters are changed with conditional F()
+# updates instead of SELECT ... FOR UPDATE, so a product row is only locked from the UPDATE that
+# changes it until the checkout commits.
+#
+# - Paying the order confirms its holds: the reserved units leave the store.
+# - Holds of unpaid orders expire after STOCK_HOLD_TTL; `releaseExpired` (run periodically by
+#   `manage.py release_stock_holds`, and by a background job queued at checkout for the
+#   moment the holds expire) puts their units back on sale in batches. Checkouts share one
+#   sweep job per STOCK_HOLD_SWEEP_INTERVAL, so a rush of orders does not queue a sweep each.
+# - Paying an order whose holds were already released takes the stock again with the same
+#   conditional updates as checkout; if the units were sold in the meantime the payment is
+#   rejected (InsufficientStock) instead of overselling.
+# - Products with sharded stock (see base/shards.py) take and return units through their shards.
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from base import catalog_cache, shards, tasks
+from base.models import Product, StockHold
+
+HOLD_TTL = getattr(settings, 'STOCK_HOLD_TTL', timedelta(minutes=30))  # Lifetime of an unpaid hold
+SWEEP_INTERVAL = getattr(settings, 'STOCK_HOLD_SWEEP_INTERVAL', timedelta(minutes=1))  # Granularity of the queued sweeps
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a product does not have enough available stock for a hold.
+    """
+
+    def __init__(self, product):
+        super().__init__('Not enough stock for %s' % product.name)
+        self.product = product
+
+
+class HoldsChanged(Exception):
+    """
+    Raised when holds being moved were changed by another process in the meantime.
+    """
+
+
+def holdStock(order, quantities, products):
+    """
+    Holds stock for a new order. Must run inside the checkout transaction.
+
+    Args:
+        order (Order): The order being placed.
+        quantities (dict): Units per product id.
+        products (dict): Product instances per product id (used for error messages).
+
+    Raises:
+        InsufficientStock: If any product cannot cover its quantity; the caller's transaction
+            must then be rolled back.
+    """
+    for pk, qty in quantities.items():
+        if products[pk].stockShards:
+            updated = shards.takeStock(products[pk], qty)  # Hot product: take from one of its shards
+        else:
+            updated = Product.objects.filter(_id=pk, countInStock__gte=qty).update(
+                countInStock=F('countInStock') - qty, countReserved=F('countReserved') + qty)
+        if not updated:
+            raise InsufficientStock(products[pk])
+
+    expiresAt = timezone.now() + HOLD_TTL
+    StockHold.objects.bulk_create([
+        StockHold(product_id=pk, order=order, qty=qty, expiresAt=expiresAt)
+        for pk, qty in quantities.items()
+    ])
+    catalog_cache.invalidateProducts(quantities)
+    tasks.enqueue(releaseExpired.taskName, runAt=sweepTime(expiresAt), unique=True)  # Give the stock back if the order stays unpaid
+
+
+def sweepTime(expiresAt):
+    """
+    Rounds an expiry up to the next multiple of SWEEP_INTERVAL, the run time of the sweep job
+    shared by every hold expiring in that interval.
+    """
+    return tasks.slotTime(expiresAt, SWEEP_INTERVAL)
+
+
+def lockHolds(holds):
+    # Row-locks the selected holds; concurrent sweepers skip rows another one is working on
+    if connection.features.has_select_for_update_skip_locked:
+        return holds.select_for_update(skip_locked=True)
+    return holds.select_for_update()
+
+
+def moveStock(holds, status, inStock, reserved):
+    """
+    Switches `holds` to `status` and applies the per-unit counter changes to their products.
+
+    The status change is conditional on the status the holds were read with; if another
+    process changed one of them in between, the whole batch is rolled back.
+
+    Args:
+        holds (list): StockHold instances read inside the current transaction.
+        status (str): New status of the holds.
+        inStock (int): Change of `countInStock` per held unit (-1, 0 or +1).
+        reserved (int): Change of `countReserved` per held unit (-1 or 0).
+    """
+    byStatus = defaultdict(list)
+    for hold in holds:
+        byStatus[hold.status].append(hold._id)
+    for previous, ids in byStatus.items():
+        if StockHold.objects.filter(_id__in=ids, status=previous).update(status=status) != len(ids):
+            raise HoldsChanged()
+
+    units = defaultdict(int)
+    for hold in holds:
+        units[hold.product_id] += hold.qty
+    sharded = dict(Product.objects.filter(_id__in=units, stockShards__gt=0).values_list('_id', 'stockShards'))
+    for pk, qty in units.items():
+        if pk in sharded:
+            # Sharded products only track available units in their shards (reserved is reconciled)
+            if inStock:
+                shards.returnStock(pk, sharded[pk], inStock * qty)
+            else:
+                shards.scheduleReconcile()  # Only the reserved count changed
+            continue
+        changes = {}
+        if inStock:
+            changes['countInStock'] = F('countInStock') + inStock * qty
+        if reserved:
+            changes['countReserved'] = F('countReserved') + reserved * qty
+        if changes:
+            Product.objects.filter(_id=pk).update(**changes)
+    catalog_cache.invalidateProducts(units)
+
+
+def retakeStock(holds):
+    """
+    Takes the units of released holds from the available stock again, only where enough is left.
+    Must run inside a transaction.
+
+    Args:
+        holds (list): Released StockHold instances.
+
+    Raises:
+        InsufficientStock: If a product no longer has the units; the caller's transaction must
+            then be rolled back.
+    """
+    units = defaultdict(int)
+    for hold in holds:
+        units[hold.product_id] += hold.qty
+    products = Product.objects.only('_id', 'name', 'stockShards').in_bulk(list(units))
+    for pk, qty in sorted(units.items()):
+        product = products[pk]
+        if product.stockShards:
+            updated = shards.takeStock(product, qty)
+        else:
+            updated = Product.objects.filter(_id=pk, countInStock__gte=qty).update(countInStock=F('countInStock') - qty)
+        if not updated:
+            raise InsufficientStock(product)
+
+
+def confirmHolds(orderIds):
+    """
+    Confirms the stock holds of paid orders, all in one pass.
+
+    Held units leave the reserved counter; units whose hold was already released are taken
+    from the available stock again if it still has them.
+
+    Args:
+        orderIds (list): Primary keys (`_id`) of the orders that were paid.
+
+    Raises:
+        InsufficientStock: If the stock of a released hold was sold in the meantime. Nothing
+            is confirmed; the caller should not mark the orders paid.
+        HoldsChanged: If another process changed the holds concurrently.
+    """
+    with transaction.atomic():
+        holds = list(StockHold.objects.select_for_update().filter(
+            order_id__in=list(orderIds), status__in=[StockHold.HELD, StockHold.RELEASED]))
+        held = [hold for hold in holds if hold.status == StockHold.HELD]
+        released = [hold for hold in holds if hold.status == StockHold.RELEASED]
+        if held:
+            moveStock(held, StockHold.CONFIRMED, inStock=0, reserved=-1)
+        if released:
+            retakeStock(released)
+            moveStock(released, StockHold.CONFIRMED, inStock=0, reserved=0)
+
+
+@tasks.task()
+def releaseExpired(batchSize=500):
+    """
+    Puts the stock of expired, unpaid holds back on sale, one batch per transaction.
+
+    Args:
+        batchSize (int): Holds released per transaction.
+
+    Returns:
+        int: Number of released holds.
+    """
+    released = 0
+    while True:
+        try:
+            with transaction.atomic():
+                expired = StockHold.objects.filter(status=StockHold.HELD, expiresAt__lte=timezone.now())
+                holds = list(lockHolds(expired.order_by('expiresAt'))[:batchSize])
+                if not holds:
+                    return released
+                moveStock(holds, StockHold.RELEASED, inStock=1, reserved=-1)
+        except HoldsChanged:
+            continue  # Some holds were paid meanwhile; read the batch again
+        released += len(holds)
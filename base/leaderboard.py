@@ -0,0 +1,134 @@
+# Top-products leaderboard served by `getTopProducts`.
+# The top N products (rating >= TOP_PRODUCTS_MIN_RATING, ties broken by numReviews) are kept
+# in the cache as compact product cards, so the home page carousel does not touch the database.
+# Rating changes (reviews, admin edits) patch the cached board in place from a background job
+# (see base/tasks.py) and deletes patch it immediately; the database is only queried when the
+# board is missing or a listed product could be overtaken by an unlisted one.
+# The patches are made by the job worker, so the board needs a cache shared with the web
+# processes (see CACHES in backend/settings.py; `run_worker` refuses a per-process cache).
+
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from base.models import Product
+from base.serializers import ProductCardSerializer
+from base.tasks import task
+
+CACHE_KEY = 'leaderboard:top-products'
+
+COUNT = getattr(settings, 'TOP_PRODUCTS_COUNT', 5)  # Size of the board
+MIN_RATING = getattr(settings, 'TOP_PRODUCTS_MIN_RATING', 4)  # Minimum rating to be listed
+TIMEOUT = getattr(settings, 'TOP_PRODUCTS_TIMEOUT', 60 * 5)  # Cache lifetime in seconds
+
+CARD_FIELDS = set(ProductCardSerializer.Meta.fields)  # Product fields shown on a card
+
+
+def ranked(products):
+    """
+    Orders a product queryset the way the board is ordered.
+    """
+    return products.filter(rating__gte=MIN_RATING).order_by('-rating', '-numReviews', '_id')
+
+
+def sortKey(card):
+    # Same order as `ranked`: best rating, then most reviews, then oldest product
+    return (-Decimal(card['rating']), -(card['numReviews'] or 0), card['_id'])
+
+
+def rebuild():
+    """
+    Reloads the board from the database and stores it in the cache.
+
+    Returns:
+        list: The product cards, best first.
+    """
+    cards = [dict(card) for card in ProductCardSerializer(ranked(Product.objects.all())[:COUNT], many=True).data]
+    cache.set(CACHE_KEY, cards, TIMEOUT)
+    return cards
+
+
+def topProducts():
+    """
+    Returns the cached board, rebuilding it on a cache miss.
+    """
+    cards = cache.get(CACHE_KEY)
+    if cards is None:
+        cards = rebuild()
+    return cards
+
+
+async def atopProducts():
+    """
+    Async `topProducts`: the steady state is a single cache read.
+    """
+    cards = await cache.aget(CACHE_KEY)
+    if cards is None:
+        cards = await sync_to_async(rebuild)()
+    return cards
+
+
+def updateProduct(product):
+    """
+    Applies a change of `product` (rating, numReviews or card fields) to the cached board.
+
+    Args:
+        product (Product): Product instance holding the new values.
+    """
+    cards = cache.get(CACHE_KEY)
+    if cards is None:
+        return  # Nothing cached, the next read rebuilds the board
+
+    full = len(cards) >= COUNT  # A board that is not full lists every qualifying product
+    listed = any(card['_id'] == product._id for card in cards)
+    cards = [card for card in cards if card['_id'] != product._id]
+
+    if product.rating is None or product.rating < MIN_RATING:
+        if listed and full:
+            rebuild()  # An unlisted product moves up to take the free spot
+        elif listed:
+            cache.set(CACHE_KEY, cards, TIMEOUT)
+        return
+
+    cards.append(dict(ProductCardSerializer(product).data))
+    cards.sort(key=sortKey)
+
+    if listed and full and cards[-1]['_id'] == product._id:
+        rebuild()  # The product dropped to the last spot; an unlisted one may now rank higher
+        return
+
+    cache.set(CACHE_KEY, cards[:COUNT], TIMEOUT)
+
+
+def removeProduct(pk):
+    """
+    Takes a deleted product off the cached board.
+
+    Args:
+        pk (int): Primary key (`_id`) of the deleted product.
+    """
+    cards = cache.get(CACHE_KEY)
+    if cards is None or not any(card['_id'] == pk for card in cards):
+        return
+
+    if len(cards) >= COUNT:
+        cache.delete(CACHE_KEY)  # Refill the free spot from the database on the next read
+    else:
+        cache.set(CACHE_KEY, [card for card in cards if card['_id'] != pk], TIMEOUT)
+
+
+@task(priority=5)  # Queued after rating and card changes
+def productChanged(pk):
+    """
+    Re-reads a product whose aggregates were changed with a bulk UPDATE and updates the board.
+
+    Args:
+        pk (int): Primary key (`_id`) of the product.
+    """
+    product = Product.objects.filter(_id=pk).first()
+    if product is None:
+        removeProduct(pk)
+    else:
+        updateProduct(product)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from base.analytics import rebuildRollups
+
+
+class Command(BaseCommand):
+    # Recounts the sales rollup tables (base/analytics.py) from the order history, e.g. after
+    # deploying them or fixing order data by hand. Orders are scanned in chunks, one transaction each.
+    help = 'Rebuilds the daily sales rollups from all orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Orders per transaction')
+
+    def handle(self, *args, **options):
+        scanned = rebuildRollups(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS('Rolled up %d orders' % scanned))
@@ -0,0 +1,82 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+
+from base import hashing
+
+
+class Command(BaseCommand):
+    # Catalog latency during a login storm (base/hashing.py).
+    # One client requests the catalog back to back while several others log in as fast as they
+    # can. The catalog latency is reported without logins, with password checks in the hashing
+    # pool and with password checks inline on the request threads (PASSWORD_HASH_WORKERS = 0).
+    # Requests go through the full middleware and view stack in this process, like one web worker
+    # with a thread per request.
+    help = 'Measures catalog latency while many clients log in at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=16, help='Concurrent login clients')
+        parser.add_argument('--seconds', type=float, default=10, help='Duration of each round')
+        parser.add_argument('--path', default='/api/products/', help='Catalog URL to time')
+
+    def handle(self, *args, **options):
+        username = 'login-storm-benchmark@example.com'
+        User.objects.filter(username=username).delete()
+        User.objects.create_user(username=username, email=username, password='benchmark-password')
+        try:
+            self.stdout.write('%-8s %10s %10s %10s %10s %8s' % ('logins', 'catalog/s', 'p50 ms', 'p95 ms', 'logins/s', 'busy'))
+            for label, workers in (('none', None), ('pool', hashing.WORKERS), ('inline', 0)):
+                catalog, logins, busy = self.run(options, username, workers)
+                self.stdout.write('%-8s %10.0f %10.1f %10.1f %10.1f %8d' % (
+                    label, len(catalog) / options['seconds'], statistics.median(catalog) * 1000,
+                    statistics.quantiles(catalog, n=20)[-1] * 1000, logins / options['seconds'], busy))
+        finally:
+            User.objects.filter(username=username).delete()
+
+    def run(self, options, username, workers):
+        # One round; `workers` None means no logins at all. Returns (catalog latencies, logins, 503s)
+        previous = hashing.WORKERS
+        if workers is not None:
+            hashing.WORKERS = workers
+        stop = threading.Event()
+        latencies, results = [], []
+        storm = options['logins'] if workers is not None else 0
+
+        def catalog():
+            client = Client(HTTP_HOST='localhost')
+            try:
+                while not stop.is_set():
+                    began = time.perf_counter()
+                    client.get(options['path'])
+                    latencies.append(time.perf_counter() - began)
+            finally:
+                connection.close()
+
+        def login():
+            client = Client(HTTP_HOST='localhost')
+            done = busy = 0
+            try:
+                while not stop.is_set():
+                    response = client.post('/api/users/login/', {'username': username, 'password': 'benchmark-password'})
+                    done += response.status_code == 200
+                    busy += response.status_code == 503
+            finally:
+                results.append((done, busy))
+                connection.close()
+
+        threads = [threading.Thread(target=catalog)] + [threading.Thread(target=login) for _ in range(storm)]
+        try:
+            for thread in threads:
+                thread.start()
+            time.sleep(options['seconds'])
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            hashing.WORKERS = previous
+        return latencies, sum(done for done, _ in results), sum(busy for _, busy in results)
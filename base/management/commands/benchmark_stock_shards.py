@@ -0,0 +1,66 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+
+from base import shards
+from base.models import Product
+
+
+class Command(BaseCommand):
+    # Concurrency benchmark for sharded stock (base/shards.py).
+    # Several threads take one unit at a time from the same temporary product, each take in its
+    # own transaction like a checkout, and the throughput is reported for every shard count.
+    # Run it against the production database engine: SQLite serializes all writers, so it only
+    # shows the per-take overhead there, while PostgreSQL shows the row-contention effect.
+    help = 'Measures stock-taking throughput of one hot product for different shard counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Shard counts to compare')
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent buyers')
+        parser.add_argument('--takes', type=int, default=200, help='Units taken by each buyer')
+
+    def handle(self, *args, **options):
+        threads, takes = options['threads'], options['takes']
+        product = Product.objects.create(name='Stock shard benchmark', countInStock=threads * takes)
+        try:
+            self.stdout.write('%8s %12s %10s %8s' % ('shards', 'takes/sec', 'seconds', 'errors'))
+            for count in options['shards']:
+                shards.enableShards(product, 0)  # Collect the previous round's shards before refilling
+                Product.objects.filter(_id=product._id).update(countInStock=threads * takes)
+                shards.enableShards(product, count)
+                product.refresh_from_db()
+                elapsed, errors = self.run(product, threads, takes)
+                self.stdout.write('%8d %12.0f %10.2f %8d' % (count, threads * takes / elapsed, elapsed, errors))
+        finally:
+            product.delete()
+
+    def run(self, product, threads, takes):
+        # Starts all buyers at once and returns (elapsed seconds, failed takes)
+        errors = []
+        start = threading.Barrier(threads + 1)
+
+        def buyer():
+            start.wait()
+            failed = 0
+            try:
+                for _ in range(takes):
+                    try:
+                        with transaction.atomic():
+                            if not shards.takeStock(product, 1):
+                                failed += 1
+                    except DatabaseError:
+                        failed += 1
+            finally:
+                errors.append(failed)
+                connection.close()
+
+        workers = [threading.Thread(target=buyer) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        start.wait()
+        began = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - began, sum(errors)
@@ -0,0 +1,32 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from base import catalog_feed
+
+
+class Command(BaseCommand):
+    # Writes the catalog as a feed that catalog_import reads back (see base/catalog_feed.py).
+    # Products are read in chunks, so the export runs in constant memory.
+    help = 'Exports all products with a SKU as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, '-' for standard output")
+        parser.add_argument('--format', choices=catalog_feed.FORMATS, help='Feed format (default: from the file extension)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = catalog_feed.feedFormat(path, options['format'])
+        began = time.monotonic()
+
+        file = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            count = catalog_feed.writeFeed(file, catalog_feed.exportRows(), format)
+        finally:
+            if file is not sys.stdout:
+                file.close()
+
+        elapsed = time.monotonic() - began
+        # Standard error, so the summary never ends up in a feed written to standard output
+        self.stderr.write('Exported %d products in %.1fs (%.0f rows/s)' % (count, elapsed, count / max(elapsed, 1e-9)))
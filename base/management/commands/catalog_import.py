@@ -0,0 +1,57 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base import catalog_feed
+
+
+class Command(BaseCommand):
+    # Loads a supplier feed (CSV or JSON Lines, keyed on sku) into the catalog, see base/catalog_feed.py.
+    # Products are upserted in batches, one transaction each; the search index, catalog cache and
+    # top-products board are rebuilt once at the end.
+    help = 'Imports products from a CSV or JSON Lines feed, inserting new SKUs and updating existing ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file, '-' for standard input")
+        parser.add_argument('--format', choices=catalog_feed.FORMATS, help='Feed format (default: from the file extension)')
+        parser.add_argument('--images', help='Directory the paths in the image column are relative to')
+        parser.add_argument('--batch-size', type=int, default=catalog_feed.BATCH_SIZE, help='Products per transaction')
+        parser.add_argument('--progress', type=float, default=5, help='Seconds between progress lines')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = catalog_feed.feedFormat(path, options['format'])
+        began = lastReport = time.monotonic()
+
+        def onBatch(read, created, updated, skipped):
+            nonlocal lastReport
+            now = time.monotonic()
+            if now - lastReport >= options['progress']:
+                lastReport = now
+                self.stdout.write('%d rows read, %d created, %d updated, %d skipped (%.0f rows/s)' % (
+                    read, created, updated, skipped, read / (now - began)))
+
+        def onError(where, message):
+            self.stderr.write('%s: %s' % (where, message))
+
+        try:
+            file = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        except OSError as error:
+            raise CommandError('Cannot read %s: %s' % (path, error.strerror))
+        try:
+            totals = catalog_feed.importFeed(
+                file, format, imageDirectory=options['images'], batchSize=options['batch_size'],
+                onBatch=onBatch, onError=onError)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+            # Batches committed before a failure are live as well
+            self.stdout.write('Rebuilding the search index, catalog cache and top products...')
+            catalog_feed.finishImport()
+
+        elapsed = time.monotonic() - began
+        self.stdout.write(self.style.SUCCESS('%d rows in %.1fs (%.0f rows/s): %d created, %d updated, %d skipped' % (
+            totals['read'], elapsed, totals['read'] / max(elapsed, 1e-9), totals['created'], totals['updated'], totals['skipped'])))
+        if totals['skipped']:
+            self.stdout.write(self.style.WARNING('Skipped rows are listed above'))
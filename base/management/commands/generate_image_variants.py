@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from base import images
+from base.models import Product
+
+
+class Command(BaseCommand):
+    # Generates the resized variants (base/images.py) of images uploaded before the variants
+    # existed, or of all images after PRODUCT_IMAGE_WIDTHS changed (--all).
+    help = 'Queues variant generation for product images without variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate the variants of every product image')
+        parser.add_argument('--now', action='store_true', help='Render in this process instead of the background worker')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            products = products.filter(imageVariants=[])
+
+        count = 0
+        for productId, name in products.values_list('_id', 'image').iterator():
+            if options['now']:
+                try:
+                    images.processProductImage(productId, name)
+                except (OSError, ValueError) as error:  # Missing or unreadable files
+                    self.stderr.write('Product %s: %s' % (productId, error))
+                    continue
+            else:
+                images.processProductImage.defer(productId, name)
+            count += 1
+        self.stdout.write(self.style.SUCCESS('%s %d product images' % ('Processed' if options['now'] else 'Queued', count)))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from base.idempotency import purgeExpired
+
+
+class Command(BaseCommand):
+    # Deletes expired Idempotency-Key records in batches. Meant to run periodically (e.g. cron).
+    help = 'Deletes expired idempotency keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        deleted = purgeExpired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Deleted %d expired idempotency keys' % deleted))
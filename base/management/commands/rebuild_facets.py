@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from base import facets
+from base.models import FacetCount
+
+
+class Command(BaseCommand):
+    # Recounts the products per category and brand shown next to the catalog filters.
+    # The counts are normally maintained incrementally; use this after manual data fixes.
+    help = 'Rebuilds the catalog facet counts from the product table'
+
+    def handle(self, *args, **options):
+        facets.rebuild()
+        self.stdout.write(self.style.SUCCESS('Rebuilt %d facet counts' % FacetCount.objects.count()))
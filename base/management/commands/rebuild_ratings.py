@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from base.models import Product
+from base.ratings import rebuildRatings
+
+
+class Command(BaseCommand):
+    # Recomputes every product's rating sum, review count, average and star histogram from the review table.
+    # The aggregates are normally maintained incrementally; use this after manual data fixes.
+    help = 'Rebuilds product rating aggregates from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('products', nargs='*', type=int, help='Only rebuild these product ids')
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['products']:
+            products = products.filter(_id__in=options['products'])
+
+        rebuildRatings(products)
+        self.stdout.write(self.style.SUCCESS('Rebuilt rating aggregates for %d products' % products.count()))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from base import search
+
+
+class Command(BaseCommand):
+    # Rebuilds the full-text product search index from the product table.
+    # Useful after bulk loads that bypass model signals.
+    help = 'Rebuilds the full-text product search index'
+
+    def handle(self, *args, **options):
+        if not search.isEnabled():
+            self.stdout.write(self.style.WARNING('No search index on this database, nothing to do'))
+            return
+
+        search.rebuildIndex()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from base import shards
+from base.inventory import releaseExpired
+
+
+class Command(BaseCommand):
+    # Puts the stock of expired, unpaid order holds back on sale and reconciles the stock counters
+    # of sharded products. Meant to run periodically (e.g. cron).
+    help = 'Releases expired stock holds in batches and reconciles sharded stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Holds released per transaction')
+
+    def handle(self, *args, **options):
+        released = releaseExpired(options['batch_size'])
+        shards.reconcile()
+        self.stdout.write(self.style.SUCCESS('Released %d expired stock holds' % released))
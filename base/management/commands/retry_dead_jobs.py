@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from base import tasks
+from base.models import DeadJob
+
+
+class Command(BaseCommand):
+    # Moves jobs from the dead-letter table back into the background queue, e.g. after fixing the
+    # cause of their failure. Without arguments every dead job is retried.
+    help = 'Queues dead background jobs again'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', type=int, nargs='*', help='Dead job ids (all by default)')
+        parser.add_argument('--name', help='Only retry jobs of this task')
+
+    def handle(self, *args, **options):
+        deadJobs = DeadJob.objects.all()
+        if options['ids']:
+            deadJobs = deadJobs.filter(_id__in=options['ids'])
+        if options['name']:
+            deadJobs = deadJobs.filter(name=options['name'])
+
+        queued = tasks.retryDead(deadJobs)
+        self.stdout.write(self.style.SUCCESS('Queued %d dead jobs again' % queued))
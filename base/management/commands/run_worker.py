@@ -0,0 +1,84 @@
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from base import tasks
+from base.checks import sharedCache
+
+STALE_CHECK_INTERVAL = 60  # Seconds between checks for jobs of dead workers
+
+
+def runPool(threads, burst):
+    """
+    Runs `threads` worker threads in the current process until SIGTERM/SIGINT (or, with `burst`,
+    until no job is due).
+
+    Returns:
+        int: Number of jobs run.
+    """
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())  # Finish the current jobs, then exit
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='worker') as pool:
+        futures = [pool.submit(tasks.work, stop, burst) for _ in range(threads)]
+        while True:
+            tasks.requeueStale()
+            if not wait(futures, timeout=STALE_CHECK_INTERVAL).not_done:
+                break
+    connection.close()
+    return sum(future.result() for future in futures)
+
+
+class Command(BaseCommand):
+    # Runs the background task queue (base/tasks.py): a pool of threads in one or more processes
+    # claiming jobs from the database. Stop it with SIGTERM/Ctrl-C; running jobs are finished first.
+    help = 'Runs queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=getattr(settings, 'TASK_QUEUE_THREADS', 4),
+                            help='Worker threads per process')
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'TASK_QUEUE_PROCESSES', 1),
+                            help='Worker processes (for CPU-bound tasks)')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due instead of waiting for new ones')
+
+    def handle(self, *args, **options):
+        threads, processes, burst = options['threads'], options['processes'], options['burst']
+        if threads < 1 or processes < 1:
+            raise CommandError('--threads and --processes must be at least 1')
+
+        if not sharedCache():
+            raise CommandError('The default cache is local to each process: jobs would only update the worker\'s own '
+                               'copy of the leaderboard and catalog cache. Configure a shared cache (see CACHES).')
+
+        tasks.autodiscover()
+        self.stdout.write('Worker started: %d process(es) x %d thread(s), tasks: %s'
+                          % (processes, threads, ', '.join(sorted(tasks.REGISTRY))))
+
+        if processes == 1:
+            done = runPool(threads, burst)
+            self.stdout.write(self.style.SUCCESS('Worker stopped after %d jobs' % done))
+            return
+
+        # Database connections must not be shared with the forked children
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [context.Process(target=runPool, args=(threads, burst), daemon=False) for _ in range(processes)]
+        for child in children:
+            child.start()
+
+        def forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: the child finishes its running jobs
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for child in children:
+            child.join()
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
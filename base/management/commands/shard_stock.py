@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base import shards
+from base.models import Product
+
+
+class Command(BaseCommand):
+    # Switches sharded stock counters on (K > 0) or off (K = 0) for a product, see base/shards.py.
+    help = 'Splits the stock of a product over K counter rows (0 turns sharding off)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product', type=int, help='Product id')
+        parser.add_argument('shards', type=int, help='Number of shards, 0 to turn sharding off')
+
+    def handle(self, *args, **options):
+        if options['shards'] < 0:
+            raise CommandError('The number of shards cannot be negative')
+        try:
+            product = Product.objects.get(_id=options['product'])
+        except Product.DoesNotExist:
+            raise CommandError('Product %s does not exist' % options['product'])
+
+        shards.enableShards(product, options['shards'])
+        self.stdout.write(self.style.SUCCESS('Product %s now uses %d stock shards' % (product._id, options['shards'])))
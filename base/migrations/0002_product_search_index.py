@@ -0,0 +1,61 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def createSearchIndex(apps, schema_editor):
+    # Creates the full-text index table for the current database and fills it from base_product
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE base_product_fts USING fts5("
+                "name, brand, category, description, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        except OperationalError:
+            return  # SQLite was built without FTS5, search falls back to name__icontains
+        schema_editor.execute(
+            "INSERT INTO base_product_fts (rowid, name, brand, category, description) "
+            "SELECT _id, name, brand, category, description FROM base_product"
+        )
+
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE base_product_search ("
+            "product_id integer PRIMARY KEY REFERENCES base_product (_id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX base_product_search_document_idx ON base_product_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO base_product_search (product_id, document) SELECT _id, "
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(brand, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C') "
+            "FROM base_product"
+        )
+
+
+def dropSearchIndex(apps, schema_editor):
+    # Drops whichever index table exists on the current database
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS base_product_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS base_product_search")
+
+
+class Migration(migrations.Migration):
+
+    # Adds the full-text product search index used by base/search.py
+    dependencies = [
+        ('base', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(createSearchIndex, dropSearchIndex),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, F, FloatField, Min, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+
+def removeDuplicateReviews(apps, schema_editor):
+    # Keeps only the first review per (product, user) so the unique constraint can be added
+    Review = apps.get_model('base', 'Review')
+    duplicates = (Review.objects.filter(product__isnull=False, user__isnull=False)
+                  .values('product', 'user').annotate(first=Min('_id'), count=Count('_id')).filter(count__gt=1))
+    for row in duplicates:
+        Review.objects.filter(product=row['product'], user=row['user']).exclude(_id=row['first']).delete()
+
+
+def backfillRatingAggregates(apps, schema_editor):
+    # Fills ratingSum/numReviews/rating from the existing reviews
+    Product = apps.get_model('base', 'Product')
+    Review = apps.get_model('base', 'Review')
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    Product.objects.update(
+        ratingSum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+        numReviews=Coalesce(Subquery(reviews.annotate(count=Count('pk')).values('count')), 0),
+    )
+    # Same expression as ratings.averageRating: products without reviews get 0, not their seed rating
+    Product.objects.update(rating=Case(
+        When(numReviews=0, then=Value(0)),
+        default=Cast(F('ratingSum'), FloatField()) / F('numReviews'),
+        output_field=DecimalField(max_digits=7, decimal_places=2),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0003_listing_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='ratingSum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(removeDuplicateReviews, migrations.RunPython.noop),
+        migrations.RunPython(backfillRatingAggregates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('product', 'user'), name='unique_product_review'),
+        ),
+    ]
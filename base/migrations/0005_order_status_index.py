@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0004_review_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['isPaid', 'isDelivered', 'createdAt'], name='order_status_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='countReserved',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('qty', models.IntegerField()),
+                ('status', models.CharField(choices=[('held', 'Held'), ('confirmed', 'Confirmed'), ('released', 'Released')], default='held', max_length=10)),
+                ('expiresAt', models.DateTimeField()),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expiresAt'], name='stockhold_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_stock_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stockShards',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('index', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stockshard',
+            constraint=models.UniqueConstraint(fields=('product', 'index'), name='unique_stock_shard'),
+        ),
+    ]
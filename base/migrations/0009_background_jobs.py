@@ -0,0 +1,48 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_stock_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadJob',
+            fields=[
+                ('name', models.CharField(max_length=100)),
+                ('args', models.JSONField(blank=True, default=list)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('priority', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('createdAt', models.DateTimeField()),
+                ('failedAt', models.DateTimeField(auto_now_add=True)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('name', models.CharField(max_length=100)),
+                ('args', models.JSONField(blank=True, default=list)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('priority', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running')], default='queued', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('maxAttempts', models.IntegerField(default=5)),
+                ('runAt', models.DateTimeField()),
+                ('lockedBy', models.CharField(blank=True, max_length=100, null=True)),
+                ('lockedAt', models.DateTimeField(blank=True, null=True)),
+                ('lastError', models.TextField(blank=True, null=True)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'priority', 'runAt'], name='job_claim_idx')],
+            },
+        ),
+    ]
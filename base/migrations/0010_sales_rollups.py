@@ -0,0 +1,77 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=200)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paidOrders', models.IntegerField(default=0)),
+                ('paidUnits', models.IntegerField(default=0)),
+                ('paidRevenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('day', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paidOrders', models.IntegerField(default=0)),
+                ('paidUnits', models.IntegerField(default=0)),
+                ('paidRevenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('day', models.DateField(unique=True)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paidOrders', models.IntegerField(default=0)),
+                ('paidUnits', models.IntegerField(default=0)),
+                ('paidRevenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='isPaidRolledUp',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='isRolledUp',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategorysales',
+            constraint=models.UniqueConstraint(fields=('day', 'category'), name='unique_daily_category_sales'),
+        ),
+        migrations.AddField(
+            model_name='dailyproductsales',
+            name='product',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='base.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('day', 'product'), name='unique_daily_product_sales'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+def createUserIndexes(apps, schema_editor):
+    # Indexes on auth_user for the admin user directory (prefix search and the staff filter).
+    # `email__istartswith` runs as `UPPER(email::text) LIKE UPPER('ab%')` on PostgreSQL and as
+    # a case-insensitive `LIKE 'ab%'` on SQLite, so each database gets the matching index.
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute("CREATE INDEX IF NOT EXISTS auth_user_email_prefix_idx ON auth_user (email COLLATE NOCASE)")
+        schema_editor.execute("CREATE INDEX IF NOT EXISTS auth_user_name_prefix_idx ON auth_user (first_name COLLATE NOCASE)")
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS auth_user_email_prefix_idx ON auth_user (UPPER(email::text) text_pattern_ops)")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS auth_user_name_prefix_idx ON auth_user (UPPER(first_name::text) text_pattern_ops)")
+    else:
+        return
+
+    # Few users are staff: a partial index lists them newest first without scanning everyone
+    schema_editor.execute("CREATE INDEX IF NOT EXISTS auth_user_staff_idx ON auth_user (id) WHERE is_staff")
+
+
+def dropUserIndexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    for name in ('auth_user_email_prefix_idx', 'auth_user_name_prefix_idx', 'auth_user_staff_idx'):
+        schema_editor.execute("DROP INDEX IF EXISTS %s" % name)
+
+
+class Migration(migrations.Migration):
+
+    # Adds the auth_user indexes used by the admin user directory (getUserDirectory)
+    dependencies = [
+        ('base', '0010_sales_rollups'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(createUserIndexes, dropUserIndexes),
+    ]
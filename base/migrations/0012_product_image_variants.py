@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_user_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='imageVariants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
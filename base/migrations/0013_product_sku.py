@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:37
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+
+def assignSkus(apps, schema_editor):
+    # Existing products get `AM-<id>`, so every product can be exported and updated by a feed
+    Product = apps.get_model('base', 'Product')
+    Product.objects.filter(sku__isnull=True).update(sku=Concat(Value('AM-'), Cast('_id', CharField())))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(assignSkus, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfillRatingHistogram(apps, schema_editor):
+    # Counts the existing reviews per star rating, in one UPDATE over all products
+    Product = apps.get_model('base', 'Product')
+    Review = apps.get_model('base', 'Review')
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    Product.objects.update(**{
+        'ratingCount%d' % stars: Coalesce(
+            Subquery(reviews.filter(rating=stars).annotate(count=Count('pk')).values('count')), 0)
+        for stars in range(1, 6)
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_product_sku'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='ratingCount1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='ratingCount2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='ratingCount3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='ratingCount4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='ratingCount5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfillRatingHistogram, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'createdAt', '_id'], name='review_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'rating', 'createdAt', '_id'], name='review_product_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fillMissingRatings(apps, schema_editor):
+    # Products never reviewed had no rating; 0 (as after removing all reviews) lets them be sorted by rating
+    Product = apps.get_model('base', 'Product')
+    Product.objects.filter(rating__isnull=True).update(rating=0)
+
+
+def backfillFacetCounts(apps, schema_editor):
+    # Counts the existing products per category and per brand
+    Product = apps.get_model('base', 'Product')
+    FacetCount = apps.get_model('base', 'FacetCount')
+    rows = []
+    for facet in ('category', 'brand'):
+        grouped = Product.objects.exclude(**{facet + '__isnull': True}).exclude(**{facet: ''}) \
+            .order_by().values(facet).annotate(count=Count('pk'))
+        rows += [FacetCount(facet=facet, value=row[facet], count=row['count']) for row in grouped]
+    FacetCount.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0014_review_pages_and_histogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=200)),
+                ('count', models.IntegerField(default=0)),
+                ('_id', models.AutoField(editable=False, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='rating',
+            field=models.DecimalField(blank=True, decimal_places=2, default=0, max_digits=7, null=True),
+        ),
+        migrations.RunPython(fillMissingRatings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', '_id'], name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['rating', '_id'], name='product_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'createdAt', '_id'], name='product_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'price', '_id'], name='product_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'rating', '_id'], name='product_category_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['brand', 'createdAt', '_id'], name='product_brand_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['brand', 'price', '_id'], name='product_brand_price_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('facet', 'value'), name='unique_facet_value'),
+        ),
+        migrations.RunPython(backfillFacetCounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:40
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def createCacheTable(apps, schema_editor):
+    # Table of the DatabaseCache used when no REDIS_URL is set (no-op for other cache backends)
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_catalog_facets'),
+    ]
+
+    operations = [
+        migrations.RunPython(createCacheTable, migrations.RunPython.noop),
+    ]
@@ -9,17 +9,39 @@ class Product(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)  # Reference to the user who added the product
     name = models.CharField(max_length=200, null=True, blank=True)  # Name of the product
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)  # Stock keeping unit, key of catalog feeds (see base/catalog_feed.py)
     image = models.ImageField(null=True, blank=True, default='/placeholder.png')  # Product image
+    imageVariants = models.JSONField(default=list, blank=True)  # Resized copies of the image (see base/images.py)
     brand = models.CharField(max_length=200, null=True, blank=True)  # Product brand
     category = models.CharField(max_length=200, null=True, blank=True)  # Product category
     description = models.TextField(null=True, blank=True)  # Product description
-    rating = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)  # Product rating (0-5 scale)
+    rating = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True, default=0)  # Product rating (0-5 scale, 0 without reviews)
     numReviews = models.IntegerField(null=True, blank=True, default=0)  # Number of reviews for the product
+    ratingSum = models.IntegerField(default=0)  # Sum of all review ratings, kept in step with numReviews (see base/ratings.py)
+    ratingCount1 = models.IntegerField(default=0)  # Number of 1-star reviews (star histogram, see base/ratings.py)
+    ratingCount2 = models.IntegerField(default=0)  # Number of 2-star reviews
+    ratingCount3 = models.IntegerField(default=0)  # Number of 3-star reviews
+    ratingCount4 = models.IntegerField(default=0)  # Number of 4-star reviews
+    ratingCount5 = models.IntegerField(default=0)  # Number of 5-star reviews
     price = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)  # Product price
     countInStock = models.IntegerField(null=True, blank=True, default=0)  # Available stock
+    countReserved = models.IntegerField(default=0)  # Stock held by unpaid orders (see base/inventory.py)
+    stockShards = models.IntegerField(default=0)  # Number of StockShard rows holding the stock (0 = not sharded)
     createdAt = models.DateTimeField(auto_now_add=True)  # Timestamp when the product was added
     _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each product (primary key)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['createdAt', '_id'], name='product_created_idx'),  # Keyset pagination (newest first)
+            models.Index(fields=['price', '_id'], name='product_price_idx'),  # Sort by price
+            models.Index(fields=['rating', '_id'], name='product_rating_idx'),  # Sort by rating, minimum rating filter
+            models.Index(fields=['category', 'createdAt', '_id'], name='product_category_created_idx'),  # Category filter, newest first
+            models.Index(fields=['category', 'price', '_id'], name='product_category_price_idx'),  # Category filter sorted by price
+            models.Index(fields=['category', 'rating', '_id'], name='product_category_rating_idx'),  # Category filter sorted by rating
+            models.Index(fields=['brand', 'createdAt', '_id'], name='product_brand_created_idx'),  # Brand filter, newest first
+            models.Index(fields=['brand', 'price', '_id'], name='product_brand_price_idx'),  # Brand filter sorted by price
+        ]
+
     def __str__(self):
         return self.name  # Return product name when the object is printed
 
@@ -36,10 +58,37 @@ class Review(models.Model):
     createdAt = models.DateTimeField(auto_now_add=True)  # Timestamp when the review was created
     _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each review
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'user'], name='unique_product_review'),  # One review per user and product
+        ]
+        indexes = [
+            models.Index(fields=['product', 'createdAt', '_id'], name='review_product_created_idx'),  # Review pages, newest first
+            models.Index(fields=['product', 'rating', 'createdAt', '_id'], name='review_product_rating_idx'),  # Review pages, highest rating first
+        ]
+
     def __str__(self):
         return str(self.rating)  # Return rating when the review object is printed
 
 
+class FacetCount(models.Model):
+    # The FacetCount model holds the number of products per category and per brand, shown next to the
+    # catalog filters. Counts are maintained incrementally when products change (see base/facets.py).
+
+    facet = models.CharField(max_length=20)  # Filter the value belongs to ('category' or 'brand')
+    value = models.CharField(max_length=200)  # Category or brand name
+    count = models.IntegerField(default=0)  # Number of products with this value
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each row
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_facet_value'),  # One row per facet value
+        ]
+
+    def __str__(self):
+        return '%s=%s: %s' % (self.facet, self.value, self.count)  # Facet, value and number of products
+
+
 class Order(models.Model):
     # The Order model stores information about customer orders.
     # Fields include user details, payment method, shipping details, and timestamps.
@@ -53,9 +102,17 @@ class Order(models.Model):
     paidAt = models.DateTimeField(auto_now_add=False, null=True, blank=True)  # Timestamp of payment
     isDelivered = models.BooleanField(default=False)  # Delivery status
     deliveredAt = models.DateTimeField(auto_now_add=False, null=True, blank=True)  # Timestamp of delivery
+    isRolledUp = models.BooleanField(default=False)  # Counted as placed in the sales rollups (see base/analytics.py)
+    isPaidRolledUp = models.BooleanField(default=False)  # Counted as paid in the sales rollups
     createdAt = models.DateTimeField(auto_now_add=True)  # Timestamp when the order was created
     _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each order
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['createdAt', '_id'], name='order_created_idx'),  # Keyset pagination (newest first)
+            models.Index(fields=['isPaid', 'isDelivered', 'createdAt'], name='order_status_idx'),  # Admin order filters
+        ]
+
     def __str__(self):
         return str(self.createdAt)  # Return order creation timestamp when the object is printed
 
@@ -90,5 +147,184 @@ class ShippingAddress(models.Model):
     def __str__(self):
         return str(self.address)  # Return address when the shipping address object is printed
 
+
+class StockShard(models.Model):
+    # The StockShard model splits the available stock of a very popular product over several rows,
+    # so concurrent checkouts update different rows. `Product.countInStock` is reconciled from the shards.
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)  # Product the stock belongs to
+    index = models.IntegerField()  # Shard number, 0 to Product.stockShards - 1
+    count = models.IntegerField(default=0)  # Units available in this shard
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each shard
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'index'], name='unique_stock_shard'),  # One row per shard number
+        ]
+
+    def __str__(self):
+        return '%s #%s: %s' % (self.product_id, self.index, self.count)  # Product, shard number and units
+
+
+class StockHold(models.Model):
+    # The StockHold model records stock taken by an order at checkout.
+    # A hold is confirmed when the order is paid, or released (stock goes back on sale) when it expires first.
+
+    HELD = 'held'
+    CONFIRMED = 'confirmed'
+    RELEASED = 'released'
+    STATUS_CHOICES = [(HELD, 'Held'), (CONFIRMED, 'Confirmed'), (RELEASED, 'Released')]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)  # Product the stock is held for
+    order = models.ForeignKey(Order, on_delete=models.CASCADE)  # Order holding the stock
+    qty = models.IntegerField()  # Number of units held
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=HELD)  # Current state of the hold
+    expiresAt = models.DateTimeField()  # Held stock is released after this moment unless the order is paid
+    createdAt = models.DateTimeField(auto_now_add=True)  # Timestamp when the hold was placed
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each hold
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expiresAt'], name='stockhold_expiry_idx'),  # Sweeper looks up expired holds
+        ]
+
+    def __str__(self):
+        return '%s x %s (%s)' % (self.qty, self.product_id, self.status)  # Quantity, product and state of the hold
+
+
+class IdempotencyKey(models.Model):
+    # The IdempotencyKey model remembers write requests sent with an `Idempotency-Key` header.
+    # A retry with the same key gets the stored response instead of running the request again (see base/idempotency.py).
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)  # User who sent the request (keys are scoped per user)
+    key = models.CharField(max_length=255)  # Value of the Idempotency-Key header
+    fingerprint = models.CharField(max_length=64)  # SHA-256 of method, path and body of the original request
+    responseStatus = models.IntegerField(null=True, blank=True)  # HTTP status of the stored response (null while in flight)
+    responseBody = models.JSONField(null=True, blank=True)  # Body of the stored response
+    createdAt = models.DateTimeField(auto_now_add=True)  # Timestamp when the request was first received
+    expiresAt = models.DateTimeField(db_index=True)  # After this moment the key may be reused and is purged
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each idempotency key
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),  # One request per key and user
+        ]
+
+    def __str__(self):
+        return str(self.key)  # Return the key when the object is printed
+
+
+class DailySales(models.Model):
+    # The DailySales model holds the sales totals of one day, maintained incrementally by base/analytics.py.
+    # "Placed" figures count orders on the day they were created, "paid" figures on the day they were paid.
+    # Revenue is the sum of item prices times quantities (without tax and shipping).
+
+    day = models.DateField(unique=True)  # Calendar day (TIME_ZONE)
+    orders = models.IntegerField(default=0)  # Orders placed
+    units = models.IntegerField(default=0)  # Units ordered
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Value of the ordered items
+    paidOrders = models.IntegerField(default=0)  # Orders paid
+    paidUnits = models.IntegerField(default=0)  # Units in paid orders
+    paidRevenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Value of the paid items
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each day
+
+    def __str__(self):
+        return str(self.day)  # Return the day when the object is printed
+
+
+class DailyProductSales(models.Model):
+    # The DailyProductSales model holds the sales of one product on one day (same figures as DailySales;
+    # `orders` counts the orders containing the product).
+
+    day = models.DateField()  # Calendar day (TIME_ZONE)
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)  # Product sold (null once deleted)
+    orders = models.IntegerField(default=0)  # Orders placed containing the product
+    units = models.IntegerField(default=0)  # Units ordered
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Value of the ordered units
+    paidOrders = models.IntegerField(default=0)  # Paid orders containing the product
+    paidUnits = models.IntegerField(default=0)  # Units in paid orders
+    paidRevenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Value of the paid units
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each row
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='unique_daily_product_sales'),  # One row per day and product
+        ]
+
+    def __str__(self):
+        return '%s %s' % (self.day, self.product_id)  # Day and product of the row
+
+
+class DailyCategorySales(models.Model):
+    # The DailyCategorySales model holds the sales of one product category on one day (same figures as
+    # DailySales; `orders` counts the orders containing the category, the category is read at the time of sale).
+
+    day = models.DateField()  # Calendar day (TIME_ZONE)
+    category = models.CharField(max_length=200)  # Product category ('' for products without one)
+    orders = models.IntegerField(default=0)  # Orders placed containing the category
+    units = models.IntegerField(default=0)  # Units ordered
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Value of the ordered units
+    paidOrders = models.IntegerField(default=0)  # Paid orders containing the category
+    paidUnits = models.IntegerField(default=0)  # Units in paid orders
+    paidRevenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Value of the paid units
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each row
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='unique_daily_category_sales'),  # One row per day and category
+        ]
+
+    def __str__(self):
+        return '%s %s' % (self.day, self.category)  # Day and category of the row
+
+
+class Job(models.Model):
+    # The Job model is a queued background task (see base/tasks.py).
+    # Workers (`manage.py run_worker`) claim due jobs by priority, run them and delete them once they succeed.
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running')]
+
+    name = models.CharField(max_length=100)  # Registered task name
+    args = models.JSONField(default=list, blank=True)  # Positional arguments of the task
+    kwargs = models.JSONField(default=dict, blank=True)  # Keyword arguments of the task
+    priority = models.IntegerField(default=0)  # Higher priorities run first
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)  # Current state of the job
+    attempts = models.IntegerField(default=0)  # Number of times the job was started
+    maxAttempts = models.IntegerField(default=5)  # After this many failures the job moves to the dead-letter table
+    runAt = models.DateTimeField()  # The job is not started before this moment (delays and retry backoff)
+    lockedBy = models.CharField(max_length=100, null=True, blank=True)  # Worker running the job
+    lockedAt = models.DateTimeField(null=True, blank=True)  # When the running attempt started
+    lastError = models.TextField(null=True, blank=True)  # Traceback of the last failed attempt
+    createdAt = models.DateTimeField(auto_now_add=True)  # Timestamp when the job was queued
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each job
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority', 'runAt'], name='job_claim_idx'),  # Workers look up the next due job
+        ]
+
+    def __str__(self):
+        return '%s (%s)' % (self.name, self.status)  # Task name and state of the job
+
+
+class DeadJob(models.Model):
+    # The DeadJob model keeps jobs that failed on every attempt, so they can be inspected and retried
+    # (`manage.py retry_dead_jobs`).
+
+    name = models.CharField(max_length=100)  # Registered task name
+    args = models.JSONField(default=list, blank=True)  # Positional arguments of the task
+    kwargs = models.JSONField(default=dict, blank=True)  # Keyword arguments of the task
+    priority = models.IntegerField(default=0)  # Priority the job was queued with
+    attempts = models.IntegerField(default=0)  # Number of failed attempts
+    error = models.TextField(null=True, blank=True)  # Traceback of the last attempt
+    createdAt = models.DateTimeField()  # Timestamp when the original job was queued
+    failedAt = models.DateTimeField(auto_now_add=True)  # Timestamp when the job was given up
+    _id = models.AutoField(primary_key=True, editable=False)  # Unique ID for each dead job
+
+    def __str__(self):
+        return str(self.name)  # Return the task name when the object is printed
+
 # Md Golam Sharoar Saymum _
 # 0242220005101780
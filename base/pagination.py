@@ -0,0 +1,173 @@
+# Keyset (cursor) pagination shared by the listing endpoints.
+# Instead of COUNT(*) + OFFSET, each page is fetched with a WHERE clause on the ordering
+# columns of the last row seen, so every page costs the same no matter how deep it is.
+#
+# A listing switches to cursor mode when the request carries a `cursor` query parameter
+# (empty for the first page). The response then holds opaque `next`/`prev` tokens instead
+# of `page`/`pages`. Requests without `cursor` keep their existing response shape.
+
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+DEFAULT_PAGE_SIZE = getattr(settings, 'CURSOR_PAGE_SIZE', 20)  # Page size when `page_size` is not given
+MAX_PAGE_SIZE = getattr(settings, 'CURSOR_MAX_PAGE_SIZE', 100)  # Upper bound for `page_size`
+
+
+def usesCursor(request):
+    """
+    Returns True when the client asked for cursor pagination (`?cursor=` or `?cursor=<token>`).
+    """
+    return 'cursor' in request.query_params
+
+
+def encodeCursor(values, direction):
+    """
+    Builds an opaque token from the ordering values of a row.
+
+    Args:
+        values (list): Ordering column values of the boundary row.
+        direction (str): 'next' or 'prev'.
+
+    Returns:
+        str: URL-safe token.
+    """
+    payload = json.dumps({'v': [str(value) for value in values], 'd': direction})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decodeCursor(token, fields):
+    """
+    Reverses `encodeCursor`, converting the values back with the model fields.
+
+    Args:
+        token (str): Token received from the client.
+        fields (list): Model fields the listing is ordered by.
+
+    Returns:
+        tuple: The ordering values and the direction.
+
+    Raises:
+        ValidationError: If the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [field.to_python(value) for field, value in zip(fields, payload['v'])]
+        direction = payload['d']
+    except Exception:
+        raise ValidationError({'detail': 'Invalid cursor'})
+
+    if len(values) != len(fields) or direction not in ('next', 'prev'):
+        raise ValidationError({'detail': 'Invalid cursor'})
+    return values, direction
+
+
+def keysetFilter(names, values, lookup):
+    """
+    Builds the lexicographic condition `(a, b) < (x, y)` (or `>`) as a Q object.
+
+    Args:
+        names (tuple): Ordering column names.
+        values (list): Values of the boundary row.
+        lookup (str): 'lt' or 'gt'.
+
+    Returns:
+        Q: Condition selecting rows strictly after the boundary row.
+    """
+    condition = Q()
+    for i, name in enumerate(names):
+        step = Q(**{'%s__%s' % (name, lookup): values[i]})
+        for previous, value in zip(names[:i], values[:i]):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+def getPageSize(request, default):
+    """
+    Reads `page_size` from the query string, bounded by `MAX_PAGE_SIZE`.
+    """
+    try:
+        size = int(request.query_params.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def cursorPaginate(request, queryset, ordering=('createdAt', '_id'), pageSize=DEFAULT_PAGE_SIZE, descending=True):
+    """
+    Returns one page of `queryset`, newest first, using keyset pagination.
+
+    The ordering columns must identify a row uniquely (end with the primary key), must not
+    be null and should be covered by an index.
+
+    Args:
+        request: HTTP request object carrying `cursor` and optional `page_size`.
+        queryset (QuerySet): Listing to paginate. Any existing ordering is replaced.
+        ordering (tuple): Columns the listing is ordered by, all descending (or all ascending).
+        pageSize (int): Default page size.
+        descending (bool): False to list the rows in ascending order (e.g. lowest price first).
+
+    Returns:
+        tuple: (rows of the page, `next` token or None, `prev` token or None).
+    """
+    page, finish = cursorQuery(request, queryset, ordering, pageSize, descending)
+    return finish(list(page))
+
+
+async def acursorPaginate(request, queryset, ordering=('createdAt', '_id'), pageSize=DEFAULT_PAGE_SIZE, descending=True):
+    """
+    Async `cursorPaginate`: the page is read with the async ORM.
+    """
+    page, finish = cursorQuery(request, queryset, ordering, pageSize, descending)
+    return finish([row async for row in page])
+
+
+def cursorQuery(request, queryset, ordering, pageSize, descending=True):
+    """
+    Builds the query of one cursor page.
+
+    Returns:
+        tuple: (queryset of the page plus one look-ahead row, function turning its rows into
+            `(rows, next, prev)`).
+    """
+    fields = [queryset.model._meta.get_field(name) for name in ordering]
+    size = getPageSize(request, pageSize)
+    token = request.query_params.get('cursor')
+
+    direction = 'next'
+    if token:
+        values, direction = decodeCursor(token, fields)
+        lookup = 'lt' if (direction == 'next') == descending else 'gt'
+        queryset = queryset.filter(keysetFilter(ordering, values, lookup))
+
+    # Walking towards smaller values: a descending listing going forward, or an ascending one
+    # going backward. Rows read backwards are flipped below.
+    if (direction == 'next') == descending:
+        queryset = queryset.order_by(*['-%s' % name for name in ordering])
+    else:
+        queryset = queryset.order_by(*ordering)
+
+    def boundary(row, towards):
+        return encodeCursor([getattr(row, name) for name in ordering], towards)
+
+    def finish(rows):
+        hasMore = len(rows) > size
+        rows = rows[:size]
+        if direction == 'prev':
+            rows.reverse()
+
+        # Going forward there is a previous page whenever a cursor was given; going backward
+        # there is always a next page (the one we came from).
+        hasNext = hasMore if direction == 'next' else True
+        hasPrev = bool(token) if direction == 'next' else hasMore
+
+        nextToken = boundary(rows[-1], 'next') if rows and hasNext else None
+        prevToken = boundary(rows[0], 'prev') if rows and hasPrev else None
+        return rows, nextToken, prevToken
+
+    return queryset[:size + 1], finish
@@ -0,0 +1,93 @@
+# Product rating aggregates.
+# Each product stores the running sum (`ratingSum`) and count (`numReviews`) of its review
+# ratings, and `rating` is derived from both. They are changed with single UPDATE statements
+# built from F() expressions, so a new review costs O(1) and concurrent reviews cannot
+# overwrite each other.
+#
+# The same statements keep a star histogram (`ratingCount1` .. `ratingCount5`, the number of
+# reviews per rating), so the distribution shown on a product page is never computed by
+# scanning its reviews.
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from base import catalog_cache, leaderboard
+from base.models import Product, Review
+from base.reviews import STARS
+
+
+def averageRating(ratingSum, numReviews, emptyWhen):
+    """
+    Builds the expression `ratingSum / numReviews` stored in `Product.rating` (0 without reviews).
+
+    Args:
+        ratingSum: Expression for the new rating sum.
+        numReviews: Expression for the new review count.
+        emptyWhen (Q): Condition under which the product has no reviews left.
+
+    Returns:
+        Case: Expression suitable for `QuerySet.update(rating=...)`.
+    """
+    return Case(
+        When(emptyWhen, then=Value(0)),
+        default=Cast(ratingSum, FloatField()) / numReviews,
+        output_field=DecimalField(max_digits=7, decimal_places=2),
+    )
+
+
+def adjustRating(productId, ratingDelta, countDelta):
+    """
+    Atomically adds a rating delta to a product's aggregates.
+
+    All right-hand sides of an UPDATE see the row as it was before the statement,
+    so `rating` is computed from the same old values as the new sum and count.
+    The histogram column of the review's rating moves by `countDelta` in the same statement.
+
+    Args:
+        productId (int): Primary key (`_id`) of the product.
+        ratingDelta (int): Change of the rating sum (+rating for a new review, -rating for a removed one).
+        countDelta (int): Change of the review count (+1 or -1).
+    """
+    newSum = Coalesce(F('ratingSum'), 0) + ratingDelta
+    newCount = Coalesce(F('numReviews'), 0) + countDelta
+    updates = {
+        'ratingSum': newSum,
+        'numReviews': newCount,
+        'rating': averageRating(newSum, newCount, Q(numReviews__lte=-countDelta)),
+    }
+    stars = abs(ratingDelta)
+    if stars in STARS:
+        updates['ratingCount%d' % stars] = F('ratingCount%d' % stars) + countDelta
+    Product.objects.filter(_id=productId).update(**updates)
+    leaderboard.productChanged.defer(productId)  # Patch the cached top products in the background
+    catalog_cache.invalidateProducts([productId])  # Drop the cached detail (with its reviews) and listings
+
+
+def rebuildRatings(products=None):
+    """
+    Recomputes the aggregates and star histograms of `products` (all products by default)
+    from their reviews.
+
+    Runs as two set-based UPDATE statements, independent of the number of products.
+
+    Args:
+        products (QuerySet): Optional subset of products to rebuild.
+    """
+    if products is None:
+        products = Product.objects.all()
+
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    products.update(
+        ratingSum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+        numReviews=Coalesce(Subquery(reviews.annotate(count=Count('pk')).values('count')), 0),
+        **{
+            'ratingCount%d' % stars: Coalesce(
+                Subquery(reviews.filter(rating=stars).annotate(count=Count('pk')).values('count')), 0)
+            for stars in STARS
+        },
+    )
+    products.update(rating=averageRating(F('ratingSum'), F('numReviews'), Q(numReviews=0)))
+    transaction.on_commit(leaderboard.rebuild)
+    catalog_cache.invalidateAll()
+
@@ -0,0 +1,66 @@
+# Paginated product reviews.
+#
+# The product detail used to embed every review, so a popular product produced a multi-megabyte
+# response. Reviews are now read a page at a time from `GET /api/products/<id>/reviews/`
+# (keyset pagination, see base/pagination.py), newest first or highest rating first. The detail
+# embeds only the first page (newest first), `reviewsNext` (the cursor of the second page) and the
+# star histogram maintained by base/ratings.py.
+#
+# Both orderings are covered by an index starting with the product, so a page costs the same
+# for the first and the 20,000th review.
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from base.models import Review
+from base.pagination import encodeCursor
+
+PAGE_SIZE = getattr(settings, 'REVIEW_PAGE_SIZE', 10)  # Reviews per page, also embedded in the product detail
+ORDERINGS = {
+    'newest': ('createdAt', '_id'),
+    'rating': ('rating', 'createdAt', '_id'),  # Highest rating first, newest first within a rating
+}
+STARS = range(1, 6)  # Ratings counted by the star histogram
+HISTOGRAM_FIELDS = ['ratingCount%d' % stars for stars in STARS]  # Histogram columns of Product, 1 star first
+
+
+def newestFirst(reviews):
+    return reviews.order_by(*['-%s' % name for name in ORDERINGS['newest']])
+
+
+def prefetchFirstPage():
+    """
+    Prefetch loading the first page of each product's reviews into `product.firstReviews`.
+
+    One query for a whole list of products; it reads one row more than a page to tell whether
+    there is a second page.
+    """
+    return Prefetch('review_set', queryset=newestFirst(Review.objects.all())[:PAGE_SIZE + 1], to_attr='firstReviews')
+
+
+def firstPage(product):
+    """
+    Returns the first page of a product's reviews, newest first.
+
+    Uses the rows of `prefetchFirstPage` when the product was loaded with it, otherwise reads them.
+
+    Args:
+        product (Product): The product.
+
+    Returns:
+        tuple: (reviews, cursor of the next page or None).
+    """
+    rows = getattr(product, 'firstReviews', None)
+    if rows is None:
+        rows = product.firstReviews = list(newestFirst(product.review_set.all())[:PAGE_SIZE + 1])
+    if len(rows) <= PAGE_SIZE:
+        return rows, None
+    last = rows[PAGE_SIZE - 1]
+    return rows[:PAGE_SIZE], encodeCursor([getattr(last, name) for name in ORDERINGS['newest']], 'next')
+
+
+def ratingHistogram(product):
+    """
+    Returns the number of reviews per star rating, e.g. `{1: 0, 2: 1, 3: 4, 4: 10, 5: 25}`.
+    """
+    return {stars: getattr(product, 'ratingCount%d' % stars) for stars in STARS}
@@ -0,0 +1,159 @@
+# Full-text product search.
+# Products are indexed on name, brand, category and description in a side table that is
+# kept in sync by background jobs queued from the signals in base/signals.py:
+# - SQLite: an FTS5 virtual table (`base_product_fts`) ranked with BM25.
+# - PostgreSQL: a weighted tsvector table (`base_product_search`) with a GIN index, ranked with ts_rank_cd.
+# On any other database (or a SQLite build without FTS5) the search falls back to `name__icontains`.
+
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from base.tasks import task
+
+SQLITE_TABLE = 'base_product_fts'  # FTS5 virtual table, rowid == Product._id
+POSTGRES_TABLE = 'base_product_search'  # (product_id, document tsvector) table
+
+INDEXED_FIELDS = ('name', 'brand', 'category', 'description')  # Product fields covered by the index
+
+# Maximum number of ranked ids returned for a single search (keeps pagination of hits bounded).
+MAX_RESULTS = getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+# SQL expression building the weighted tsvector for a `base_product` row.
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(brand, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+_enabled = False  # Set once the index table has been seen on the current database
+
+
+def isEnabled():
+    """
+    Returns True when the search index table exists on the default database.
+    The result is remembered once positive so the check costs nothing afterwards.
+    """
+    global _enabled
+    if not _enabled:
+        table = {'sqlite': SQLITE_TABLE, 'postgresql': POSTGRES_TABLE}.get(connection.vendor)
+        _enabled = table is not None and table in connection.introspection.table_names()
+    return _enabled
+
+
+def tokenize(query):
+    """
+    Splits a user supplied search string into plain word tokens.
+    Everything except letters and digits is dropped, so the tokens are safe to embed
+    in FTS5 and tsquery syntax.
+    """
+    return re.findall(r'\w+', query or '')
+
+
+def searchProductIds(query, limit=MAX_RESULTS):
+    """
+    Returns product ids matching `query`, best match first.
+
+    Every token must match (as a prefix, so results update while the user types).
+
+    Args:
+        query (str): Raw search text.
+        limit (int): Maximum number of ids to return.
+
+    Returns:
+        list | None: Ranked product ids, or None when no search index is available.
+    """
+    if not isEnabled():
+        return None
+
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            match = ' '.join('"%s"*' % token for token in tokens)
+            cursor.execute(
+                'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+                'ORDER BY bm25({table}, 10.0, 5.0, 5.0, 1.0) LIMIT %s'.format(table=SQLITE_TABLE),
+                [match, limit],
+            )
+        else:
+            tsquery = ' & '.join('%s:*' % token for token in tokens)
+            cursor.execute(
+                'SELECT product_id FROM {table}, to_tsquery(\'english\', %s) query '
+                'WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC LIMIT %s'.format(table=POSTGRES_TABLE),
+                [tsquery, limit],
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+@task(priority=10)  # Queued by the product signals; new products become searchable quickly
+def indexProduct(pk):
+    """
+    Adds or refreshes the index entry of a single product.
+
+    Args:
+        pk (int): Primary key (`_id`) of the product.
+    """
+    if not isEnabled():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('DELETE FROM {table} WHERE rowid = %s'.format(table=SQLITE_TABLE), [pk])
+            cursor.execute(
+                'INSERT INTO {table} (rowid, name, brand, category, description) '
+                'SELECT _id, name, brand, category, description FROM base_product WHERE _id = %s'.format(table=SQLITE_TABLE),
+                [pk],
+            )
+        else:
+            cursor.execute(
+                'INSERT INTO {table} (product_id, document) '
+                'SELECT _id, {document} FROM base_product WHERE _id = %s '
+                'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document'.format(
+                    table=POSTGRES_TABLE, document=POSTGRES_DOCUMENT),
+                [pk],
+            )
+
+
+@task(priority=10)
+def removeProduct(pk):
+    """
+    Removes a product from the index.
+
+    Args:
+        pk (int): Primary key (`_id`) of the deleted product.
+    """
+    if not isEnabled():
+        return
+
+    column = 'rowid' if connection.vendor == 'sqlite' else 'product_id'
+    table = SQLITE_TABLE if connection.vendor == 'sqlite' else POSTGRES_TABLE
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM {table} WHERE {column} = %s'.format(table=table, column=column), [pk])
+
+
+def rebuildIndex():
+    """
+    Rebuilds the whole index from the `base_product` table in one statement.
+    Used by the migration that creates the index and by `manage.py rebuild_search_index`.
+    """
+    if not isEnabled():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('DELETE FROM {table}'.format(table=SQLITE_TABLE))
+            cursor.execute(
+                'INSERT INTO {table} (rowid, name, brand, category, description) '
+                'SELECT _id, name, brand, category, description FROM base_product'.format(table=SQLITE_TABLE)
+            )
+        else:
+            cursor.execute('TRUNCATE {table}'.format(table=POSTGRES_TABLE))
+            cursor.execute(
+                'INSERT INTO {table} (product_id, document) SELECT _id, {document} FROM base_product'.format(
+                    table=POSTGRES_TABLE, document=POSTGRES_DOCUMENT)
+            )
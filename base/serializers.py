@@ -1,7 +1,11 @@
+from decimal import Decimal
+
 from rest_framework import serializers  # Importing the serializers module to handle model serialization
 from django.contrib.auth.models import User  # Importing the built-in User model for user-related data
 from rest_framework_simplejwt.tokens import RefreshToken  # For generating JWT tokens
 from .models import Product, Order, OrderItem, ShippingAddress, Review  # Importing models for product, order, and reviews
+from .images import variantUrls, srcset  # URLs of the resized product images
+from .reviews import firstPage, ratingHistogram  # First page of reviews and star histogram of a product
 
 
 # Serializer for User model, extending the base ModelSerializer to convert User objects into JSON
@@ -52,20 +56,76 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = '__all__'  # Include all fields in the serialized data
 
 
-# Serializer for the Product model, includes related reviews through a nested serializer
-class ProductSerializer(serializers.ModelSerializer):
-    reviews = serializers.SerializerMethodField(read_only=True)  # Read-only field to fetch related reviews
+# Base of the product serializers: adds the URLs of the resized image variants (see base/images.py)
+# so the frontend can build `srcset` / `<picture>` sources. Both are empty until the variants exist.
+class ProductImageSerializer(serializers.ModelSerializer):
+    imageVariants = serializers.SerializerMethodField(read_only=True)  # [{'width', 'url', 'webp'}], smallest first
+    imageSrcset = serializers.SerializerMethodField(read_only=True)  # {'src', 'webp'} srcset strings, or None
+
+    def get_imageVariants(self, obj):
+        return variantUrls(obj)
+
+    def get_imageSrcset(self, obj):
+        return srcset(obj)
+
+
+# Serializer for the Product model, includes the first page of reviews through a nested serializer.
+# Further pages come from GET /api/products/<id>/reviews/?cursor=<reviewsNext> (see base/reviews.py).
+class ProductSerializer(ProductImageSerializer):
+    reviews = serializers.SerializerMethodField(read_only=True)  # Newest reviews (first page only)
+    reviewsNext = serializers.SerializerMethodField(read_only=True)  # Cursor of the next page of reviews, or None
+    ratingHistogram = serializers.SerializerMethodField(read_only=True)  # Number of reviews per star rating
 
     class Meta:
         model = Product  # Indicates that this serializer is for the Product model
         fields = '__all__'  # Include all fields of the Product model in the serialized data
 
-    # Method to get all reviews related to the product
+    # Method to get the first page of reviews related to the product
+    # Uses the prefetched page when the queryset was built with reviews.prefetchFirstPage()
     def get_reviews(self, obj):
-        reviews = obj.review_set.all()  # Fetch all related reviews for this product
+        reviews, _ = firstPage(obj)  # Fetch the newest reviews of this product
         serializer = ReviewSerializer(reviews, many=True)  # Serialize the reviews
         return serializer.data  # Return the serialized review data
 
+    def get_reviewsNext(self, obj):
+        return firstPage(obj)[1]
+
+    def get_ratingHistogram(self, obj):
+        return ratingHistogram(obj)
+
+
+# Compact serializer for catalog listings (home page, search, carousel).
+# Leaves out the nested reviews so a page of products is served from a single query.
+class ProductListSerializer(ProductImageSerializer):
+    class Meta:
+        model = Product  # Indicates that this serializer is for the Product model
+        fields = '__all__'  # Include all fields of the Product model, without the nested reviews
+
+
+# Minimal product card used by the top-products carousel (cached in base/leaderboard.py)
+class ProductCardSerializer(ProductImageSerializer):
+    class Meta:
+        model = Product  # Indicates that this serializer is for the Product model
+        fields = ['_id', 'name', 'image', 'imageVariants', 'imageSrcset', 'price', 'rating', 'numReviews']  # Only what a product card displays
+
+
+# Price/stock record returned by the batch lookup used to refresh cart lines
+class ProductStockSerializer(ProductImageSerializer):
+    class Meta:
+        model = Product  # Indicates that this serializer is for the Product model
+        fields = ['_id', 'name', 'image', 'imageVariants', 'imageSrcset', 'price', 'countInStock']  # Fields a cart line needs
+
+
+# Validates one partial update of the bulk product endpoint (only the given fields are checked)
+class ProductBulkUpdateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product  # Indicates that this serializer is for the Product model
+        fields = ['name', 'brand', 'category', 'description', 'price', 'countInStock']  # Fields a bulk update may change
+        extra_kwargs = {
+            'price': {'min_value': Decimal('0')},  # No negative prices
+            'countInStock': {'min_value': 0},  # No negative stock
+        }
+
 
 # Serializer for the ShippingAddress model
 class ShippingAddressSerializer(serializers.ModelSerializer):
@@ -92,6 +152,7 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = '__all__'  # Include all fields of the Order model in the serialized data
 
     # Method to get all items related to the order
+    # Uses the prefetched items when the queryset was built with prefetch_related('orderitem_set')
     def get_orderItems(self, obj):
         items = obj.orderitem_set.all()  # Fetch all order items for this order
         serializer = OrderItemSerializer(items, many=True)  # Serialize the order items
@@ -101,7 +162,7 @@ class OrderSerializer(serializers.ModelSerializer):
     def get_shippingAddress(self, obj):
         try:
             address = ShippingAddressSerializer(obj.shippingaddress, many=False).data  # Serialize the shipping address
-        except:
+        except ShippingAddress.DoesNotExist:
             address = False  # If no address is available, return False
         return address  # Return the serialized shipping address data
 
@@ -0,0 +1,166 @@
+# Sharded stock counters for very popular products.
+#
+# A product with `stockShards = K > 0` keeps its available stock in K StockShard rows instead of
+# `Product.countInStock`, so concurrent checkouts of the same product update different rows.
+#
+# - Taking stock tries the shards one by one, starting at a random one, with a conditional
+#   UPDATE; the first shard with enough units wins.
+# - When no single shard can cover the quantity, all shards are locked, the quantity is taken
+#   from their total and the rest is spread evenly again (rebalancing drained shards).
+# - Returned units go to a random shard.
+# - `countInStock` and `countReserved` of sharded products are not touched per checkout;
+#   `reconcile` writes the shard total and the held quantity back for reads. Every change of
+#   the shards queues it, one job per STOCK_SHARD_RECONCILE_INTERVAL however many checkouts
+#   ran, so serializers, filters and exports lag behind by a few seconds at most
+#   (`manage.py release_stock_holds` runs it too).
+#
+# Sharding is switched on and off per product with `manage.py shard_stock`.
+
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from base import catalog_cache, tasks
+from base.models import Product, StockHold, StockShard
+
+RECONCILE_INTERVAL = getattr(settings, 'STOCK_SHARD_RECONCILE_INTERVAL', timedelta(seconds=5))  # Max lag of countInStock
+
+
+def spread(total, shards):
+    """
+    Splits `total` units as evenly as possible over `shards` counters.
+    """
+    return [total // shards + (1 if i < total % shards else 0) for i in range(shards)]
+
+
+def takeStock(product, qty):
+    """
+    Takes `qty` units from the shards of `product`. Must run inside a transaction.
+
+    Args:
+        product (Product): A sharded product.
+        qty (int): Units to take.
+
+    Returns:
+        bool: False if the shards together hold fewer than `qty` units.
+    """
+    start = random.randrange(product.stockShards)
+    for i in range(product.stockShards):
+        index = (start + i) % product.stockShards
+        if StockShard.objects.filter(product=product, index=index, count__gte=qty).update(count=F('count') - qty):
+            scheduleReconcile()
+            return True
+    return takeFromAll(product, qty)
+
+
+def takeFromAll(product, qty):
+    """
+    Takes `qty` units from the total of all shards and rebalances the remainder.
+
+    Returns:
+        bool: False if the shards together hold fewer than `qty` units.
+    """
+    shards = list(StockShard.objects.select_for_update().filter(product=product).order_by('index'))
+    total = sum(shard.count for shard in shards)
+    if total < qty:
+        return False
+
+    for shard, count in zip(shards, spread(total - qty, len(shards))):
+        shard.count = count
+    StockShard.objects.bulk_update(shards, ['count'])
+    scheduleReconcile()
+    return True
+
+
+def returnStock(productId, shards, qty):
+    """
+    Adds `qty` units (negative to take them unconditionally) to a random shard of a product.
+
+    Args:
+        productId (int): Primary key (`_id`) of a sharded product.
+        shards (int): Number of shards of the product.
+        qty (int): Units to add.
+    """
+    StockShard.objects.filter(product_id=productId, index=random.randrange(shards)).update(count=F('count') + qty)
+    scheduleReconcile()
+
+
+def scheduleReconcile():
+    # Queues `reconcile` once the transaction commits; checkouts in the same interval share the job
+    tasks.enqueue(reconcile.taskName, runAt=tasks.slotTime(timezone.now(), RECONCILE_INTERVAL), unique=True)
+
+
+def enableShards(product, shards):
+    """
+    Moves the stock of `product` into `shards` counters, or back into `countInStock` when `shards` is 0.
+
+    Args:
+        product (Product): The product to (un)shard.
+        shards (int): Number of shards, 0 to turn sharding off.
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(_id=product._id)
+        if product.stockShards:
+            reconcile(Product.objects.filter(_id=product._id))
+            product.refresh_from_db(fields=['countInStock', 'countReserved'])
+
+        StockShard.objects.filter(product=product).delete()
+        StockShard.objects.bulk_create([
+            StockShard(product=product, index=index, count=count)
+            for index, count in enumerate(spread(max(product.countInStock or 0, 0), shards))
+        ] if shards else [])
+        Product.objects.filter(_id=product._id).update(stockShards=shards)
+
+
+def resetShards(product):
+    """
+    Spreads a new `countInStock` set by an admin over the existing shards of `product`.
+    """
+    with transaction.atomic():
+        shards = list(StockShard.objects.select_for_update().filter(product=product).order_by('index'))
+        for shard, count in zip(shards, spread(max(product.countInStock or 0, 0), len(shards))):
+            shard.count = count
+        StockShard.objects.bulk_update(shards, ['count'])
+
+
+def stockTotals(productIds):
+    """
+    Returns the current stock of sharded products, e.g. `{12: 40}` (shard totals by product ID).
+    """
+    totals = StockShard.objects.filter(product_id__in=productIds).order_by().values('product') \
+        .annotate(total=Sum('count')).values_list('product', 'total')
+    return dict(totals)
+
+
+@tasks.task(priority=1)
+def reconcile(products=None):
+    """
+    Writes the shard totals and held quantities back into `countInStock`/`countReserved`.
+
+    Only products whose counters are out of date are written (and dropped from the catalog cache).
+
+    Args:
+        products (QuerySet): Products to reconcile; all sharded products by default.
+    """
+    if products is None:
+        products = Product.objects.all()
+
+    shardTotal = (StockShard.objects.filter(product=OuterRef('pk')).order_by().values('product')
+                  .annotate(total=Sum('count')).values('total'))
+    heldTotal = (StockHold.objects.filter(product=OuterRef('pk'), status=StockHold.HELD).order_by()
+                 .values('product').annotate(total=Sum('qty')).values('total'))
+    counters = {
+        'countInStock': Coalesce(Subquery(shardTotal, output_field=IntegerField()), 0),
+        'countReserved': Coalesce(Subquery(heldTotal, output_field=IntegerField()), 0),
+    }
+    stale = list(products.filter(stockShards__gt=0)
+                 .annotate(newInStock=counters['countInStock'], newReserved=counters['countReserved'])
+                 .exclude(countInStock=F('newInStock'), countReserved=F('newReserved')).values_list('_id', flat=True))
+    if stale:
+        Product.objects.filter(_id__in=stale).update(**counters)
+        catalog_cache.invalidateProducts(stale)
@@ -1,6 +1,15 @@
-from django.db.models.signals import pre_save  # Importing the pre_save signal to perform actions before saving a model
+from django.db.models.signals import pre_save, post_save, post_delete  # Model lifecycle signals
 from django.contrib.auth.models import User  # Importing the built-in User model from Django's authentication system
 
+from base import search  # Full-text search index maintenance
+from base import leaderboard  # Cached top-products board
+from base import catalog_cache  # Cached catalog responses
+from base import shards  # Sharded stock counters
+from base import facets  # Catalog facet counts
+from base.authentication import userCache  # Per-process cache of authenticated users
+from base.models import Product, Review
+from base.ratings import adjustRating  # Atomic rating aggregate updates
+
 
 # The updateUser function will be called before saving the User model instance
 def updateUser(sender, instance, **kwargs):
@@ -14,6 +23,118 @@ def updateUser(sender, instance, **kwargs):
 # This means the updateUser function will be executed before saving a User instance
 pre_save.connect(updateUser, sender=User)
 
+
+# Drops a saved or deleted user from the authentication cache (profile and admin updates,
+# is_staff changes, password changes, deletions)
+def invalidateCachedUser(sender, instance, **kwargs):
+    userCache.invalidate(instance.pk)
+
+
+post_save.connect(invalidateCachedUser, sender=User)
+post_delete.connect(invalidateCachedUser, sender=User)
+
+
+# Keeps the full-text search index in sync after a product is created or edited
+def updateProductSearchIndex(sender, instance, update_fields=None, **kwargs):
+    # Saves that only touch non-indexed fields (stock, rating, ...) leave the index alone
+    if update_fields is not None and not set(update_fields) & set(search.INDEXED_FIELDS):
+        return
+    search.indexProduct.defer(instance._id)  # Indexed by the background worker
+
+
+# Removes a deleted product from the full-text search index
+def removeProductSearchIndex(sender, instance, **kwargs):
+    search.removeProduct.defer(instance._id)
+
+
+post_save.connect(updateProductSearchIndex, sender=Product)
+post_delete.connect(removeProductSearchIndex, sender=Product)
+
+
+# Keeps the cached top-products board in step with rating or card changes made through save()
+def updateTopProducts(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & leaderboard.CARD_FIELDS:
+        return
+    leaderboard.productChanged.defer(instance._id)  # Applied by the background worker
+
+
+# Takes a deleted product off the cached top-products board
+def removeTopProduct(sender, instance, **kwargs):
+    leaderboard.removeProduct(instance._id)
+
+
+post_save.connect(updateTopProducts, sender=Product)
+post_delete.connect(removeTopProduct, sender=Product)
+
+
+# Drops cached catalog responses of a product that was created, edited or deleted
+# (admin edits, image uploads, stock changes, ...)
+def invalidateCatalogCache(sender, instance, **kwargs):
+    catalog_cache.invalidateProducts([instance._id])
+
+
+post_save.connect(invalidateCatalogCache, sender=Product)
+post_delete.connect(invalidateCatalogCache, sender=Product)
+
+
+# Remembers the stored countInStock of a sharded product before a save that writes it
+def rememberStock(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or not instance.stockShards:
+        return
+    if update_fields is None or 'countInStock' in update_fields:
+        instance._oldCountInStock = Product.objects.filter(_id=instance._id).values_list('countInStock', flat=True).first()
+
+
+# Spreads stock set through save() (e.g. updateProduct) over the shards of a sharded product.
+# Saves that write back the countInStock they loaded (renames, full admin saves) leave the
+# shards alone: that value is not reconciled and would give sold units back.
+def resetStockShards(sender, instance, created=False, **kwargs):
+    if created or not hasattr(instance, '_oldCountInStock'):
+        return
+    changed = instance._oldCountInStock != instance.countInStock
+    del instance._oldCountInStock
+    if changed:
+        shards.resetShards(instance)
+
+
+pre_save.connect(rememberStock, sender=Product)
+post_save.connect(resetStockShards, sender=Product)
+
+
+# Remembers the facet values (category, brand) an existing product had before the save
+def rememberFacetValues(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(facets.FACETS)):
+        return
+    instance._oldFacetValues = Product.objects.filter(_id=instance._id).values(*facets.FACETS).first()
+
+
+# Moves the facet counts of a created or edited product to its new category and brand
+def updateFacetCounts(sender, instance, created=False, **kwargs):
+    if created:
+        facets.applyChanges(facets.productChanges(None, facets.facetValues(instance)))
+    elif hasattr(instance, '_oldFacetValues'):
+        facets.applyChanges(facets.productChanges(instance._oldFacetValues, facets.facetValues(instance)))
+        del instance._oldFacetValues
+
+
+# Takes a deleted product out of the facet counts
+def removeFacetCounts(sender, instance, **kwargs):
+    facets.applyChanges(facets.productChanges(facets.facetValues(instance), None))
+
+
+pre_save.connect(rememberFacetValues, sender=Product)
+post_save.connect(updateFacetCounts, sender=Product)
+post_delete.connect(removeFacetCounts, sender=Product)
+
+
+# Takes a deleted review (e.g. removed in the admin) out of its product's rating aggregates
+def removeReviewRating(sender, instance, **kwargs):
+    if instance.product_id is not None:
+        adjustRating(instance.product_id, -(instance.rating or 0), -1)
+
+
+post_delete.connect(removeReviewRating, sender=Review)
+
 # **OOP Concepts Explained:**
 # 1. **Encapsulation**: The logic to update the username is encapsulated inside the `updateUser` function, which operates as an interface for modifying the User model instance before it is saved. This keeps the logic within a dedicated method, preventing it from being scattered across other parts of the application.
 # 2. **Abstraction**: The `pre_save` signal abstracts away the need for manually checking and updating the username whenever a User model instance is created or modified. The update happens automatically behind the scenes.
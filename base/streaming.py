@@ -0,0 +1,206 @@
+# Streaming responses for large listings and exports.
+# Rows are read with `QuerySet.iterator(chunk_size=...)` (prefetches run once per chunk) and
+# serialized one at a time, so memory stays flat and the first bytes go out immediately.
+# Output is joined into chunks of about BUFFER_SIZE bytes (`bufferLines`).
+#
+# Under ASGI, Django reads a sync iterator with `sync_to_async(list)`, i.e. it builds the whole
+# response in memory before sending a byte. ASGI requests therefore get an async iterator
+# (`iterateAsync`) that fetches one chunk per `sync_to_async` call.
+
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+CHUNK_SIZE = 2000  # Rows fetched from the database per round trip
+BUFFER_SIZE = 64 * 1024  # Bytes of export output collected before they are sent
+
+EXPORT_TYPES = {  # Content type per export format (`?type=`)
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def bufferLines(lines):
+    """
+    Joins output lines into chunks of about BUFFER_SIZE bytes.
+
+    The first line is sent on its own, so the response starts at once.
+    """
+    chunk, size, first = [], 0, True
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if first or size >= BUFFER_SIZE:
+            yield ''.join(chunk)
+            chunk, size, first = [], 0, False
+    if chunk:
+        yield ''.join(chunk)
+
+
+async def iterateAsync(chunks):
+    """
+    Async generator over a sync iterator of response chunks, for ASGI servers.
+
+    Each chunk is produced by its own `sync_to_async` call. The calls run in the thread that
+    serves sync code, so the database cursor behind the rows keeps using the same connection.
+    """
+    done = object()
+    try:
+        while True:
+            chunk = await sync_to_async(next)(chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        # Client went away: close the rows (and their cursor) in their own thread
+        await sync_to_async(chunks.close)()
+
+
+def streamingResponse(request, lines, content_type):
+    """
+    Returns a StreamingHttpResponse sending `lines` in buffered chunks.
+
+    Args:
+        request: HTTP request object; ASGI requests get an async iterator.
+        lines: Generator of output text.
+        content_type (str): Content type of the response.
+
+    Returns:
+        StreamingHttpResponse: The response.
+    """
+    chunks = bufferLines(lines)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = iterateAsync(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+def serializeRows(queryset, serializer_class, chunkSize=CHUNK_SIZE):
+    """
+    Yields the serialized form of every row of `queryset`.
+
+    Args:
+        queryset (QuerySet): Rows to serialize; prefetch_related lookups are honoured per chunk.
+        serializer_class: DRF serializer used for each row.
+        chunkSize (int): Rows fetched per database round trip.
+    """
+    for row in queryset.iterator(chunk_size=chunkSize):
+        yield serializer_class(row).data
+
+
+def streamJsonArray(request, queryset, serializer_class, chunkSize=CHUNK_SIZE):
+    """
+    Returns a response streaming `queryset` as one JSON array.
+
+    Args:
+        request: HTTP request object.
+        queryset (QuerySet): Rows to stream.
+        serializer_class: DRF serializer used for each row.
+        chunkSize (int): Rows fetched per database round trip.
+
+    Returns:
+        StreamingHttpResponse: `application/json` response.
+    """
+    def generate():
+        yield '['
+        for i, data in enumerate(serializeRows(queryset, serializer_class, chunkSize)):
+            yield (',' if i else '') + json.dumps(data, cls=JSONEncoder)
+        yield ']'
+
+    return streamingResponse(request, generate(), 'application/json')
+
+
+def parseDay(value, name):
+    # Reads a YYYY-MM-DD query parameter as the (aware) start of that day
+    try:
+        day = parse_date(value) if value else None
+    except ValueError:
+        day = None  # Well-formed but not a real date, e.g. 2026-13-01
+    if day is None:
+        raise ValidationError({'detail': '%s must be a date (YYYY-MM-DD)' % name})
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filterDateRange(request, queryset, field):
+    """
+    Applies the `from` and `to` query parameters (inclusive YYYY-MM-DD days) to a date field.
+
+    Args:
+        request: HTTP request object.
+        queryset (QuerySet): Rows to filter.
+        field (str): Name of the DateTimeField the range applies to.
+
+    Returns:
+        QuerySet: The filtered rows.
+    """
+    params = request.query_params
+    if 'from' in params:
+        queryset = queryset.filter(**{field + '__gte': parseDay(params['from'], 'from')})
+    if 'to' in params:
+        queryset = queryset.filter(**{field + '__lt': parseDay(params['to'], 'to') + timedelta(days=1)})
+    return queryset
+
+
+class ExportEncoder(JSONEncoder):
+    # Keeps prices exact in NDJSON exports ("19.99" like the API, instead of a float)
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+
+class Echo:
+    # File-like object for csv.writer that hands every written line back instead of storing it
+    def write(self, value):
+        return value
+
+
+def csvValue(value):
+    # Plain text for a CSV cell: empty for None, ISO 8601 for dates
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def streamExport(request, rows, columns, name):
+    """
+    Returns a download streaming `rows` as CSV (default) or NDJSON, chosen with `?type=csv|ndjson`.
+
+    Args:
+        request: HTTP request object.
+        rows: Iterable of dicts, one per exported row (read lazily, e.g. from `QuerySet.iterator`).
+        columns (list): CSV columns, in order. NDJSON lines contain every key of a row.
+        name (str): Base name of the downloaded file.
+
+    Returns:
+        StreamingHttpResponse: The download.
+    """
+    exportType = request.query_params.get('type', 'csv')
+    if exportType not in EXPORT_TYPES:
+        raise ValidationError({'detail': 'type must be csv or ndjson'})
+
+    def lines():
+        if exportType == 'csv':
+            writer = csv.writer(Echo())
+            yield writer.writerow(columns)
+            for row in rows:
+                yield writer.writerow([csvValue(row.get(column)) for column in columns])
+        else:
+            for row in rows:
+                yield json.dumps(row, cls=ExportEncoder) + '\n'
+
+    response = streamingResponse(request, lines(), EXPORT_TYPES[exportType])
+    response['Content-Disposition'] = 'attachment; filename="%s-%s.%s"' % (name, timezone.localdate().isoformat(), exportType)
+    response['X-Accel-Buffering'] = 'no'  # Let proxies pass the chunks through as they come
+    return response
+
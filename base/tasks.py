@@ -0,0 +1,286 @@
+# Database-backed background task queue.
+#
+# Side effects that do not have to finish before the response (search indexing, leaderboard
+# refreshes, expiring stock holds, ...) are queued as Job rows and run by `manage.py run_worker`,
+# which needs nothing but the application database.
+#
+# - Tasks are plain functions registered with the `@task` decorator next to their implementation
+#   (modules listed in TASK_MODULES) and queued with `<function>.defer(...)` or `enqueue`.
+#   Arguments must be JSON serializable.
+# - Jobs are inserted when the surrounding transaction commits, so a worker never sees a job for
+#   work that was rolled back, and always sees the committed data.
+# - Workers claim the due job with the highest priority with a conditional UPDATE (and
+#   SELECT ... FOR UPDATE SKIP LOCKED where supported), so several threads and processes can
+#   share the queue. Finished jobs are deleted.
+# - A failed job is retried with exponential backoff; after `maxAttempts` failures it is moved to
+#   the DeadJob table. Jobs of a worker that died mid-run are queued again after TASK_QUEUE_LEASE.
+# - With TASK_QUEUE_EAGER = True (development without a worker) tasks run inline after commit,
+#   ignoring delays.
+
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from functools import wraps
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from base.models import DeadJob, Job
+
+logger = logging.getLogger(__name__)
+
+EAGER = getattr(settings, 'TASK_QUEUE_EAGER', False)  # Run tasks inline instead of queueing them
+MAX_ATTEMPTS = getattr(settings, 'TASK_QUEUE_MAX_ATTEMPTS', 5)  # Default attempts before a job is dead
+RETRY_DELAY = getattr(settings, 'TASK_QUEUE_RETRY_DELAY', 10)  # Seconds before the first retry (doubles per attempt)
+MAX_RETRY_DELAY = getattr(settings, 'TASK_QUEUE_MAX_RETRY_DELAY', 60 * 60)  # Upper bound of the retry delay
+LEASE = getattr(settings, 'TASK_QUEUE_LEASE', timedelta(minutes=10))  # Running jobs older than this are requeued
+POLL_INTERVAL = getattr(settings, 'TASK_QUEUE_POLL_INTERVAL', 1)  # Seconds an idle worker waits before polling
+
+TASK_MODULES = ['base.search', 'base.leaderboard', 'base.inventory', 'base.shards', 'base.analytics', 'base.images']  # Modules declaring tasks
+
+REGISTRY = {}  # Task functions per name
+
+
+def task(name=None, priority=0, maxAttempts=None):
+    """
+    Decorator registering a function as a background task.
+
+    The function gets a `defer(*args, **kwargs)` attribute that queues a call to it.
+
+    Args:
+        name (str): Task name stored in the queue; defaults to the function name.
+        priority (int): Default priority of its jobs (higher runs first).
+        maxAttempts (int): Attempts before a job is given up; TASK_QUEUE_MAX_ATTEMPTS by default.
+    """
+    def decorator(func):
+        taskName = name or func.__name__
+        REGISTRY[taskName] = func
+
+        @wraps(func)
+        def defer(*args, **kwargs):
+            enqueue(taskName, args, kwargs)
+
+        func.defer = defer
+        func.taskName = taskName
+        func.priority = priority
+        func.maxAttempts = maxAttempts or MAX_ATTEMPTS
+        return func
+
+    return decorator
+
+
+def autodiscover():
+    """
+    Imports every module in TASK_MODULES so their tasks are registered (done by the worker).
+    """
+    for module in TASK_MODULES:
+        import_module(module)
+
+
+def enqueue(name, args=(), kwargs=None, priority=None, delay=None, maxAttempts=None, runAt=None, unique=False):
+    """
+    Queues a call to a registered task once the current transaction commits.
+
+    Args:
+        name (str): Registered task name.
+        args (tuple): Positional arguments (JSON serializable).
+        kwargs (dict): Keyword arguments (JSON serializable).
+        priority (int): Higher priorities run first; the task's default if omitted.
+        delay (timedelta): Do not start the job before this much time has passed.
+        maxAttempts (int): Attempts before the job is moved to the dead-letter table; the task's
+            default if omitted.
+        runAt (datetime): Do not start the job before this moment (instead of `delay`).
+        unique (bool): Skip the job if one of the same task is already queued for the same
+            `runAt` (e.g. a sweep queued by every request that only needs to run once).
+    """
+    if name not in REGISTRY:
+        raise KeyError('Unknown task %s' % name)
+    func = REGISTRY[name]
+    args, kwargs = list(args), dict(kwargs or {})
+
+    if EAGER:
+        transaction.on_commit(lambda: runInline(func, args, kwargs))
+        return
+
+    def insert():
+        start = runAt or timezone.now() + (delay or timedelta())
+        if unique and Job.objects.filter(name=name, status=Job.QUEUED, runAt=start).exists():
+            return
+        Job.objects.create(
+            name=name, args=args, kwargs=kwargs,
+            priority=func.priority if priority is None else priority,
+            maxAttempts=maxAttempts or func.maxAttempts, runAt=start,
+        )
+
+    transaction.on_commit(insert)
+
+
+def slotTime(moment, interval):
+    """
+    Rounds `moment` up to the next multiple of `interval` (a timedelta): the shared `runAt` of a
+    `unique` job queued by every request in that interval.
+    """
+    seconds = interval.total_seconds()
+    return datetime.fromtimestamp(-(-moment.timestamp() // seconds) * seconds, tz=moment.tzinfo)
+
+
+def runInline(func, args, kwargs):
+    # Eager mode: a failing task is logged, it must not break the request that queued it
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Task %s failed', func.taskName)
+
+
+def retryDelay(attempts):
+    """
+    Returns the backoff before the next attempt: RETRY_DELAY doubled per failed attempt, capped
+    at MAX_RETRY_DELAY, with up to 10% jitter so failed jobs do not retry in lockstep.
+    """
+    seconds = min(RETRY_DELAY * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+    return timedelta(seconds=seconds * random.uniform(1, 1.1))
+
+
+def claim(worker):
+    """
+    Marks the next due job as running for `worker`.
+
+    Returns:
+        Job | None: The claimed job, or None when nothing is due.
+    """
+    # Where supported, concurrent workers skip rows another one is claiming. Elsewhere (SQLite)
+    # the conditional UPDATE alone decides, without a read-then-write transaction.
+    skipLocked = connection.features.has_select_for_update_skip_locked
+    while True:
+        with transaction.atomic() if skipLocked else nullcontext():
+            now = timezone.now()
+            due = Job.objects.filter(status=Job.QUEUED, runAt__lte=now).order_by('-priority', 'runAt', '_id')
+            job = (due.select_for_update(skip_locked=True) if skipLocked else due).first()
+            if job is None:
+                return None
+            # Conditional on the job still being queued: another worker may have claimed it meanwhile
+            claimed = Job.objects.filter(_id=job._id, status=Job.QUEUED).update(
+                status=Job.RUNNING, lockedBy=worker, lockedAt=now, attempts=F('attempts') + 1)
+        if claimed:
+            job.status, job.lockedBy, job.lockedAt, job.attempts = Job.RUNNING, worker, now, job.attempts + 1
+            return job
+
+
+def runJob(job):
+    """
+    Runs a claimed job and deletes it, schedules a retry or moves it to the dead-letter table.
+
+    Returns:
+        bool: True if the task succeeded.
+    """
+    func = REGISTRY.get(job.name)
+    try:
+        if func is None:
+            raise KeyError('Unknown task %s' % job.name)
+        func(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Task %s (job %s) failed on attempt %s', job.name, job._id, job.attempts)
+        fail(job, error, retry=func is not None)
+        return False
+
+    Job.objects.filter(_id=job._id).delete()
+    return True
+
+
+def fail(job, error, retry=True):
+    # Schedules the next attempt, or gives the job up when it is out of attempts
+    if retry and job.attempts < job.maxAttempts:
+        Job.objects.filter(_id=job._id).update(
+            status=Job.QUEUED, lockedBy=None, lockedAt=None, lastError=error,
+            runAt=timezone.now() + retryDelay(job.attempts))
+        return
+
+    with transaction.atomic():
+        DeadJob.objects.create(
+            name=job.name, args=job.args, kwargs=job.kwargs, priority=job.priority,
+            attempts=job.attempts, error=error, createdAt=job.createdAt)
+        Job.objects.filter(_id=job._id).delete()
+    logger.error('Task %s (job %s) moved to the dead-letter table', job.name, job._id)
+
+
+def requeueStale():
+    """
+    Queues jobs again whose worker stopped responding (running for longer than TASK_QUEUE_LEASE).
+
+    Returns:
+        int: Number of requeued jobs.
+    """
+    return Job.objects.filter(status=Job.RUNNING, lockedAt__lt=timezone.now() - LEASE).update(
+        status=Job.QUEUED, lockedBy=None, lockedAt=None, lastError='Worker lease expired')
+
+
+def retryDead(deadJobs):
+    """
+    Moves dead jobs back into the queue with a fresh set of attempts.
+
+    Args:
+        deadJobs (QuerySet): DeadJob rows to retry.
+
+    Returns:
+        int: Number of queued jobs.
+    """
+    with transaction.atomic():
+        dead = list(deadJobs.select_for_update())
+        Job.objects.bulk_create([
+            Job(name=job.name, args=job.args, kwargs=job.kwargs, priority=job.priority,
+                maxAttempts=max(job.attempts, 1), runAt=timezone.now())
+            for job in dead
+        ])
+        DeadJob.objects.filter(_id__in=[job._id for job in dead]).delete()
+    return len(dead)
+
+
+def workerName():
+    """
+    Returns a name identifying the current worker thread (host, process and thread).
+    """
+    return '%s:%s:%s' % (socket.gethostname(), os.getpid(), threading.current_thread().name)
+
+
+def work(stop, burst=False):
+    """
+    Claims and runs jobs until `stop` is set (or, with `burst`, until the queue has nothing due).
+
+    Args:
+        stop (threading.Event): Set to finish after the current job.
+        burst (bool): Return as soon as no job is due instead of polling.
+
+    Returns:
+        int: Number of jobs run.
+    """
+    worker = workerName()
+    done = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = claim(worker)
+            except DatabaseError:
+                logger.exception('Worker %s could not claim a job', worker)
+                stop.wait(POLL_INTERVAL)
+                continue
+            if job is None:
+                if burst:
+                    break
+                stop.wait(POLL_INTERVAL)
+                continue
+            runJob(job)
+            done += 1
+    finally:
+        connection.close()  # Every worker thread has its own database connection
+    return done
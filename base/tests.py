@@ -1,3 +1,517 @@
+# Tests of the stock bookkeeping: holds taken at checkout, confirmed on payment and released
+# when they expire, sharded stock counters, the validation of checkout quantities and of date
+# filters, the idempotency keys of checkout and payment, cursor pagination, the sales rollups and
+# the facet counts.
+#
+# Run with `python manage.py test base`.
+
+import base64
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Sum
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from base import analytics, facets, idempotency, shards
+from base.inventory import confirmHolds, releaseExpired
+from base.pagination import cursorPaginate, encodeCursor
+from base.models import (DailyProductSales, DailySales, FacetCount, IdempotencyKey, Job, Order, OrderItem, Product,
+                         StockHold, StockShard)
+
+
+class StockTestCase(TestCase):
+    """
+    Shared fixtures: an admin client and a product with 5 units in stock.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='pw', is_staff=True)
+        self.product = Product.objects.create(name='Roadster', price=10, countInStock=5)
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(self.user)
+
+    def placeOrder(self, qty, product=None, key=None):
+        # Checks out one line of `qty` units, with an Idempotency-Key header if `key` is given; returns the response
+        line = {'product': self.product._id if product is None else product, 'qty': qty, 'price': '10'}
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post('/api/orders/add/', {
+            'orderItems': [line], 'paymentMethod': 'PayPal', 'taxPrice': 0, 'shippingPrice': 0, 'totalPrice': 10,
+            'shippingAddress': {'address': 'Main St 1', 'city': 'Dhaka', 'postalCode': '1207', 'country': 'Bangladesh'},
+        }, format='json', **headers)
+
+    def orderId(self, qty):
+        response = self.placeOrder(qty)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['_id']
+
+    def assertStock(self, inStock, reserved):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.countInStock, self.product.countReserved), (inStock, reserved))
+
+    def expireHolds(self):
+        StockHold.objects.update(expiresAt=timezone.now() - timedelta(seconds=1))
+
+
+class StockHoldTests(StockTestCase):
+
+    def testCheckoutHoldsStock(self):
+        orderId = self.orderId(3)
+        self.assertStock(2, 3)
+        self.assertEqual(list(StockHold.objects.filter(order_id=orderId).values_list('qty', 'status')),
+                         [(3, StockHold.HELD)])
+
+    def testCheckoutRejectsMoreThanInStock(self):
+        response = self.placeOrder(6)
+        self.assertEqual(response.status_code, 400)
+        self.assertStock(5, 0)
+        self.assertFalse(Order.objects.exists())
+
+    def testConfirmMovesReservedUnitsOut(self):
+        orderId = self.orderId(3)
+        confirmHolds([orderId])
+        self.assertStock(2, 0)
+        self.assertEqual(StockHold.objects.get(order_id=orderId).status, StockHold.CONFIRMED)
+
+        confirmHolds([orderId])  # Confirming twice changes nothing
+        self.assertStock(2, 0)
+
+    def testReleaseExpiredPutsStockBack(self):
+        orderId = self.orderId(3)
+        self.assertEqual(releaseExpired(), 0)  # Not expired yet
+        self.expireHolds()
+        self.assertEqual(releaseExpired(), 1)
+        self.assertStock(5, 0)
+        self.assertEqual(StockHold.objects.get(order_id=orderId).status, StockHold.RELEASED)
+
+    def testPayingOrderConfirmsHolds(self):
+        orderId = self.orderId(3)
+        response = self.client.put('/api/orders/%d/pay/' % orderId)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Order.objects.get(_id=orderId).isPaid)
+        self.assertStock(2, 0)
+
+    def testPayingExpiredOrderTakesStockAgain(self):
+        orderId = self.orderId(3)
+        self.expireHolds()
+        releaseExpired()
+
+        response = self.client.put('/api/orders/%d/pay/' % orderId)
+        self.assertEqual(response.status_code, 200)
+        self.assertStock(2, 0)
+        self.assertEqual(StockHold.objects.get(order_id=orderId).status, StockHold.CONFIRMED)
+
+    def testPayingExpiredOrderNeverOversells(self):
+        orderId = self.orderId(3)
+        self.expireHolds()
+        releaseExpired()
+        self.orderId(4)  # Sells the released units
+
+        response = self.client.put('/api/orders/%d/pay/' % orderId)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.get(_id=orderId).isPaid)
+        self.assertStock(1, 4)
+        self.assertEqual(StockHold.objects.get(order_id=orderId).status, StockHold.RELEASED)
+
+    def testBulkPaymentSkipsSoldOutOrders(self):
+        expiredId = self.orderId(3)
+        self.expireHolds()
+        releaseExpired()
+        otherId = self.orderId(4)
+
+        response = self.client.put('/api/orders/pay/', {'ids': [expiredId, otherId]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = {result['_id']: result['result'] for result in response.json()['results']}
+        self.assertEqual(results, {expiredId: 'insufficientStock', otherId: 'updated'})
+        self.assertEqual(dict(Order.objects.values_list('_id', 'isPaid')), {expiredId: False, otherId: True})
+        self.assertStock(1, 0)
+
+
+class CheckoutValidationTests(StockTestCase):
+
+    def testRejectsInvalidLines(self):
+        for qty, product in [(0, None), (-10, None), (1.5, None), ('x', None), (True, None),
+                             ('--1', None), ('²', None), ('1-', None), (1, 'abc'), (1, '--1')]:
+            with self.subTest(qty=qty, product=product):
+                response = self.placeOrder(qty, product)
+                self.assertEqual(response.status_code, 400)
+        self.assertStock(5, 0)
+        self.assertFalse(Order.objects.exists())
+
+    def testAcceptsWholeNumberStrings(self):
+        self.orderId('2')
+        self.assertStock(3, 2)
+
+
+class DateFilterTests(StockTestCase):
+
+    def testInvalidDatesAreRejected(self):
+        for url in ['/api/orders/?from=2026-13-01', '/api/orders/?to=2026-02-30', '/api/orders/analytics/?from=2026-13-01',
+                    '/api/orders/export/?from=2026-00-10', '/api/products/export/?to=2026-04-31']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+    def testValidDatesFilter(self):
+        self.orderId(1)
+        today = timezone.localdate()
+        self.assertEqual(len(self.client.get('/api/orders/?from=%s' % today).json()), 1)
+        self.assertEqual(len(self.client.get('/api/orders/?to=%s' % (today - timedelta(days=1))).json()), 0)
+
+
+class IdempotencyTests(StockTestCase):
+
+    def testRetryReplaysStoredResponse(self):
+        first = self.placeOrder(2, key='checkout-1')
+        retry = self.placeOrder(2, key='checkout-1')
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertStock(3, 2)  # Stock taken once
+
+    def testClientErrorsAreReplayed(self):
+        self.assertEqual(self.placeOrder(0, key='checkout-1').status_code, 400)
+        self.assertEqual(self.placeOrder(0, key='checkout-1')['Idempotent-Replayed'], 'true')
+
+    def testKeyReusedForDifferentRequest(self):
+        self.placeOrder(2, key='checkout-1')
+        response = self.placeOrder(3, key='checkout-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def testKeysArePerUser(self):
+        self.placeOrder(2, key='checkout-1')
+        self.client.force_authenticate(User.objects.create_user(username='other', password='pw'))
+        self.assertFalse(self.placeOrder(2, key='checkout-1').has_header('Idempotent-Replayed'))
+        self.assertEqual(Order.objects.count(), 2)
+
+    def testExpiredKeyRunsAgain(self):
+        self.placeOrder(1, key='checkout-1')
+        IdempotencyKey.objects.update(expiresAt=timezone.now() - timedelta(seconds=1))
+        response = self.placeOrder(1, key='checkout-1')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Order.objects.count(), 2)
+
+    def inFlight(self, key):
+        # Key row of an original request that has not answered yet
+        return IdempotencyKey.objects.create(user=self.user, key=key, fingerprint=self.digest(key),
+                                             expiresAt=timezone.now() + timedelta(hours=1))
+
+    def digest(self, key):
+        # Fingerprint of the request `placeOrder(2)` sends
+        request = APIRequestFactory().post('/api/orders/add/', {
+            'orderItems': [{'product': self.product._id, 'qty': 2, 'price': '10'}], 'paymentMethod': 'PayPal',
+            'taxPrice': 0, 'shippingPrice': 0, 'totalPrice': 10,
+            'shippingAddress': {'address': 'Main St 1', 'city': 'Dhaka', 'postalCode': '1207', 'country': 'Bangladesh'},
+        }, format='json')
+        return idempotency.fingerprint(Request(request, parsers=[JSONParser()]))
+
+    def testDuplicateWaitsForOriginal(self):
+        record = self.inFlight('checkout-1')
+
+        def originalAnswers(seconds):
+            record.responseStatus, record.responseBody = 200, {'_id': 99}
+            record.save()
+
+        with mock.patch('base.idempotency.time.sleep', side_effect=originalAnswers) as sleep:
+            response = self.placeOrder(2, key='checkout-1')
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(response.json(), {'_id': 99})
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertFalse(Order.objects.exists())
+
+    def testDuplicateGivesUpWhileOriginalRuns(self):
+        self.inFlight('checkout-1')
+        with mock.patch('base.idempotency.WAIT_SECONDS', 0):
+            response = self.placeOrder(2, key='checkout-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Order.objects.exists())
+
+    def callView(self, view, key):
+        request = APIRequestFactory().post('/api/test/', {'amount': 1}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, self.user)
+        return view(request)
+
+    def testServerErrorReleasesKey(self):
+        answers = iter([Response(status=503), Response({'ok': True})])
+        view = api_view(['POST'])(idempotency.idempotent(lambda request: next(answers)))
+
+        self.assertEqual(self.callView(view, 'pay-1').status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        response = self.callView(view, 'pay-1')  # The retry runs the view again
+        self.assertEqual((response.status_code, response.data), (200, {'ok': True}))
+        self.assertEqual(IdempotencyKey.objects.get().responseStatus, 200)
+
+    def testExceptionReleasesKey(self):
+        def failing(request):
+            raise RuntimeError('gateway down')
+
+        view = api_view(['POST'])(idempotency.idempotent(failing))
+        with self.assertRaises(RuntimeError):
+            self.callView(view, 'pay-1')
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def testPurgeExpired(self):
+        self.inFlight('live')
+        IdempotencyKey.objects.create(user=self.user, key='old', fingerprint='x', expiresAt=timezone.now())
+        self.assertEqual(idempotency.purgeExpired(batchSize=1), 1)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['live'])
+
+
+class CursorPaginationTests(TestCase):
+
+    def setUp(self):
+        # Ties on the price: pages must still be cut between rows of the same price
+        for price in [9, 5, 7, 5, 9, 5, 7, 9]:
+            Product.objects.create(name='Car %d' % price, price=price, countInStock=1)
+
+    def page(self, token='', descending=True, size=3):
+        request = Request(APIRequestFactory().get('/api/products/', {'cursor': token, 'page_size': size}))
+        rows, nextToken, prevToken = cursorPaginate(request, Product.objects.all(), ('price', '_id'), descending=descending)
+        return [row._id for row in rows], nextToken, prevToken
+
+    def expected(self, descending):
+        rows = Product.objects.order_by(*(('-price', '-_id') if descending else ('price', '_id')))
+        return list(rows.values_list('_id', flat=True))
+
+    def walk(self, descending):
+        # Follows `next` to the end, then `prev` back to the start; returns both page lists
+        forward, token = [], ''
+        while token is not None:
+            ids, token, prevToken = self.page(token, descending)
+            self.assertEqual(prevToken is None, not forward)  # Only the first page has no previous page
+            forward.append((ids, prevToken))
+        backward, token = [], forward[-1][1]
+        while token is not None:
+            ids, nextToken, token = self.page(token, descending)
+            self.assertIsNotNone(nextToken)
+            backward.insert(0, ids)
+        return [ids for ids, _ in forward], backward
+
+    def testRoundTripDescending(self):
+        forward, backward = self.walk(descending=True)
+        self.assertEqual(sum(forward, []), self.expected(descending=True))
+        self.assertEqual([len(ids) for ids in forward], [3, 3, 2])
+        self.assertEqual(backward, forward[:-1])
+
+    def testRoundTripAscending(self):
+        forward, backward = self.walk(descending=False)
+        self.assertEqual(sum(forward, []), self.expected(descending=False))
+        self.assertEqual(backward, forward[:-1])
+
+    def testSinglePage(self):
+        ids, nextToken, prevToken = self.page(size=20)
+        self.assertEqual(ids, self.expected(descending=True))
+        self.assertEqual((nextToken, prevToken), (None, None))
+
+    def testInvalidCursors(self):
+        tampered = [
+            'not a cursor',
+            encodeCursor(['9.00'], 'next'),  # One value for two ordering columns
+            encodeCursor(['9.00', '1'], 'sideways'),
+            encodeCursor(['cheap', '1'], 'next'),  # Not a price
+            base64.urlsafe_b64encode(b'{"v": 1}').decode(),
+        ]
+        for token in tampered:
+            with self.subTest(token=token):
+                with self.assertRaises(ValidationError):
+                    self.page(token)
+
+    def testInvalidCursorIsBadRequest(self):
+        client = APIClient(HTTP_HOST='localhost')
+        self.assertEqual(client.get('/api/products/', {'cursor': 'not a cursor'}).status_code, 400)
+        self.assertEqual(client.get('/api/products/', {'cursor': ''}).status_code, 200)
+
+
+class SalesRollupTests(StockTestCase):
+
+    def createOrder(self, qty, paid=False):
+        # Order of `qty` units at 10 each, not counted in the rollups yet
+        order = Order.objects.create(user=self.user, totalPrice=10 * qty, isPaid=paid, paidAt=timezone.now() if paid else None)
+        OrderItem.objects.create(order=order, product=self.product, name=self.product.name, qty=qty, price=10)
+        return order._id
+
+    def totals(self):
+        # (orders, units, revenue, paidOrders, paidUnits, paidRevenue) of every day together
+        sums = DailySales.objects.aggregate(**{name: Sum(name) for name in analytics.METRICS})
+        return tuple(sums[name] or 0 for name in analytics.METRICS)
+
+    def testRetriedJobsCountOnce(self):
+        orderId = self.createOrder(2, paid=True)
+        unpaidId = self.createOrder(1)
+        for _ in range(2):
+            analytics.recordOrder(orderId)
+            analytics.recordOrder(unpaidId)
+            analytics.recordPayments([orderId, unpaidId])
+        self.assertEqual(self.totals(), (2, 3, 30, 1, 2, 20))
+        self.assertEqual(DailyProductSales.objects.get().units, 3)
+
+    def testRebuildMatchesJobs(self):
+        ids = [self.createOrder(qty, paid=qty % 2 == 1) for qty in (1, 2, 3, 4)]
+        for orderId in ids:
+            analytics.recordOrder(orderId)
+        analytics.recordPayments(ids)
+        counted = self.totals()
+
+        self.assertEqual(analytics.rebuildRollups(chunkSize=3), 4)
+        self.assertEqual(self.totals(), counted)
+        self.assertEqual(counted, (4, 10, 100, 2, 4, 40))
+
+    def testRebuildCountsPendingOrdersOnce(self):
+        counted = self.createOrder(1, paid=True)
+        analytics.recordOrder(counted)
+        analytics.recordPayments([counted])
+        pending = self.createOrder(2, paid=True)  # Its jobs are still queued
+
+        analytics.rebuildRollups()
+        analytics.recordOrder(pending)  # The queued jobs run after the rebuild
+        analytics.recordPayments([pending])
+        self.assertEqual(self.totals(), (2, 3, 30, 2, 3, 30))
+
+    def testJobsDuringRebuildAreNotCountedTwice(self):
+        counted = self.createOrder(1, paid=True)
+        analytics.recordOrder(counted)
+        analytics.recordPayments([counted])
+        pending = self.createOrder(2, paid=True)
+        for _ in range(3):
+            self.createOrder(1)
+        tally = analytics.tally
+        inFlight = []
+
+        def jobsRunMeanwhile(*args):
+            # While the first chunk is counted, the pending order's jobs run and a new order is placed
+            if not inFlight:
+                inFlight.append(self.createOrder(4, paid=True))
+                for orderId in (pending, inFlight[0]):
+                    analytics.recordOrder(orderId)
+                    analytics.recordPayments([orderId])
+            return tally(*args)
+
+        with mock.patch('base.analytics.tally', side_effect=jobsRunMeanwhile):
+            analytics.rebuildRollups(chunkSize=2)
+        self.assertEqual(self.totals(), (6, 10, 100, 3, 7, 70))
+        self.assertFalse(Order.objects.filter(isRolledUp=False).exists())
+
+    def testAnalyticsRange(self):
+        analytics.recordOrder(self.createOrder(2))
+        today = timezone.localdate()
+        response = self.client.get('/api/orders/analytics/', {'from': today, 'to': today})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['totals']['units'], 2)
+        self.assertEqual(len(self.client.get('/api/orders/analytics/').json()['rows']), 1)  # Last 30 days by default
+
+        invalid = [{'from': today, 'to': today - timedelta(days=1)}, {'from': today - timedelta(days=366 * 3)},
+                   {'from': 'yesterday'}, {'groupBy': 'week'}, {'limit': '0'}, {'product': 'abc'}]
+        for params in invalid:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/orders/analytics/', params).status_code, 400)
+
+
+class FacetCountTests(StockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.product.category, self.product.brand = 'Cars', 'Audi'
+        self.product.save()
+
+    def stored(self):
+        # Current counts as {(facet, value): count}, empty values left out
+        return {(row.facet, row.value): row.count for row in FacetCount.objects.filter(count__gt=0)}
+
+    def assertMatchesRebuild(self, expected):
+        self.assertEqual(self.stored(), expected)
+        facets.rebuild()
+        self.assertEqual(self.stored(), expected)
+
+    def testCreateEditDelete(self):
+        other = Product.objects.create(name='Estate', price=10, countInStock=1, category='Cars', brand='BMW')
+        self.assertMatchesRebuild({('category', 'Cars'): 2, ('brand', 'Audi'): 1, ('brand', 'BMW'): 1})
+
+        other.category = 'Vans'
+        other.save()
+        self.assertMatchesRebuild({('category', 'Cars'): 1, ('category', 'Vans'): 1, ('brand', 'Audi'): 1, ('brand', 'BMW'): 1})
+
+        other.name = 'Estate S'
+        other.save()  # No facet changed
+        self.assertMatchesRebuild({('category', 'Cars'): 1, ('category', 'Vans'): 1, ('brand', 'Audi'): 1, ('brand', 'BMW'): 1})
+
+        other.delete()
+        self.product.brand = ''
+        self.product.save()  # Empty values are not counted
+        self.assertMatchesRebuild({('category', 'Cars'): 1})
+
+    def testBulkUpdate(self):
+        other = Product.objects.create(name='Estate', price=10, countInStock=1, category='Cars', brand='Audi')
+        response = self.client.patch('/api/products/bulk/', {'products': [
+            {'_id': self.product._id, 'category': 'Vans'},
+            {'_id': other._id, 'brand': 'BMW', 'price': '12.00'},
+            {'_id': other._id, 'category': 'Cars'},  # Unchanged
+        ]}, format='json')
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertMatchesRebuild({('category', 'Cars'): 1, ('category', 'Vans'): 1, ('brand', 'Audi'): 1, ('brand', 'BMW'): 1})
+
+    def testCachedCountsDroppedOnChange(self):
+        self.assertEqual(facets.counts()['brand'], {'Audi': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Estate', price=10, countInStock=1, category='Cars', brand='BMW')
+        self.assertEqual(facets.counts()['brand'], {'Audi': 1, 'BMW': 1})
+
+
+class StockShardTests(StockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.product.countInStock = 100
+        self.product.save()
+        shards.enableShards(self.product, 4)
+        self.product.refresh_from_db()
+        with transaction.atomic():
+            shards.takeStock(self.product, 30)  # The column still says 100
+
+    def shardTotal(self):
+        return sum(StockShard.objects.filter(product=self.product).values_list('count', flat=True))
+
+    def updateProduct(self, **values):
+        body = {'name': 'Roadster', 'price': '10', 'brand': 'Automart', 'countInStock': 100,
+                'category': 'Cars', 'description': 'Two seats'}
+        body.update(values)
+        response = self.client.put('/api/products/update/%d/' % self.product._id, body, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def testEditKeepsShardStock(self):
+        self.updateProduct(name='Roadster S')
+        self.assertEqual(self.shardTotal(), 70)
+
+        product = Product.objects.get(_id=self.product._id)
+        product.name = 'Roadster GT'
+        product.save()  # A full save writes the stale column but must not re-spread it
+        self.assertEqual(self.shardTotal(), 70)
+
+    def testNewCountInStockIsSpread(self):
+        self.updateProduct(countInStock=50)
+        self.assertEqual(sorted(StockShard.objects.filter(product=self.product).values_list('count', flat=True)),
+                         [12, 12, 13, 13])
+
+    def testBulkUpdateComparesWithShardTotal(self):
+        response = self.client.patch('/api/products/bulk/', {'products': [{'_id': self.product._id, 'countInStock': 100}]},
+                                     format='json')
+        self.assertEqual(response.json()['results'][0]['result'], 'updated')
+        self.assertEqual(self.shardTotal(), 100)
+
+    def testShardChangesQueueOneReconcile(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            shards.takeStock(self.product, 5)
+            shards.returnStock(self.product._id, 4, 2)
+        self.assertEqual(list(Job.objects.values_list('name', flat=True)), ['reconcile'])
 
-# Create your tests here.
+        shards.reconcile()
+        self.assertStock(67, 0)
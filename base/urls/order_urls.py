@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path  # Importing path to define URL patterns
 from base.views import order_views as views  # Importing the views for order-related endpoints
 
+# Read endpoints served by `async def` views when running under ASGI (see base/asyncapi.py)
+asyncViews = settings.ASYNC_READ_VIEWS
+
 # URL pattern definitions for handling orders
 urlpatterns = [
     # Route to fetch all orders (GET request) - mapped to the getOrders view
@@ -9,14 +13,24 @@ urlpatterns = [
     # Route to add order items to an existing order (POST request) - mapped to the addOrderItems view
     path('add/', views.addOrderItems, name='orders-add'),  # Add items to order
 
+    # Route to fetch sales figures from the rollup tables (GET request, admin only) - mapped to the getSalesAnalytics view
+    path('analytics/', views.getSalesAnalytics, name='orders-analytics'),  # Sales analytics
+
+    # Route to download orders as CSV/NDJSON (GET request, admin only) - mapped to the exportOrders view
+    path('export/', views.exportOrders, name='orders-export'),  # Export orders
+
+    # Routes to mark many orders as delivered / paid at once (PUT requests, admin only)
+    path('deliver/', views.bulkUpdateOrdersToDelivered, name='orders-bulk-delivered'),  # Bulk mark delivered
+    path('pay/', views.bulkUpdateOrdersToPaid, name='orders-bulk-paid'),  # Bulk mark paid
+
     # Route to fetch orders of the currently logged-in user (GET request) - mapped to the getMyOrders view
-    path('myorders/', views.getMyOrders, name='myorders'),  # View user's orders
+    path('myorders/', views.getMyOrdersAsync if asyncViews else views.getMyOrders, name='myorders'),  # View user's orders
 
     # Route to update order status to 'Delivered' (PATCH request) - mapped to the updateOrderToDelivered view
     path('<str:pk>/deliver/', views.updateOrderToDelivered, name='order-delivered'),  # Mark order as delivered
 
     # Route to fetch a specific order by its primary key (GET request) - mapped to the getOrderById view
-    path('<str:pk>/', views.getOrderById, name='user-order'),  # View details of a specific order
+    path('<str:pk>/', views.getOrderByIdAsync if asyncViews else views.getOrderById, name='user-order'),  # View details of a specific order
 
     # Route to update the order status to 'Paid' (PATCH request) - mapped to the updateOrderToPaid view
     path('<str:pk>/pay/', views.updateOrderToPaid, name='pay'),  # Mark order as paid
@@ -1,25 +1,41 @@
+from django.conf import settings
 from django.urls import path  # Importing the 'path' function to define URL patterns
 from base.views import product_views as views  # Importing views related to product management
 
+# Read endpoints served by `async def` views when running under ASGI (see base/asyncapi.py)
+asyncViews = settings.ASYNC_READ_VIEWS
+
 # URL pattern definitions for handling product-related requests
 urlpatterns = [
     # Route to fetch all products (GET request) - mapped to the getProducts view
-    path('', views.getProducts, name="products"),  # View all products
+    path('', views.getProductsAsync if asyncViews else views.getProducts, name="products"),  # View all products
 
     # Route to create a new product (POST request) - mapped to the createProduct view
     path('create/', views.createProduct, name="product-create"),  # Create a new product
 
+    # Route to update many products at once (PATCH request, admin only) - mapped to the bulkUpdateProducts view
+    path('bulk/', views.bulkUpdateProducts, name='products-bulk-update'),  # Bulk price/stock updates
+
     # Route to upload product images (POST request) - mapped to the uploadImage view
     path('upload/', views.uploadImage, name="image-upload"),  # Upload product image
 
-    # Route to create a review for a specific product (POST request) - mapped to the createProductReview view
-    path('<str:pk>/reviews/', views.createProductReview, name="create-review"),  # Create product review
+    # Route to list (GET request) or create (POST request) the reviews of a specific product - mapped to the productReviews view
+    path('<str:pk>/reviews/', views.productReviews, name="product-reviews"),  # Paginated reviews / create product review
+
+    # Route to fetch price/stock records for several products at once (GET request) - mapped to the getProductsBatch view
+    path('batch/', views.getProductsBatch, name='products-batch'),  # Batch product lookup for cart lines
+
+    # Route to fetch catalog cache hit/miss statistics (GET request, admin only) - mapped to the getCatalogCacheStats view
+    path('cache/stats/', views.getCatalogCacheStats, name='catalog-cache-stats'),  # View catalog cache statistics
+
+    # Route to download the whole catalog as CSV or NDJSON (GET request, admin only) - mapped to the exportProducts view
+    path('export/', views.exportProducts, name='products-export'),  # Download the catalog as CSV/NDJSON (admin)
 
     # Route to fetch the top-rated products (GET request) - mapped to the getTopProducts view
-    path('top/', views.getTopProducts, name='top-products'),  # View top-rated products
+    path('top/', views.getTopProductsAsync if asyncViews else views.getTopProducts, name='top-products'),  # View top-rated products
 
     # Route to fetch details of a specific product by its primary key (GET request) - mapped to the getProduct view
-    path('<str:pk>/', views.getProduct, name="product"),  # View a specific product
+    path('<str:pk>/', views.getProductAsync if asyncViews else views.getProduct, name="product"),  # View a specific product
 
     # Route to update an existing product (PUT/PATCH request) - mapped to the updateProduct view
     path('update/<str:pk>/', views.updateProduct, name="product-update"),  # Update an existing product
@@ -19,6 +19,12 @@ urlpatterns = [
     # Users route: Retrieves a list of all users (GET request)
     path('', views.getUsers, name="users"),  # Get all users
 
+    # Directory route: Searches users by email/name prefix, one page at a time (GET request, admin only)
+    path('directory/', views.getUserDirectory, name='users-directory'),  # Search users
+
+    # Export route: Downloads all users as CSV or NDJSON (GET request, admin only)
+    path('export/', views.exportUsers, name='users-export'),  # Download users as CSV/NDJSON (admin)
+
     # User by ID route: Retrieves a specific user's details (GET request by user ID)
     path('<str:pk>/', views.getUserById, name='user'),  # Get user by ID
 
@@ -4,25 +4,90 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 
-from base.models import Product, Order, OrderItem, ShippingAddress
+from base.models import Product, Order, OrderItem, ShippingAddress, DailySales, DailyProductSales, DailyCategorySales
 from base.serializers import ProductSerializer, OrderSerializer
+from base.pagination import usesCursor, cursorPaginate, acursorPaginate
+from base.asyncapi import asyncApiView
+from base.streaming import streamJsonArray, streamExport, filterDateRange, parseDay, CHUNK_SIZE
+from base.idempotency import idempotent
+from base.inventory import holdStock, confirmHolds, InsufficientStock, HoldsChanged
+from base import analytics
 
 from rest_framework import status
-from datetime import datetime
+from rest_framework.exceptions import ValidationError
+import re
+from datetime import timedelta
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Sum
+
+
+WHOLE_NUMBER = re.compile(r'-?[0-9]+\Z')  # Numeric strings accepted as quantities and IDs (ASCII digits only)
+
+
+class CheckoutError(Exception):
+    """
+    Raised inside the checkout transaction to roll it back and report the reason to the client.
+    """
+
+
+def parseWholeNumber(value):
+    # Integer value of a JSON number or numeric string, None if it is not a whole number
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and WHOLE_NUMBER.match(value.strip()):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return None
+
+
+def parseOrderItems(orderItems):
+    """
+    Validates the lines of a checkout request.
+
+    Args:
+        orderItems (list): Lines of the request, each with `product` and `qty`.
+
+    Returns:
+        list: (product ID, quantity) per line.
+
+    Raises:
+        CheckoutError: If a line has no valid product ID or a quantity below 1.
+    """
+    if not isinstance(orderItems, list):
+        raise CheckoutError('orderItems must be a list')
+    lines = []
+    for item in orderItems:
+        if not isinstance(item, dict):
+            raise CheckoutError('Each order item must be an object')
+        productId = parseWholeNumber(item.get('product'))
+        qty = parseWholeNumber(item.get('qty'))
+        if productId is None:
+            raise CheckoutError('Order items need a product ID')
+        if qty is None or qty < 1:
+            raise CheckoutError('Quantity must be a whole number of at least 1')
+        lines.append((productId, qty))
+    return lines
+
 
 # Function to add order items
 @api_view(['POST'])  # Restricts this view to HTTP POST requests
 @permission_classes([IsAuthenticated])  # Only authenticated users can access this view
+@idempotent  # Retries with the same Idempotency-Key header replay the first response
 def addOrderItems(request):
     """
     Handles the creation of a new order for the authenticated user.
 
-    Steps:
-    1. Validates that order items are present in the request data.
-    2. Creates an `Order` object linked to the authenticated user.
-    3. Creates a `ShippingAddress` for the order.
-    4. Creates individual `OrderItem` records and links them to the order.
-    5. Updates product stock after order creation.
+    Steps (all inside one transaction, so a failed checkout leaves nothing behind):
+    1. Validates that order items are present, with a product ID and a quantity of at least 1 each.
+    2. Loads all ordered products with a single query.
+    3. Creates an `Order` object linked to the authenticated user.
+    4. Holds the stock for the order (see base/inventory.py); insufficient stock rejects the checkout.
+    5. Creates the `ShippingAddress` and all `OrderItem` records (with a single bulk insert).
+    6. Queues the order for the sales rollups (see base/analytics.py).
 
     OOP Concept Used:
     - **Encapsulation**: The `Order`, `OrderItem`, and `ShippingAddress` models encapsulate order-related data.
@@ -31,60 +96,128 @@ def addOrderItems(request):
     data = request.data  # Extract data from the request
 
     # Validate that the request contains order items
-    orderItems = data['orderItems']
-    if orderItems and len(orderItems) == 0:
+    orderItems = data.get('orderItems')
+    if not orderItems:
         return Response({'detail': 'No Order Items'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # (1) Create an order linked to the user
-    order = Order.objects.create(
-        user=user,
-        paymentMethod=data['paymentMethod'],
-        taxPrice=data['taxPrice'],
-        shippingPrice=data['shippingPrice'],
-        totalPrice=data['totalPrice']
-    )
-
-    # (2) Create a shipping address for the order
-    shipping = ShippingAddress.objects.create(
-        order=order,
-        address=data['shippingAddress']['address'],
-        city=data['shippingAddress']['city'],
-        postalCode=data['shippingAddress']['postalCode'],
-        country=data['shippingAddress']['country'],
-    )
-
-    # (3) Add each item in the order to the database
-    for i in orderItems:
-        product = Product.objects.get(_id=i['product'])  # Fetch the product by ID
-
-        # Create an order item for the product
-        item = OrderItem.objects.create(
-            product=product,
-            order=order,
-            name=product.name,
-            qty=i['qty'],
-            price=i['price'],
-            image=product.image.url,
-        )
-
-        # (4) Update stock for the product
-        product.countInStock -= item.qty
-        product.save()
+    try:
+        lines = parseOrderItems(orderItems)
+    except CheckoutError as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Total quantity per product (a product may appear on several lines)
+    quantities = {}
+    for productId, qty in lines:
+        quantities[productId] = quantities.get(productId, 0) + qty
+
+    try:
+        with transaction.atomic():
+            # (1) Load every ordered product with one query
+            products = Product.objects.in_bulk(list(quantities))
+            missing = [pk for pk in quantities if pk not in products]
+            if missing:
+                raise CheckoutError('Product %s does not exist' % missing[0])
+
+            # (2) Create an order linked to the user
+            order = Order.objects.create(
+                user=user,
+                paymentMethod=data['paymentMethod'],
+                taxPrice=data['taxPrice'],
+                shippingPrice=data['shippingPrice'],
+                totalPrice=data['totalPrice']
+            )
+
+            # (3) Hold the stock until the order is paid; conditional updates reject insufficient stock
+            holdStock(order, quantities, products)
+
+            # (4) Create a shipping address for the order
+            ShippingAddress.objects.create(
+                order=order,
+                address=data['shippingAddress']['address'],
+                city=data['shippingAddress']['city'],
+                postalCode=data['shippingAddress']['postalCode'],
+                country=data['shippingAddress']['country'],
+            )
+
+            # (5) Insert all order items with a single query
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    product=products[productId],
+                    order=order,
+                    name=products[productId].name,
+                    qty=qty,
+                    price=i['price'],
+                    image=products[productId].image.url,
+                )
+                for i, (productId, qty) in zip(orderItems, lines)
+            ])
+
+            # (6) Count the order in the sales rollups once the checkout has committed
+            analytics.recordOrder.defer(order._id)
+    except (CheckoutError, InsufficientStock) as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
     # Serialize the created order and return the data
     serializer = OrderSerializer(order, many=False)
     return Response(serializer.data)
 
 
+def optimizeOrders(orders):
+    """
+    Loads everything `OrderSerializer` needs with the orders themselves: user and shipping
+    address are joined, order items come from one extra query for the whole batch.
+    """
+    return orders.select_related('user', 'shippingaddress').prefetch_related('orderitem_set')
+
+
+def parseBoolean(value, name):
+    # Reads a true/false query parameter
+    if value.lower() in ('true', '1'):
+        return True
+    if value.lower() in ('false', '0'):
+        return False
+    raise ValidationError({'detail': '%s must be true or false' % name})
+
+
+def filterOrders(request, orders):
+    """
+    Applies the admin order filters from the query string.
+
+    Supported parameters: `isPaid`, `isDelivered` (true/false), `user` (user ID),
+    `from` and `to` (inclusive YYYY-MM-DD dates on `createdAt`).
+
+    Args:
+        request: HTTP request object.
+        orders (QuerySet): Orders to filter.
+
+    Returns:
+        QuerySet: The filtered orders.
+    """
+    params = request.query_params
+    for name in ('isPaid', 'isDelivered'):
+        if name in params:
+            orders = orders.filter(**{name: parseBoolean(params[name], name)})
+    if 'user' in params:
+        if not params['user'].isdigit():
+            raise ValidationError({'detail': 'user must be a user ID'})
+        orders = orders.filter(user_id=int(params['user']))
+    return filterDateRange(request, orders, 'createdAt')
+
+
 # Function to get orders for the authenticated user
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def getMyOrders(request):
     """
     Retrieves all orders for the authenticated user.
+    Passing `cursor` returns one page of orders with `next`/`prev` tokens instead.
     """
     user = request.user
-    orders = user.order_set.all()  # Access related orders using the reverse relationship
+    orders = optimizeOrders(user.order_set.all())  # Access related orders using the reverse relationship
+    if usesCursor(request):
+        orders, nextCursor, prevCursor = cursorPaginate(request, orders)
+        serializer = OrderSerializer(orders, many=True)
+        return Response({'orders': serializer.data, 'next': nextCursor, 'prev': prevCursor})
     serializer = OrderSerializer(orders, many=True)
     return Response(serializer.data)
 
@@ -95,12 +228,79 @@ def getMyOrders(request):
 def getOrders(request):
     """
     Retrieves all orders. Only accessible to admin users.
+
+    Orders can be filtered with `isPaid`, `isDelivered`, `user`, `from` and `to` (see `filterOrders`).
+    Passing `cursor` (and optionally `page_size`) returns one page of orders with
+    `next`/`prev` tokens; passing `stream=true` streams every matching order as a JSON
+    array for full exports.
     """
-    orders = Order.objects.all()
+    orders = optimizeOrders(filterOrders(request, Order.objects.all()))
+    if usesCursor(request):
+        orders, nextCursor, prevCursor = cursorPaginate(request, orders)
+        serializer = OrderSerializer(orders, many=True)
+        return Response({'orders': serializer.data, 'next': nextCursor, 'prev': prevCursor})
+    if parseBoolean(request.query_params.get('stream', 'false'), 'stream'):
+        return streamJsonArray(request, orders.order_by('-createdAt', '-_id'), OrderSerializer)
     serializer = OrderSerializer(orders, many=True)
     return Response(serializer.data)
 
 
+# Columns of the order export (CSV); NDJSON lines also carry the `orderItems`
+ORDER_EXPORT_COLUMNS = [
+    '_id', 'createdAt', 'user', 'email', 'paymentMethod', 'items', 'units', 'taxPrice', 'shippingPrice',
+    'totalPrice', 'isPaid', 'paidAt', 'isDelivered', 'deliveredAt', 'address', 'city', 'postalCode', 'country',
+]
+
+
+def orderExportRow(order):
+    # Flattens an order (with prefetched items, user and shipping address) into one export row
+    items = order.orderitem_set.all()
+    try:
+        address = order.shippingaddress
+    except ShippingAddress.DoesNotExist:
+        address = None
+    return {
+        '_id': order._id,
+        'createdAt': order.createdAt,
+        'user': order.user_id,
+        'email': order.user.email if order.user else None,
+        'paymentMethod': order.paymentMethod,
+        'items': len(items),
+        'units': sum(item.qty or 0 for item in items),
+        'taxPrice': order.taxPrice,
+        'shippingPrice': order.shippingPrice,
+        'totalPrice': order.totalPrice,
+        'isPaid': order.isPaid,
+        'paidAt': order.paidAt,
+        'isDelivered': order.isDelivered,
+        'deliveredAt': order.deliveredAt,
+        'address': address.address if address else None,
+        'city': address.city if address else None,
+        'postalCode': address.postalCode if address else None,
+        'country': address.country if address else None,
+        'orderItems': [
+            {'product': item.product_id, 'name': item.name, 'qty': item.qty, 'price': item.price}
+            for item in items
+        ],
+    }
+
+
+# Function to export orders (Admin only)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def exportOrders(request):
+    """
+    Streams matching orders as a CSV (`type=csv`, default) or NDJSON (`type=ndjson`) download,
+    oldest first. Accepts the filters of `getOrders` (`from`/`to` days, `isPaid`, ...).
+
+    Orders are read in chunks of CHUNK_SIZE with their items prefetched per chunk, so memory
+    stays flat for any number of orders.
+    """
+    orders = optimizeOrders(filterOrders(request, Order.objects.all())).order_by('_id')
+    rows = (orderExportRow(order) for order in orders.iterator(chunk_size=CHUNK_SIZE))
+    return streamExport(request, rows, ORDER_EXPORT_COLUMNS, 'orders')
+
+
 # Function to get a specific order by ID
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -116,29 +316,74 @@ def getOrderById(request, pk):
 
     try:
         # Retrieve the order by primary key
-        order = Order.objects.get(_id=pk)
+        order = optimizeOrders(Order.objects.all()).get(_id=pk)
         if user.is_staff or order.user == user:
             serializer = OrderSerializer(order, many=False)
             return Response(serializer.data)
         else:
-            Response({'detail': 'Not authorized to view this order'},
-                     status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': 'Not authorized to view this order'},
+                            status=status.HTTP_400_BAD_REQUEST)
     except:
         return Response({'detail': 'Order does not exist'}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Async (ASGI) versions of getMyOrders and getOrderById, used when ASYNC_READ_VIEWS is on
+@asyncApiView(authenticated=True)
+async def getMyOrdersAsync(request):
+    """
+    Async version of `getMyOrders`: the orders are read in chunks with `aiterator`.
+    """
+    orders = optimizeOrders(Order.objects.filter(user_id=request.user.id))
+    if usesCursor(request):
+        orders, nextCursor, prevCursor = await acursorPaginate(request, orders)
+        serializer = OrderSerializer(orders, many=True)
+        return {'orders': serializer.data, 'next': nextCursor, 'prev': prevCursor}
+    orders = [order async for order in orders.aiterator(chunk_size=CHUNK_SIZE)]
+    return OrderSerializer(orders, many=True).data
+
+
+@asyncApiView(authenticated=True)
+async def getOrderByIdAsync(request, pk):
+    """
+    Async version of `getOrderById` (same responses).
+    """
+    user = request.user
+    try:
+        order = await optimizeOrders(Order.objects.all()).aget(_id=pk)
+    except (Order.DoesNotExist, ValueError):
+        raise ValidationError({'detail': 'Order does not exist'})
+    if not (user.is_staff or order.user_id == user.id):
+        raise ValidationError({'detail': 'Not authorized to view this order'})
+    return OrderSerializer(order, many=False).data
+
+
 # Function to mark an order as paid
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
+@idempotent  # Retries with the same Idempotency-Key header replay the first response
 def updateOrderToPaid(request, pk):
     """
-    Marks an order as paid and records the payment time.
+    Marks an order as paid, records the payment time and confirms its stock holds.
+
+    The order is only marked paid together with its holds: if its holds had expired and the
+    stock was sold in the meantime, the payment is rejected with 409 and the order stays unpaid.
     """
     order = Order.objects.get(_id=pk)
 
-    order.isPaid = True
-    order.paidAt = datetime.now()  # Store the current timestamp
-    order.save()
+    try:
+        with transaction.atomic():
+            order.isPaid = True
+            order.paidAt = timezone.now()  # Store the current (timezone-aware) timestamp
+            order.save(update_fields=['isPaid', 'paidAt'])
+
+            confirmHolds([order._id])  # The held stock now leaves the store
+            analytics.recordPayments.defer([order._id])  # Count the payment in the sales rollups
+    except InsufficientStock as error:
+        return Response({'detail': '%s, the order was not paid' % error}, status=status.HTTP_409_CONFLICT)
+    except HoldsChanged:
+        # 5xx responses are not stored by @idempotent, so a retry with the same key runs again
+        return Response({'detail': 'The order is being updated, please retry'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
 
     return Response('Order was paid')
 
@@ -153,7 +398,248 @@ def updateOrderToDelivered(request, pk):
     order = Order.objects.get(_id=pk)
 
     order.isDelivered = True
-    order.deliveredAt = datetime.now()  # Store the current timestamp
-    order.save()
+    order.deliveredAt = timezone.now()  # Store the current (timezone-aware) timestamp
+    order.save(update_fields=['isDelivered', 'deliveredAt'])
 
     return Response('Order was delivered')
+
+
+# Maximum number of orders a bulk transition may change
+BULK_MAX_ORDERS = 1000
+
+# Query parameters understood by `filterOrders`
+ORDER_FILTERS = ('isPaid', 'isDelivered', 'user', 'from', 'to')
+
+
+def selectOrderIds(request, flag):
+    """
+    Reads the orders a bulk transition applies to: the `ids` list in the request body, or else
+    the orders matching the `filterOrders` query parameters whose `flag` is still false (oldest
+    first).
+
+    Args:
+        request: HTTP request object.
+        flag (str): `isPaid` or `isDelivered`.
+
+    Returns:
+        list: Order IDs without duplicates, at most BULK_MAX_ORDERS.
+    """
+    ids = request.data.get('ids') if isinstance(request.data, dict) else None
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or len(ids) > BULK_MAX_ORDERS \
+                or not all(str(pk).isdigit() for pk in ids):
+            raise ValidationError({'detail': 'ids must be a list of 1 to %d order IDs' % BULK_MAX_ORDERS})
+        return list(dict.fromkeys(int(pk) for pk in ids))
+
+    if not any(name in request.query_params for name in ORDER_FILTERS):
+        raise ValidationError({'detail': 'Pass a list of ids or at least one filter'})
+    orders = filterOrders(request, Order.objects.filter(**{flag: False})).order_by('_id')
+    return list(orders.values_list('_id', flat=True)[:BULK_MAX_ORDERS])
+
+
+def transitionOrders(ids, flag, timestampField):
+    """
+    Sets `flag` and `timestampField` on every order of `ids` where the flag is still false,
+    with a single UPDATE. Must run inside a transaction.
+
+    Returns:
+        tuple: (IDs of the changed orders, per-ID results with `result` set to `updated`,
+            `unchanged` (already transitioned) or `missing`).
+    """
+    current = dict(Order.objects.select_for_update().filter(_id__in=ids).values_list('_id', flag))
+    pending = [pk for pk in ids if current.get(pk) is False]
+    Order.objects.filter(_id__in=pending, **{flag: False}).update(**{flag: True, timestampField: timezone.now()})
+
+    results = [
+        {'_id': pk, 'result': 'missing' if pk not in current else 'unchanged' if current[pk] else 'updated'}
+        for pk in ids
+    ]
+    return pending, results
+
+
+# Function to mark many orders as delivered (Admin only)
+@api_view(['PUT'])
+@permission_classes([IsAdminUser])
+def bulkUpdateOrdersToDelivered(request):
+    """
+    Marks a batch of orders as delivered with one UPDATE.
+
+    The orders are given as `{"ids": [...]}` in the body, or selected with the `getOrders`
+    filters in the query string (e.g. `?isPaid=true&to=2024-06-30`).
+
+    Returns:
+        Response: `updated` count and a `results` entry per order (`updated`, `unchanged` or `missing`).
+    """
+    ids = selectOrderIds(request, 'isDelivered')
+    with transaction.atomic():
+        pending, results = transitionOrders(ids, 'isDelivered', 'deliveredAt')
+    return Response({'updated': len(pending), 'results': results})
+
+
+def confirmPaidOrders(orderIds, results):
+    """
+    Confirms the stock holds of orders just marked paid. Must run inside a transaction.
+
+    All orders are confirmed in one pass; if the stock of an expired hold is missing, they are
+    confirmed one by one instead and the orders that cannot be covered are marked unpaid again.
+
+    Args:
+        orderIds (list): IDs of the orders marked paid.
+        results (list): Per-order results of `transitionOrders`, updated in place.
+
+    Returns:
+        list: IDs of the orders that stay paid.
+    """
+    try:
+        with transaction.atomic():
+            confirmHolds(orderIds)  # The held stock of all paid orders leaves the store
+        return orderIds
+    except InsufficientStock:
+        pass
+
+    paid, unpaid = [], []
+    for pk in orderIds:
+        try:
+            with transaction.atomic():
+                confirmHolds([pk])
+            paid.append(pk)
+        except InsufficientStock:
+            unpaid.append(pk)
+    Order.objects.filter(_id__in=unpaid).update(isPaid=False, paidAt=None)
+    for result in results:
+        if result['_id'] in unpaid:
+            result['result'] = 'insufficientStock'
+    return paid
+
+
+# Function to mark many orders as paid (Admin only)
+@api_view(['PUT'])
+@permission_classes([IsAdminUser])
+def bulkUpdateOrdersToPaid(request):
+    """
+    Marks a batch of orders as paid (e.g. reconciled bank transfers) with one UPDATE, confirms
+    their stock holds in one pass and queues them for the sales rollups.
+
+    The orders are given as `{"ids": [...]}` in the body, or selected with the `getOrders`
+    filters in the query string. Orders whose expired holds can no longer be covered by the
+    stock stay unpaid and are reported as `insufficientStock`.
+
+    Returns:
+        Response: `updated` count and a `results` entry per order (`updated`, `unchanged`,
+            `missing` or `insufficientStock`).
+    """
+    ids = selectOrderIds(request, 'isPaid')
+    try:
+        with transaction.atomic():
+            pending, results = transitionOrders(ids, 'isPaid', 'paidAt')
+            if pending:
+                pending = confirmPaidOrders(pending, results)
+            if pending:
+                analytics.recordPayments.defer(pending)
+    except HoldsChanged:
+        return Response({'detail': 'Some orders are being updated, please retry'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+    return Response({'updated': len(pending), 'results': results})
+
+
+
+# Maximum number of days an analytics query may span
+ANALYTICS_MAX_DAYS = 366 * 3
+
+
+def parseAnalyticsRange(request):
+    # Reads the inclusive `from`/`to` days of an analytics query (default: the last 30 days)
+    params = request.query_params
+    today = timezone.localdate()
+    last = parseDay(params['to'], 'to').date() if 'to' in params else today
+    first = parseDay(params['from'], 'from').date() if 'from' in params else last - timedelta(days=29)
+    if first > last:
+        raise ValidationError({'detail': 'from must not be after to'})
+    if (last - first).days >= ANALYTICS_MAX_DAYS:
+        raise ValidationError({'detail': 'The range may span at most %d days' % ANALYTICS_MAX_DAYS})
+    return first, last
+
+
+def sumMetrics(rows, key, limit):
+    """
+    Adds up the rollup counters of `rows` per `key` (product or category), best revenue first.
+
+    Returns:
+        list: Dicts with the `key` columns and one total per counter.
+    """
+    totals = rows.values(*key).annotate(**{name + 'Total': Sum(name) for name in analytics.METRICS})
+    totals = totals.order_by('-revenueTotal', *key)[:limit]
+    return [
+        dict({column: row[column] for column in key}, **{name: row[name + 'Total'] for name in analytics.METRICS})
+        for row in totals
+    ]
+
+
+# Function to get sales analytics (Admin only)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def getSalesAnalytics(request):
+    """
+    Answers sales range queries from the rollup tables (see base/analytics.py) without touching orders.
+
+    Query parameters:
+        from, to: Inclusive YYYY-MM-DD range (default: the last 30 days).
+        groupBy: `day` (default) for a daily series, `product` or `category` for totals per
+            product/category over the range, best revenue first.
+        product, category: Restrict the figures to one product ID or category.
+        limit: Maximum rows for `groupBy=product|category` (default 50).
+
+    Every row and the `totals` carry the placed figures (`orders`, `units`, `revenue`) and
+    the paid figures (`paidOrders`, `paidUnits`, `paidRevenue`).
+    """
+    params = request.query_params
+    first, last = parseAnalyticsRange(request)
+    groupBy = params.get('groupBy', 'day')
+    if groupBy not in ('day', 'product', 'category'):
+        raise ValidationError({'detail': 'groupBy must be day, product or category'})
+    if 'product' in params and not params['product'].isdigit():
+        raise ValidationError({'detail': 'product must be a product ID'})
+    limit = params.get('limit', '50')
+    if not limit.isdigit() or not 0 < int(limit) <= 1000:
+        raise ValidationError({'detail': 'limit must be between 1 and 1000'})
+
+    # Totals come from the rollup matching the filter, where every order is counted once
+    if 'product' in params:
+        totals = DailyProductSales.objects.filter(product_id=int(params['product']))
+    elif 'category' in params:
+        totals = DailyCategorySales.objects.filter(category=params['category'])
+    else:
+        totals = DailySales.objects.all()
+    totals = totals.filter(day__range=(first, last)).aggregate(**{name: Sum(name) for name in analytics.METRICS})
+
+    # Rows come from the narrowest rollup that can answer the query
+    if 'product' in params or groupBy == 'product':
+        rows = DailyProductSales.objects.all()
+    elif 'category' in params or groupBy == 'category':
+        rows = DailyCategorySales.objects.all()
+    else:
+        rows = DailySales.objects.all()
+    rows = rows.filter(day__range=(first, last))
+    if 'product' in params:
+        rows = rows.filter(product_id=int(params['product']))
+    if 'category' in params:
+        if rows.model is DailyProductSales:
+            rows = rows.filter(product__category=params['category'])  # Current category of the product
+        else:
+            rows = rows.filter(category=params['category'])
+
+    if groupBy == 'day':
+        series = list(rows.values('day', *analytics.METRICS).order_by('day'))  # One row per day already
+    elif groupBy == 'product':
+        series = sumMetrics(rows, ('product_id', 'product__name'), int(limit))
+    else:
+        series = sumMetrics(rows, ('category',), int(limit))
+
+    return Response({
+        'from': first,
+        'to': last,
+        'groupBy': groupBy,
+        'totals': {name: value or 0 for name, value in totals.items()},
+        'rows': series,
+    })
+
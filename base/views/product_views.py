@@ -1,16 +1,162 @@
 # Import necessary modules and libraries for creating APIs and handling requests.
+from decimal import Decimal, InvalidOperation
+from math import ceil
+
+from asgiref.sync import sync_to_async  # Runs sync helpers from the async views.
 from django.shortcuts import render
 
 from rest_framework.decorators import api_view, permission_classes  # For defining API views and permissions.
-from rest_framework.permissions import IsAuthenticated, IsAdminUser  # Built-in DRF permissions.
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, IsAdminUser  # Built-in DRF permissions.
 from rest_framework.response import Response  # Standard response object for APIs.
+from rest_framework.exceptions import NotFound, ValidationError  # 404/400 responses raised from helpers.
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger  # Pagination utilities.
+from django.db import IntegrityError, transaction  # Atomic writes and constraint violations.
+from django.db.models import Q  # OR-combined lookups.
 
 from base.models import Product, Review  # Importing the database models.
-from base.serializers import ProductSerializer  # Serializer to convert model instances into JSON format.
+from base import search  # Full-text product search index.
+from base import leaderboard  # Cached top-products board.
+from base import catalog_cache  # Cached catalog responses.
+from base import images  # Resized product image variants.
+from base import shards  # Sharded stock counters.
+from base import reviews  # Paginated product reviews and star histograms.
+from base import facets  # Catalog facet counts.
+from base.ratings import adjustRating  # Atomic rating aggregate updates.
+from base.pagination import usesCursor, cursorPaginate, acursorPaginate  # Keyset (cursor) pagination.
+from base.asyncapi import asyncApiView  # Async (ASGI) read endpoints.
+from base.streaming import streamExport, filterDateRange, CHUNK_SIZE  # Streaming CSV/NDJSON downloads.
+from base.serializers import ProductSerializer, ProductListSerializer, ProductStockSerializer, ProductBulkUpdateSerializer, ReviewSerializer  # Serializers to convert model instances into JSON format.
 
 from rest_framework import status  # For sending HTTP status codes.
 
+
+def prepareProductList(request, products):
+    """
+    Chooses how a product listing is serialized.
+
+    Listings use the compact `ProductListSerializer` by default. Clients that still need
+    the nested reviews can opt in with `?include=reviews`, in which case the first page of
+    reviews is loaded with a single `prefetch_related` query instead of one query per product.
+
+    Args:
+        request: HTTP request object carrying the optional `include` query parameter.
+        products (QuerySet): Product queryset to be listed.
+
+    Returns:
+        tuple: The (possibly prefetching) queryset and the serializer class to use.
+    """
+    include = request.query_params.get('include') or ''
+    if 'reviews' in include.split(','):
+        return products.prefetch_related(reviews.prefetchFirstPage()), ProductSerializer
+    return products, ProductListSerializer
+
+
+# Sort options of the product listings (`?sort=`): ordering columns, ending with the primary key
+# so keyset pagination can resume after any row, and whether the listing runs from high to low.
+PRODUCT_SORTS = {
+    'newest': (('createdAt', '_id'), True),
+    'price': (('price', '_id'), False),  # Lowest price first
+    '-price': (('price', '_id'), True),  # Highest price first
+    'rating': (('rating', '_id'), True),  # Best rated first
+}
+
+
+def parseNumber(request, name):
+    # Decimal value of an optional numeric query parameter
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise ValidationError({'detail': '%s must be a number' % name})
+    return number
+
+
+def catalogFilters(request):
+    """
+    Builds the catalog filters of a product listing from the query string.
+
+    `category` and `brand` match the exact names listed in the facet counts; `min_price`,
+    `max_price` and `min_rating` are bounds; `in_stock=1` leaves out sold-out products. Each
+    filter is served by the Product indexes together with the sort.
+
+    Args:
+        request: HTTP request object.
+
+    Returns:
+        Q: Condition on Product (empty, and falsy, without filters).
+
+    Raises:
+        ValidationError: If a bound is not a number.
+    """
+    params = request.query_params
+    filters = Q()
+    for facet in facets.FACETS:
+        if params.get(facet):
+            filters &= Q(**{facet: params[facet]})
+    for name, lookup in (('min_price', 'price__gte'), ('max_price', 'price__lte'), ('min_rating', 'rating__gte')):
+        value = parseNumber(request, name)
+        if value is not None:
+            filters &= Q(**{lookup: value})
+    if params.get('in_stock') in ('1', 'true'):
+        filters &= Q(countInStock__gt=0)
+    return filters
+
+
+def productSort(request):
+    """
+    Returns the `sort` option of a product listing ('newest' by default).
+
+    Raises:
+        ValidationError: If the option is unknown.
+    """
+    sort = request.query_params.get('sort') or 'newest'
+    if sort not in PRODUCT_SORTS:
+        raise ValidationError({'detail': 'sort must be one of: %s' % ', '.join(PRODUCT_SORTS)})
+    return sort
+
+
+def sortProducts(products, sort):
+    """
+    Orders a product queryset by a `PRODUCT_SORTS` option. Products without a value for the sort
+    column (e.g. no price) are left out, as keyset pagination cannot resume after a null.
+    """
+    ordering, descending = PRODUCT_SORTS[sort]
+    if Product._meta.get_field(ordering[0]).null:
+        products = products.exclude(**{ordering[0] + '__isnull': True})
+    return products.order_by(*[('-' if descending else '') + name for name in ordering])
+
+
+def catalogListing(request, query, rankedIds):
+    """
+    Applies the filters and sort of the query string to a catalog listing.
+
+    Keyword results stay in relevance order unless `sort` is given.
+
+    Args:
+        request: HTTP request object.
+        query (str): Search keyword ('' for none).
+        rankedIds (list): Matching product ids from the search index, best first, or None to
+            filter by name instead.
+
+    Returns:
+        tuple: (products queryset, ranked ids or None, sort option, whether the ranked ids must
+            still be narrowed down to the filtered products).
+    """
+    sort = productSort(request)
+    filters = catalogFilters(request)
+    if rankedIds is None:
+        if query:
+            filters &= Q(name__icontains=query)  # No search index on this database
+        return sortProducts(Product.objects.filter(filters), sort), None, sort, False
+    if request.query_params.get('sort'):
+        return sortProducts(Product.objects.filter(filters, _id__in=rankedIds), sort), None, sort, False
+    return Product.objects.filter(filters), rankedIds, sort, bool(filters)
+
+
 # ============================
 # API to Fetch All Products
 # ============================
@@ -19,26 +165,64 @@ from rest_framework import status  # For sending HTTP status codes.
 def getProducts(request):
     """
     Retrieves all products from the database based on a search keyword.
+    Keyword searches use the full-text index and are ordered by relevance.
+    Listings can be filtered by `category`, `brand`, `min_price`, `max_price`, `in_stock`
+    and `min_rating`, and sorted with `sort` ('newest', 'price', '-price' or 'rating').
     Supports pagination to limit the number of products displayed per page.
+    Reviews are only embedded when `?include=reviews` is passed.
+    Passing `cursor` (and optionally `page_size`) switches to keyset pagination, which
+    returns `next`/`prev` tokens instead of `page`/`pages`.
+    Responses are cached per query string until the catalog changes.
 
     Args:
-        request: HTTP request object containing optional query parameters (e.g., `keyword` and `page`).
+        request: HTTP request object containing optional query parameters (e.g., `keyword`, `category`, `sort`, `page`, `cursor` and `include`).
 
     Returns:
-        Response: JSON response with paginated product data.
+        Response: JSON response with paginated product data and the catalog-wide `facets`
+        (number of products per category and brand).
+    """
+    key = catalog_cache.listingKey(request, 'products')
+    return Response(catalog_cache.getOrSet(key, lambda: listProducts(request)))
+
+
+def listProducts(request):
+    """
+    Builds the `getProducts` response data (see `getProducts` for the query parameters).
+
+    Args:
+        request: HTTP request object.
+
+    Returns:
+        dict: Products of the requested page plus the pagination fields.
     """
     # Extract the search keyword from the query parameters. Default to an empty string if not provided.
     query = request.query_params.get('keyword')
     if query == None:
         query = ''
 
-    # Filter products by name based on the keyword, and order them by creation date.
-    products = Product.objects.filter(
-        name__icontains=query).order_by('-createdAt')
+    # Keyword searches are ranked by the full-text index (name, brand, category, description).
+    # Without an index on this database, fall back to filtering products by name.
+    rankedIds = search.searchProductIds(query) if query else None
+    products, rankedIds, sort, narrow = catalogListing(request, query, rankedIds)
+    if narrow:
+        # Keep the relevance order, without the matches excluded by the filters
+        kept = set(products.filter(_id__in=rankedIds).values_list('_id', flat=True))
+        rankedIds = [pk for pk in rankedIds if pk in kept]
+    catalog, serializer_class = prepareProductList(request, products)
+
+    # Cursor mode (`?cursor=`): keyset pagination on the sort columns (newest first by default).
+    if usesCursor(request):
+        if rankedIds is not None:
+            catalog = catalog.filter(_id__in=rankedIds)
+        ordering, descending = PRODUCT_SORTS[sort]
+        products, nextCursor, prevCursor = cursorPaginate(request, catalog, ordering, 5, descending)
+        serializer = serializer_class(products, many=True)
+        return {'products': serializer.data, 'next': nextCursor, 'prev': prevCursor, 'facets': facets.counts()}
 
     # Handle pagination by extracting the `page` parameter.
+    # Search results are paginated over the ranked ids so the best matches come first.
     page = request.query_params.get('page')
-    paginator = Paginator(products, 5)  # Limit each page to 5 products.
+    paginator = Paginator(catalog if rankedIds is None else rankedIds, 5)  # Limit each page to 5 products.
 
     try:
         products = paginator.page(page)  # Retrieve products for the specified page.
@@ -47,6 +231,11 @@ def getProducts(request):
     except EmptyPage:
         products = paginator.page(paginator.num_pages)  # Show the last page if the page is out of range.
 
+    if rankedIds is not None:
+        # Load the products of the current page in one query and keep the ranking order.
+        productsById = catalog.in_bulk(list(products))
+        products = [productsById[pk] for pk in products if pk in productsById]
+
     if page == None:
         page = 1
 
@@ -54,9 +243,9 @@ def getProducts(request):
     page = int(page)
     print('Page:', page)  # Debugging output to log the page number.
 
-    # Serialize the paginated products and return the response.
-    serializer = ProductSerializer(products, many=True)
-    return Response({'products': serializer.data, 'page': page, 'pages': paginator.num_pages})
+    # Serialize the paginated products and return the response data.
+    serializer = serializer_class(products, many=True)
+    return {'products': serializer.data, 'page': page, 'pages': paginator.num_pages, 'facets': facets.counts()}
 
 
 # ============================
@@ -66,7 +255,9 @@ def getProducts(request):
 @api_view(['GET'])
 def getTopProducts(request):
     """
-    Retrieves the top 5 products with the highest ratings.
+    Retrieves the top products with the highest ratings (ties broken by number of reviews).
+    The compact product cards are served from the cached leaderboard; passing
+    `?include=reviews` loads the full products with their reviews from the database instead.
 
     Args:
         request: HTTP request object.
@@ -74,9 +265,13 @@ def getTopProducts(request):
     Returns:
         Response: JSON response with the top-rated product data.
     """
-    products = Product.objects.filter(rating__gte=4).order_by('-rating')[0:5]  # Fetch top-rated products.
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data)
+    products, serializer_class = prepareProductList(request, leaderboard.ranked(Product.objects.all()))
+    if serializer_class is ProductListSerializer:
+        return Response(leaderboard.topProducts())  # Cached cards, no database access in the steady state.
+
+    key = catalog_cache.listingKey(request, 'top')
+    return Response(catalog_cache.getOrSet(
+        key, lambda: serializer_class(products[0:leaderboard.COUNT], many=True).data))
 
 # ============================
 # API to Fetch a Single Product
@@ -85,7 +280,9 @@ def getTopProducts(request):
 @api_view(['GET'])
 def getProduct(request, pk):
     """
-    Retrieves a specific product based on its ID.
+    Retrieves a specific product based on its ID, with the first page of its reviews and
+    the star histogram (further reviews come from `getProductReviews`).
+    The response is cached until the product or one of its reviews changes.
 
     Args:
         request: HTTP request object.
@@ -94,9 +291,138 @@ def getProduct(request, pk):
     Returns:
         Response: JSON response with the product data.
     """
-    product = Product.objects.get(_id=pk)  # Retrieve product by ID.
-    serializer = ProductSerializer(product, many=False)
-    return Response(serializer.data)
+    def serializeProduct():
+        product = Product.objects.get(_id=pk)  # Retrieve product by ID.
+        return ProductSerializer(product, many=False).data
+
+    return Response(catalog_cache.getOrSet(catalog_cache.productKey(pk), serializeProduct))
+
+
+# ============================
+# Async (ASGI) Read Endpoints
+# ============================
+# `async def` versions of getProducts, getTopProducts and getProduct, used when ASYNC_READ_VIEWS
+# is on (see base/asyncapi.py). They share the cache keys and response format of the views above.
+
+@asyncApiView()
+async def getProductsAsync(request):
+    """
+    Async version of `getProducts` (same query parameters and response).
+    """
+    key = await catalog_cache.alistingKey(request, 'products')
+    return await catalog_cache.agetOrSet(key, lambda: listProductsAsync(request))
+
+
+async def listProductsAsync(request):
+    """
+    Builds the `getProducts` response data with the async ORM.
+    """
+    query = request.query_params.get('keyword') or ''
+    rankedIds = await sync_to_async(search.searchProductIds)(query) if query else None
+    products, rankedIds, sort, narrow = catalogListing(request, query, rankedIds)
+    if narrow:
+        kept = {pk async for pk in products.filter(_id__in=rankedIds).values_list('_id', flat=True)}
+        rankedIds = [pk for pk in rankedIds if pk in kept]
+    catalog, serializer_class = prepareProductList(request, products)
+
+    if usesCursor(request):
+        if rankedIds is not None:
+            catalog = catalog.filter(_id__in=rankedIds)
+        ordering, descending = PRODUCT_SORTS[sort]
+        products, nextCursor, prevCursor = await acursorPaginate(request, catalog, ordering, 5, descending)
+        serializer = serializer_class(products, many=True)
+        return {'products': serializer.data, 'next': nextCursor, 'prev': prevCursor, 'facets': await facets.acounts()}
+
+    # Same page numbers as the Paginator of `listProducts`: 5 per page, invalid pages fall back
+    # to the first one and pages past the end to the last one.
+    count = await catalog.acount() if rankedIds is None else len(rankedIds)
+    pages = max(ceil(count / 5), 1)
+    page = request.query_params.get('page')
+    try:
+        number = int(page)
+    except (TypeError, ValueError):
+        number = 1
+    number = min(number, pages) if number >= 1 else pages
+    start = (number - 1) * 5
+
+    if rankedIds is None:
+        products = [product async for product in catalog[start:start + 5]]
+    else:
+        pageIds = rankedIds[start:start + 5]
+        productsById = await catalog.ain_bulk(pageIds)
+        products = [productsById[pk] for pk in pageIds if pk in productsById]
+
+    serializer = serializer_class(products, many=True)
+    return {'products': serializer.data, 'page': number, 'pages': pages, 'facets': await facets.acounts()}
+
+
+@asyncApiView()
+async def getTopProductsAsync(request):
+    """
+    Async version of `getTopProducts`.
+    """
+    products, serializer_class = prepareProductList(request, leaderboard.ranked(Product.objects.all()))
+    if serializer_class is ProductListSerializer:
+        return await leaderboard.atopProducts()
+
+    async def serializeTop():
+        top = [product async for product in products[0:leaderboard.COUNT]]
+        return serializer_class(top, many=True).data
+
+    key = await catalog_cache.alistingKey(request, 'top')
+    return await catalog_cache.agetOrSet(key, serializeTop)
+
+
+@asyncApiView()
+async def getProductAsync(request, pk):
+    """
+    Async version of `getProduct`; unknown products are answered with 404.
+    """
+    async def serializeProduct():
+        try:
+            product = await Product.objects.prefetch_related(reviews.prefetchFirstPage()).aget(_id=pk)
+        except (Product.DoesNotExist, ValueError):
+            raise NotFound('Product not found')
+        return ProductSerializer(product, many=False).data
+
+    return await catalog_cache.agetOrSet(await catalog_cache.aproductKey(pk), serializeProduct)
+
+
+# ============================
+# API to Fetch Several Products at Once
+# ============================
+
+BATCH_MAX_IDS = 500  # Upper bound on the number of ids accepted by getProductsBatch.
+
+
+@api_view(['GET'])
+def getProductsBatch(request):
+    """
+    Retrieves price, stock and image for several products in a single query.
+    Used to refresh all cart lines at once instead of fetching each product separately.
+
+    Args:
+        request: HTTP request object with `ids`, a comma separated list of product IDs.
+
+    Returns:
+        Response: JSON response with the found `products` (in the requested order)
+        and the `missing` IDs.
+    """
+    try:
+        ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()]
+    except ValueError:
+        return Response({'detail': 'ids must be a comma separated list of product IDs'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if len(ids) > BATCH_MAX_IDS:
+        return Response({'detail': 'At most %d ids can be requested at once' % BATCH_MAX_IDS},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    ids = list(dict.fromkeys(ids))  # Drop duplicates, keep the requested order.
+    fields = [name for name in ProductStockSerializer.Meta.fields if name != 'imageSrcset']  # Built from imageVariants
+    products = Product.objects.only(*fields).in_bulk(ids)
+    serializer = ProductStockSerializer([products[pk] for pk in ids if pk in products], many=True)
+    return Response({'products': serializer.data, 'missing': [pk for pk in ids if pk not in products]})
 
 
 # ============================
@@ -127,6 +453,8 @@ def createProduct(request):
         category='Sample Category',
         description=''
     )
+    product.sku = 'AM-%d' % product._id  # Same default SKU as the products created before SKUs existed
+    Product.objects.filter(_id=product._id).update(sku=product.sku)
 
     # Serialize the created product and return the response.
     serializer = ProductSerializer(product, many=False)
@@ -157,16 +485,154 @@ def updateProduct(request, pk):
     product.name = data['name']
     product.price = data['price']
     product.brand = data['brand']
-    product.countInStock = data['countInStock']
     product.category = data['category']
     product.description = data['description']
 
-    product.save()  # Save changes to the database.
+    # Save only the edited fields so concurrent review aggregate updates are not overwritten.
+    # The stock is only written when the admin changed it: the form sends back the count it
+    # loaded, and writing that again would undo concurrent sales (or re-spread sharded stock).
+    fields = ['name', 'price', 'brand', 'category', 'description']
+    try:
+        countInStock = int(data['countInStock'])
+    except (TypeError, ValueError):
+        return Response({'detail': 'countInStock must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
+    if countInStock != product.countInStock:
+        product.countInStock = countInStock
+        fields.append('countInStock')
+    product.save(update_fields=fields)
 
     serializer = ProductSerializer(product, many=False)
     return Response(serializer.data)
 
 
+# ============================
+# Admin API: Update Many Products
+# ============================
+
+BULK_MAX_PRODUCTS = 1000  # Upper bound on the number of updates accepted by bulkUpdateProducts.
+
+
+def parseBulkUpdates(data):
+    """
+    Reads and validates the updates of a bulk product request.
+
+    Returns:
+        tuple: (valid updates as (index, key, lookup value, changes), per-row errors).
+
+    Raises:
+        ValidationError: If the request body is not a list of updates.
+    """
+    updates = data.get('products') if isinstance(data, dict) else data
+    if not isinstance(updates, list) or not updates or len(updates) > BULK_MAX_PRODUCTS:
+        raise ValidationError({'detail': 'products must be a list of 1 to %d updates' % BULK_MAX_PRODUCTS})
+
+    valid, errors = [], []
+    for index, update in enumerate(updates):
+        if not isinstance(update, dict):
+            errors.append({'index': index, 'result': 'invalid', 'errors': {'detail': 'An update must be an object'}})
+            continue
+        key = '_id' if '_id' in update else 'sku' if 'sku' in update else None
+        changes = {name: value for name, value in update.items() if name not in ('_id', 'sku')}
+        serializer = ProductBulkUpdateSerializer(data=changes, partial=True)
+        problems = {} if serializer.is_valid() else dict(serializer.errors)
+        if key is None:
+            problems['detail'] = 'Each update needs an _id or a sku'
+        elif key == '_id' and not str(update['_id']).isdigit():
+            problems['_id'] = 'Must be a product ID'
+        unknown = set(changes) - set(ProductBulkUpdateSerializer.Meta.fields)
+        if unknown:
+            problems['detail'] = 'Unknown fields: %s' % ', '.join(sorted(unknown))
+        if problems:
+            error = {'index': index, 'result': 'invalid', 'errors': problems}
+            if key:
+                error[key] = update[key]
+            errors.append(error)
+            continue
+        lookup = int(update['_id']) if key == '_id' else str(update['sku'])
+        valid.append((index, key, lookup, serializer.validated_data))
+    return valid, errors
+
+
+@api_view(['PATCH'])
+@permission_classes([IsAdminUser])  # Restrict access to admin users.
+def bulkUpdateProducts(request):
+    """
+    Applies many partial product updates (e.g. a price/stock feed) in one transaction.
+
+    The body is `{"products": [{"_id": 1, "price": "9.99"}, {"sku": "AB-1", "countInStock": 4}, ...]}`;
+    each update names its product by `_id` or `sku` and carries only the fields to change
+    (name, brand, category, description, price, countInStock). Invalid updates are reported and
+    skipped, the others are written with `bulk_update`, one statement per set of changed fields.
+    The cached catalog is invalidated once for all changed products.
+
+    Args:
+        request: HTTP request object containing the updates.
+
+    Returns:
+        Response: `updated` count and a `results` entry per update (`updated`, `unchanged`,
+            `missing` or `invalid` with its `errors`).
+    """
+    updates, errors = parseBulkUpdates(request.data)
+    ids = [lookup for _, key, lookup, _ in updates if key == '_id']
+    skus = [lookup for _, key, lookup, _ in updates if key == 'sku']
+    fields = ProductBulkUpdateSerializer.Meta.fields
+
+    results = errors
+    with transaction.atomic():
+        products = Product.objects.select_for_update().only('_id', 'sku', 'stockShards', *fields) \
+            .filter(Q(_id__in=ids) | Q(sku__in=skus))
+        byId = {product._id: product for product in products}
+        bySku = {product.sku: product for product in byId.values() if product.sku}
+
+        # countInStock of a sharded product lags behind its shards: updates are compared with the shard total
+        stock = shards.stockTotals([product._id for product in byId.values() if product.stockShards])
+
+        changed = {}  # Changed field names per product ID
+        facetChanges = []  # Category/brand moves, applied to the facet counts below
+        for index, key, lookup, values in updates:
+            product = byId.get(lookup) if key == '_id' else bySku.get(lookup)
+            if product is None:
+                results.append({'index': index, key: lookup, 'result': 'missing'})
+                continue
+            current = {name: getattr(product, name) for name in values}
+            if 'countInStock' in current and product.stockShards:
+                current['countInStock'] = stock.get(product._id, 0)
+            names = [name for name, value in values.items() if current[name] != value]
+            for name in set(names) & set(facets.FACETS):
+                facetChanges += [(name, getattr(product, name), -1), (name, values[name], 1)]
+            for name in names:
+                setattr(product, name, values[name])
+            if names:
+                changed.setdefault(product._id, set()).update(names)
+            results.append({'index': index, key: lookup, '_id': product._id, 'result': 'updated' if names else 'unchanged'})
+
+        # One UPDATE per set of changed fields, writing only those columns
+        groups = {}
+        for pk, names in changed.items():
+            groups.setdefault(tuple(sorted(names)), []).append(byId[pk])
+        for names, group in groups.items():
+            Product.objects.bulk_update(group, names, batch_size=BULK_MAX_PRODUCTS)
+        facets.applyChanges(facetChanges)
+
+        for pk, names in changed.items():
+            product = byId[pk]
+            if 'countInStock' in names and product.stockShards:
+                shards.resetShards(product)  # Spread the new stock over the product's shards
+            if names & set(search.INDEXED_FIELDS):
+                search.indexProduct.defer(pk)
+
+        # bulk_update sends no signals: refresh the caches once for the whole batch
+        if changed:
+            catalog_cache.invalidateProducts(list(changed))
+            listed = {card['_id'] for card in leaderboard.topProducts()}  # Ratings are unchanged, only listed cards can change
+            for pk, names in changed.items():
+                if pk in listed and names & leaderboard.CARD_FIELDS:
+                    leaderboard.productChanged.defer(pk)
+
+    results.sort(key=lambda result: result['index'])
+    return Response({'updated': len(changed), 'results': results})
+
+
 # ============================
 # Admin API: Delete a Product
 # ============================
@@ -210,17 +676,119 @@ def uploadImage(request):
     product = Product.objects.get(_id=product_id)
 
     product.image = request.FILES.get('image')  # Save the uploaded image to the product.
-    product.save()
+    product.imageVariants = []  # The old variants show the previous image
+    product.save(update_fields=['image', 'imageVariants'])
+
+    # Thumbnails and WebP copies are rendered by a background job.
+    if product.image:
+        images.processProductImage.defer(product._id, product.image.name)
 
     return Response('Image was uploaded')
 
 
 # ============================
-# API: Create a Product Review
+# Admin API: Catalog Cache Statistics
 # ============================
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])  # Restrict access to authenticated users.
+@api_view(['GET'])
+@permission_classes([IsAdminUser])  # Restrict access to admin users.
+def getCatalogCacheStats(request):
+    """
+    Returns hit/miss counters of the catalog response cache. Only admins can access this endpoint.
+
+    Args:
+        request: HTTP request object.
+
+    Returns:
+        Response: JSON response with `hits`, `misses`, `hitRatio` and the current catalog `generation`.
+    """
+    return Response(catalog_cache.stats())
+
+
+# ============================
+# Admin API: Export Products
+# ============================
+
+# Columns of the product export, in order.
+PRODUCT_EXPORT_COLUMNS = [
+    '_id', 'sku', 'name', 'brand', 'category', 'price', 'countInStock', 'countReserved',
+    'rating', 'numReviews', 'image', 'createdAt',
+]
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])  # Restrict access to admin users.
+def exportProducts(request):
+    """
+    Streams the catalog as a CSV (`type=csv`, default) or NDJSON (`type=ndjson`) download. Only admins can access this endpoint.
+
+    Args:
+        request: HTTP request object; `from`/`to` (YYYY-MM-DD) limit the export to products created in that range.
+
+    Returns:
+        StreamingHttpResponse: The download, read from the database in chunks so memory stays flat.
+    """
+    products = filterDateRange(request, Product.objects.all(), 'createdAt').order_by('_id')
+    rows = products.values(*PRODUCT_EXPORT_COLUMNS).iterator(chunk_size=CHUNK_SIZE)
+    return streamExport(request, rows, PRODUCT_EXPORT_COLUMNS, 'products')
+
+
+# ============================
+# API: List or Create Product Reviews
+# ============================
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticatedOrReadOnly])  # Anyone may read reviews, only authenticated users may write one.
+def productReviews(request, pk):
+    """
+    Lists (GET) or creates (POST) the reviews of a specific product.
+
+    Args:
+        request: HTTP request object.
+        pk (int): Primary key (ID) of the product.
+
+    Returns:
+        Response: See `getProductReviews` and `createProductReview`.
+    """
+    if request.method == 'POST':
+        return createProductReview(request, pk)
+    return getProductReviews(request, pk)
+
+
+def getProductReviews(request, pk):
+    """
+    Retrieves one page of a product's reviews with keyset pagination (see base/reviews.py).
+
+    Query parameters: `sort` ('newest', the default, or 'rating' for the highest rating first),
+    `cursor` (a `next`/`prev` token, or the product's `reviewsNext`) and `page_size`.
+
+    Args:
+        request: HTTP request object.
+        pk (int): Primary key (ID) of the product.
+
+    Returns:
+        Response: JSON response with the `reviews` of the page, the `next`/`prev` cursors and
+        the product's `ratingHistogram`.
+    """
+    sort = request.query_params.get('sort') or 'newest'
+    if sort not in reviews.ORDERINGS:
+        return Response({'detail': 'sort must be one of: %s' % ', '.join(reviews.ORDERINGS)},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        product = Product.objects.only('_id', *reviews.HISTOGRAM_FIELDS).get(_id=pk)
+    except (Product.DoesNotExist, ValueError):
+        raise NotFound('Product not found')
+
+    page, nextCursor, prevCursor = cursorPaginate(
+        request, product.review_set.all(), reviews.ORDERINGS[sort], reviews.PAGE_SIZE)
+    return Response({
+        'reviews': ReviewSerializer(page, many=True).data,
+        'next': nextCursor,
+        'prev': prevCursor,
+        'ratingHistogram': reviews.ratingHistogram(product),
+    })
+
+
 def createProductReview(request, pk):
     """
     Creates a review for a specific product. Checks for duplicate reviews and valid ratings.
@@ -236,39 +804,32 @@ def createProductReview(request, pk):
     product = Product.objects.get(_id=pk)
     data = request.data
 
-    # Check if the user has already reviewed the product.
-    alreadyExists = product.review_set.filter(user=user).exists()
-    if alreadyExists:
-        content = {'detail': 'Product already reviewed'}
-        return Response(content, status=status.HTTP_400_BAD_REQUEST)
-
     # Validate rating.
-    elif data['rating'] == 0:
+    if data['rating'] == 0:
         content = {'detail': 'Please select a rating'}
         return Response(content, status=status.HTTP_400_BAD_REQUEST)
+    rating = int(data['rating'])
+    if rating not in reviews.STARS:
+        content = {'detail': 'Rating must be between 1 and 5'}
+        return Response(content, status=status.HTTP_400_BAD_REQUEST)
 
-    # Create a new review.
-    else:
-        review = Review.objects.create(
-            user=user,
-            product=product,
-            name=user.first_name,
-            rating=data['rating'],
-            comment=data['comment'],
-        )
-
-        # Recalculate product ratings based on all reviews.
-        reviews = product.review_set.all()
-        product.numReviews = len(reviews)
-
-        total = 0
-        for i in reviews:
-            total += i.rating
-
-        product.rating = total / len(reviews)  # Update product rating.
-        product.save()
-
-        return Response('Review Added')
+    # Create the review and update the product's rating aggregates in one transaction.
+    # A second review by the same user is rejected by the (product, user) unique constraint.
+    try:
+        with transaction.atomic():
+            Review.objects.create(
+                user=user,
+                product=product,
+                name=user.first_name,
+                rating=rating,
+                comment=data['comment'],
+            )
+            adjustRating(product._id, rating, 1)  # O(1) update of rating, ratingSum, numReviews and the histogram.
+    except IntegrityError:
+        content = {'detail': 'Product already reviewed'}
+        return Response(content, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response('Review Added')
     
     """
     The Paginator in Django is a utility for managing pagination, which refers to dividing large data sets into smaller, more manageable pages for display or processing. This is particularly useful when handling a large number of database records, such as products, user accounts, or posts.
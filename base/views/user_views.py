@@ -14,8 +14,12 @@ from base.serializers import ProductSerializer, UserSerializer, UserSerializerWi
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer  # Default serializer for JWT.
 from rest_framework_simplejwt.views import TokenObtainPairView  # Default view for obtaining JWT tokens.
 
-from django.contrib.auth.hashers import make_password  # Utility to securely hash passwords.
+from base.hashing import hashPassword  # Password hashing in the bounded process pool.
+from base.pagination import usesCursor, cursorPaginate  # Keyset (cursor) pagination.
+from base.streaming import streamExport, filterDateRange, CHUNK_SIZE  # Streaming CSV/NDJSON downloads.
 from rest_framework import status  # HTTP response status codes.
+from rest_framework.exceptions import ValidationError  # 400 responses for invalid query parameters.
+from django.db.models import Q  # OR-combined search conditions.
 
 # ============================
 # Custom JWT Token Serializer
@@ -66,13 +70,15 @@ def registerUser(request):
         Response: Serialized user data or error message if registration fails.
     """
     data = request.data
+    # Hash the password in the hashing pool first; a saturated pool answers 503 (HashingBusy).
+    password = hashPassword(data['password'])
     try:
         # Create a new user object with the provided data.
         user = User.objects.create(
             first_name=data['name'],
             username=data['email'],  # Username is set to the email for simplicity.
             email=data['email'],
-            password=make_password(data['password'])  # Securely hash the password.
+            password=password  # Securely hashed password.
         )
         # Serialize the created user with the token.
         serializer = UserSerializerWithToken(user, many=False)
@@ -109,7 +115,7 @@ def updateUserProfile(request):
 
     # Update password only if provided.
     if data['password'] != '':
-        user.password = make_password(data['password'])
+        user.password = hashPassword(data['password'])
 
     user.save()  # Save changes to the database.
 
@@ -139,11 +145,17 @@ def getUserProfile(request):
 # Admin User Management APIs
 # ============================
 
+# Columns `UserSerializer` reads; admin listings load only these (no password hashes)
+USER_LIST_FIELDS = ['id', 'username', 'email', 'first_name', 'is_staff']
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def getUsers(request):
     """
     Retrieves a list of all users. Accessible only to admin users.
+    Passing `cursor` returns one page of users (newest first, keyed on `id`) with
+    `next`/`prev` tokens instead.
 
     Args:
         request: HTTP request object.
@@ -151,11 +163,72 @@ def getUsers(request):
     Returns:
         Response: List of serialized user data.
     """
-    users = User.objects.all()
+    users = User.objects.only(*USER_LIST_FIELDS)
+    if usesCursor(request):
+        users, nextCursor, prevCursor = cursorPaginate(request, users, ordering=('id',))
+        serializer = UserSerializer(users, many=True)
+        return Response({'users': serializer.data, 'next': nextCursor, 'prev': prevCursor})
     serializer = UserSerializer(users, many=True)
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def getUserDirectory(request):
+    """
+    Searchable user directory for admins, one page at a time (newest first, keyed on `id`).
+
+    Query parameters:
+        q: Case-insensitive prefix of the email or name (both indexed, see migration 0011).
+        isAdmin: true/false, only staff or only non-staff users.
+        cursor, page_size: Keyset pagination; the first page needs no cursor.
+
+    Args:
+        request: HTTP request object.
+
+    Returns:
+        Response: {'users': [...], 'next': token or None, 'prev': token or None}.
+    """
+    users = User.objects.only(*USER_LIST_FIELDS)
+
+    query = request.query_params.get('q', '').strip()
+    if query:
+        users = users.filter(Q(email__istartswith=query) | Q(first_name__istartswith=query))
+
+    isAdmin = request.query_params.get('isAdmin')
+    if isAdmin is not None:
+        if isAdmin.lower() not in ('true', '1', 'false', '0'):
+            raise ValidationError({'detail': 'isAdmin must be true or false'})
+        users = users.filter(is_staff=isAdmin.lower() in ('true', '1'))
+
+    users, nextCursor, prevCursor = cursorPaginate(request, users, ordering=('id',))
+    serializer = UserSerializer(users, many=True)
+    return Response({'users': serializer.data, 'next': nextCursor, 'prev': prevCursor})
+
+
+# Columns of the user export, in order (password hashes are never exported).
+USER_EXPORT_COLUMNS = [
+    'id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined', 'last_login',
+]
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def exportUsers(request):
+    """
+    Streams all users as a CSV (`type=csv`, default) or NDJSON (`type=ndjson`) download. Accessible only to admin users.
+
+    Args:
+        request: HTTP request object; `from`/`to` (YYYY-MM-DD) limit the export to users who joined in that range.
+
+    Returns:
+        StreamingHttpResponse: The download, read from the database in chunks so memory stays flat.
+    """
+    users = filterDateRange(request, User.objects.all(), 'date_joined').order_by('id')
+    rows = users.values(*USER_EXPORT_COLUMNS).iterator(chunk_size=CHUNK_SIZE)
+    return streamExport(request, rows, USER_EXPORT_COLUMNS, 'users')
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def getUserById(request, pk):
@@ -27,6 +27,37 @@ export const addToCart = (id, qty) => async (dispatch, getState) => {
 
 
 
+export const refreshCart = () => async (dispatch, getState) => {
+    const { cartItems } = getState().cart
+    if (cartItems.length === 0) return
+
+    const ids = cartItems.map(x => x.product).join(',')
+    const { data } = await axios.get(`/api/products/batch/?ids=${ids}`)
+
+    data.products.forEach(product => {
+        // Read the line again: its quantity may have changed while the request was running
+        const item = getState().cart.cartItems.find(x => x.product === product._id)
+        if (!item) return
+        const { qty } = item
+        dispatch({
+            type: CART_ADD_ITEM,
+            payload: {
+                product: product._id,
+                name: product.name,
+                image: product.image,
+                price: product.price,
+                countInStock: product.countInStock,
+                qty
+            }
+        })
+    })
+    data.missing.forEach(id => dispatch({ type: CART_REMOVE_ITEM, payload: id }))
+
+    localStorage.setItem('cartItems', JSON.stringify(getState().cart.cartItems))
+}
+
+
+
 export const removeFromCart = (id) => (dispatch, getState) => {
     dispatch({
         type: CART_REMOVE_ITEM,
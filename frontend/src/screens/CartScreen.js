@@ -3,7 +3,7 @@ import { Link } from 'react-router-dom'
 import { useDispatch, useSelector } from 'react-redux'
 import { Row, Col, ListGroup, Image, Form, Button, Card } from 'react-bootstrap'
 import Message from '../components/Message'
-import { addToCart, removeFromCart } from '../actions/cartActions'
+import { addToCart, refreshCart, removeFromCart } from '../actions/cartActions'
 
 function CartScreen({ match, location, history }) {
     const productId = match.params.id
@@ -19,6 +19,11 @@ function CartScreen({ match, location, history }) {
         }
     }, [dispatch, productId, qty])
 
+    // Refresh price and stock of every line with one batch request when the cart is opened
+    useEffect(() => {
+        dispatch(refreshCart())
+    }, [dispatch])
+
 
     const removeFromCartHandler = (id) => {
         dispatch(removeFromCart(id))
@@ -0,0 +1,22 @@
+# Gunicorn configuration for the web process (Procfile: `gunicorn backend.asgi:application`).
+#
+# Uvicorn workers run the ASGI application: the async read endpoints (base/asyncapi.py) wait on
+# the database without holding a thread, and the DRF views run in each worker's thread pool.
+
+import multiprocessing
+import os
+
+bind = '0.0.0.0:%s' % os.environ.get('PORT', '8000')
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))  # Seconds before a stuck worker is restarted
+graceful_timeout = 30  # Seconds workers get to finish requests on restart
+keepalive = 5  # Seconds idle keep-alive connections are held open (behind a load balancer)
+
+# Restart workers now and then to contain slow memory growth
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'